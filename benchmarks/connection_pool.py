@@ -0,0 +1,82 @@
+"""
+Compares the connections opened when every entity gets its own
+requests.Session (the previous behaviour) with the shared pool of the client.
+
+A local keep-alive HTTP server stands in for Orchestrator and counts the TCP
+connections it accepts. Against the cloud each of those connections also
+costs a TLS handshake (usually 1-2 extra round-trips), which the server
+simulates by delaying every new connection by `handshake_ms`.
+
+    python benchmarks/connection_pool.py [num_items] [threads] [handshake_ms]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import json
+import sys
+import threading
+import time
+
+import requests
+
+from orchestrator import Orchestrator
+from orchestrator.orchestrator_http import OrchestratorHTTP
+from orchestrator.orchestrator_queue_item import QueueItem
+
+NUM_ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+HANDSHAKE = (float(sys.argv[3]) if len(sys.argv) > 3 else 30) / 1000
+connections = 0
+lock = threading.Lock()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        global connections
+        with lock:
+            connections += 1
+        time.sleep(HANDSHAKE)
+        super().setup()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        body = json.dumps({"access_token": "token", "expires_in": 3600, "Id": 1}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+
+def run(label, items):
+    global connections
+    connections = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(lambda item: item.info(), items))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {connections:>6} connections {elapsed:>8.2f}s")
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    OrchestratorHTTP.cloud_url = OrchestratorHTTP.account_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = Orchestrator(client_id="id", refresh_token="token", tenant_name="tenant", folder_id=1)
+    queue_args = (client.client_id, client.refresh_token, client.tenant_name, 1, "folder", "queue", 1)
+
+    print(f"{NUM_ITEMS} QueueItem.info() calls with {THREADS} threads, {HANDSHAKE * 1000:.0f}ms per handshake")
+    own_sessions = [QueueItem(*queue_args, session=requests.Session(), item_id=i + 1, token_manager=client.token_manager) for i in range(NUM_ITEMS)]
+    run("one Session per entity", own_sessions)
+    shared = [QueueItem(*queue_args, session=client.session, item_id=i + 1, token_manager=client.token_manager) for i in range(NUM_ITEMS)]
+    run("shared client pool", shared)
+    server.shutdown()
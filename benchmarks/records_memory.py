@@ -0,0 +1,62 @@
+"""
+Compares the memory held by the results of a queue item listing built as
+full QueueItem objects (records=False) and as QueueItemRecords (records=True).
+
+The rows are decoded once and shared by both runs, so only the objects
+built on top of them are measured (tracemalloc). No request is sent.
+
+    python benchmarks/records_memory.py [num_items]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from orchestrator.orchestrator_queue import Queue
+
+NUM_ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+
+def rows(n):
+    return [{
+        "Id": i,
+        "Reference": f"INV-{i:08d}",
+        "Status": "New",
+        "Priority": "Normal",
+        "CreationTime": "2024-01-01T00:00:00.000Z",
+        "SpecificContent": {"Invoice": f"{i}", "Amount": i * 1.5},
+    } for i in range(1, n + 1)]
+
+
+def measure(build, data):
+    gc.collect()
+    start = time.perf_counter()
+    objects = [build(row) for row in data]
+    elapsed = time.perf_counter() - start
+    del objects
+    gc.collect()
+    tracemalloc.start()
+    objects = [build(row) for row in data]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size, elapsed
+
+
+def main():
+    queue = Queue("client_id", "refresh_token", "tenant", folder_id=1, folder_name="Folder",
+                  queue_name="Queue", queue_id=1, access_token="token")
+    data = rows(NUM_ITEMS)
+    results = {
+        "QueueItem": measure(queue._new_item, data),
+        "QueueItemRecord": measure(queue._new_item_record, data),
+    }
+    base = results["QueueItem"][0]
+    print(f"{NUM_ITEMS} queue items (memory of the objects, build time)")
+    for name, (size, elapsed) in results.items():
+        print(f"{name:>16}: {size / 2 ** 20:8.1f} MB  {size / NUM_ITEMS:6.0f} B/item  "
+              f"{elapsed:6.2f}s  ({base / size:.1f}x less memory than QueueItem)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,2 @@
 from .orchestrator import *
+from .orchestrator_async import *
@@ -13,3 +13,21 @@ class OrchestratorMissingParam(Exception):
     def __init__(self, value, message):
         super().__init__(self, message)
         self.value = value
+
+
+class OrchestratorRequestError(Exception):
+    def __init__(self, value, message):
+        super().__init__(self, message)
+        self.value = value
+
+
+class OrchestratorCircuitOpen(Exception):
+    def __init__(self, value, message):
+        super().__init__(self, message)
+        self.value = value
+
+
+class OrchestratorBusinessException(Exception):
+    def __init__(self, value, message):
+        super().__init__(self, message)
+        self.value = value
@@ -1,8 +1,6 @@
 
 from typing import List
 from orchestrator.orchestrator_http import OrchestratorHTTP
-import requests
-import json
 from urllib.parse import urlencode
 from orchestrator.orchestrator_folder import Folder
 from orchestrator.orchestrator_library import Library
@@ -27,7 +25,13 @@ class Orchestrator(OrchestratorHTTP):
     @folder_id: a folder id (optional)
     @session: a session object (options)
     @file: a credentials file containing client_id, refresh_token and tenant_name (optional) 
+    @pool_maxsize: connections kept alive by the client's pool, shared by every
+    entity derived from it (default 32)
     """
+    folder_fields = ("Id", "DisplayName")
+    process_fields = ("Id", "Key")
+    library_fields = ("Id", "Key")
+    machine_fields = ("Id",)
 
     def __init__(
         self,
@@ -36,54 +40,31 @@ class Orchestrator(OrchestratorHTTP):
         tenant_name=None,
         folder_id=None,
         session=None,
-        file=None
+        file=None,
+        pool_maxsize=None,
+        **kwargs
 
     ):
-
-        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session, file=file)
-        # if not client_id or not refresh_token:
-        #     raise OrchestratorAuthException(
-        #         value=None, message="client id and refresh token cannot be left empty"
-        #     )
-        # else:
-        #     self.client_id = client_id
-        if file:
-            self.base_url = f"{self.cloud_url}/{self.tenant_name}/JTBOT/odata"
-
-            try:
-                f = open(file)
-                data = json.load(f)
-                self.client_id = data["client_id"]
-                self.refresh_token = data["refresh_token"]
-                self.tenant_name = data["tenant_name"]
-            except KeyError:
-                raise
-        else:
-            self.client_id = client_id
-            self.refresh_token = refresh_token
-            self.tenant_name = tenant_name
-            self.folder_id = folder_id
-            self.base_url = f"{self.cloud_url}/{self.tenant_name}/JTBOT/odata"
-        if session:
-            # print("session set")
-            self.session = session
-        else:
-            # print("session not set")
-            self.session = requests.Session()
+        if not session:
+            session = self.new_session(pool_maxsize=pool_maxsize)
+        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session, file=file, **kwargs)
 
     def __str__(self):
         if self.folder_id:
             return f"Folder Id: {self.folder_id} \nTenant: {self.tenant_name}"
         return {f"Tenant: {self.tenant_name}"}
 
-    def get_folders(self, options=None):
+    def get_folders(self, options=None, fields=None):
         """
         Gets all the folders from a given organization
 
         @options: dictionary of odata filtering options
+        @fields: list of columns to download ($select), Id and
+        DisplayName are always included
         ========
         @returns: a list of Folders of the given organization
         """
+        options = self._select(options, fields, required=self.folder_fields)
         endpoint = "/Folders"
         if options:
             query_params = urlencode(options)
@@ -92,7 +73,27 @@ class Orchestrator(OrchestratorHTTP):
             url = f"{self.base_url}{endpoint}"
         data = self._get(url)
         filt_data = data['value']
-        return [Folder(self.client_id, self.refresh_token, self.tenant_name, self.session, folder["DisplayName"], folder["Id"], access_token=self.access_token) for folder in filt_data]
+        return [self._new_folder(folder) for folder in filt_data]
+
+    def iter_folders(self, options=None, page_size=None, fields=None):
+        """
+        Generator over all the folders of a given organization,
+        fetched one page at a time
+
+        @options: dictionary of odata filtering options
+        @page_size: number of folders per call (default 1000)
+        @fields: list of columns to download ($select)
+        ========
+        @yields: Folders of the given organization
+        """
+        options = self._select(options, fields, required=self.folder_fields)
+        for folder in self._iter_values("/Folders", options, page_size):
+            yield self._new_folder(folder)
+
+    def _new_folder(self, folder):
+        if "FullyQualifiedName" in folder:
+            self.name_index.get("folders").add(folder["Id"], folder["FullyQualifiedName"])
+        return Folder(self.client_id, self.refresh_token, self.tenant_name, self.session, folder["DisplayName"], folder["Id"], **self._shared_state())
 
     def get_folder_ids(self, options=None):
         """
@@ -104,11 +105,10 @@ class Orchestrator(OrchestratorHTTP):
             and the values the names of the folders in the given
             organization 
         """
-        folders = self.get_folders(options)
-        ids = {}
-        for folder in folders:
-            ids.update({folder.id: folder.name})
-        return ids
+        options = self._select(options, self.folder_fields + ("FullyQualifiedName",))
+        folders = self._get(self._odata_url("/Folders", options))["value"]
+        self.name_index.get("folders").update({folder["Id"]: folder["FullyQualifiedName"] for folder in folders})
+        return {folder["Id"]: folder["DisplayName"] for folder in folders}
 
     def get_folder_by_id(self, folder_id):
         """
@@ -118,20 +118,36 @@ class Orchestrator(OrchestratorHTTP):
         ==========
         @returns: a Folder object with the specified folder id
         """
-        ids = self.get_folder_ids()
+        path = self.name_index.get("folders").name(int(folder_id))
+        if path is None:
+            folder_name = self.get_folder_ids()[folder_id]
+        else:
+            folder_name = path.split("/")[-1]
         self.folder_id = folder_id
-        folder_name = ids[folder_id]
-        return Folder(client_id=self.client_id, refresh_token=self.refresh_token, tenant_name=self.tenant_name,  session=self.session, folder_name=folder_name, folder_id=int(folder_id), access_token=self.access_token)
+        return Folder(client_id=self.client_id, refresh_token=self.refresh_token, tenant_name=self.tenant_name, session=self.session, folder_name=folder_name,
+                      folder_id=int(folder_id), **self._shared_state())
 
     def get_folder_by_name(self, folder_name):
         """
             Returns a single folder by its name
 
+            Folders are looked up by their fully qualified name first
+            (e.g. "Finance/Prod"), then by their display name. Names
+            already resolved are taken from the client's index without
+            calling the API.
+
             @folder_name: the name of the folder
             ============
-            @returns: a Folder object with the specified folder_name
+            @returns: a Folder object with the specified folder_name,
+            or None if there is no such folder
         """
-        pass
+        index = self.name_index.get("folders")
+        folder_id = self._lookup_id("/Folders", index, folder_name, column="FullyQualifiedName")
+        if folder_id is None and "/" not in folder_name:
+            folder_id = self._lookup_id("/Folders", index, folder_name, column="DisplayName")
+        if folder_id is None:
+            return None
+        return self._new_folder({"Id": folder_id, "DisplayName": folder_name.split("/")[-1]})
 
     def usernames(self, options=None):
         """
@@ -155,14 +171,17 @@ class Orchestrator(OrchestratorHTTP):
             url = f"{self.base_url}{endpoint}"
         return self._get(url)
 
-    def get_processes(self, options=None):
+    def get_processes(self, options=None, fields=None):
         """
         Gets all the processes of a given organization
 
         @options: a dictionary of odata filtering options
+        @fields: list of columns to download ($select), Id and
+        Key are always included
         ========
         @returns: a list of Processes of the given organization
         """
+        options = self._select(options, fields, required=self.process_fields)
         endpoint = "/Processes"
         if options:
             query_params = urlencode(options)
@@ -170,7 +189,24 @@ class Orchestrator(OrchestratorHTTP):
         else:
             url = f"{self.base_url}{endpoint}"
         processes = self._get(url)["value"]
-        return [Process(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.session, process["Id"], process["Title"], process["Version"], process["Key"], access_token=self.access_token) for process in processes]
+        return [self._new_process(process) for process in processes]
+
+    def iter_processes(self, options=None, page_size=None, fields=None):
+        """
+        Generator over all the processes of a given organization,
+        fetched one page at a time
+
+        @options: a dictionary of odata filtering options
+        @page_size: number of processes per call (default 1000)
+        @fields: list of columns to download ($select)
+        """
+        options = self._select(options, fields, required=self.process_fields)
+        for process in self._iter_values("/Processes", options, page_size):
+            yield self._new_process(process)
+
+    def _new_process(self, process):
+        return Process(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.session, process["Id"], process.get("Title"),
+                       process.get("Version"), process["Key"], **self._shared_state())
 
     def get_processes_keys(self, options=None):
         """
@@ -182,11 +218,9 @@ class Orchestrator(OrchestratorHTTP):
             key and the values the process' title of the processes 
             in the given organization
         """
-        processes = self.get_processes(options=options)
-        ids = {}
-        for process in processes:
-            ids.update({process.key: process.title})
-        return ids
+        options = self._select(options, ["Key", "Title"])
+        processes = self._get(self._odata_url("/Processes", options))["value"]
+        return {process["Key"]: process["Title"] for process in processes}
 
     def get_process_by_key(self, process_key):
         """
@@ -202,17 +236,19 @@ class Orchestrator(OrchestratorHTTP):
         endpoint = "/Processes"
         url = f"{self.base_url}{endpoint}?{query_param}"
         process = self._get(url)["value"][0]
-        return Process(self.client_id, self.refresh_token, self.tenant_name, self.folder_id,
-                       self.session, process["Id"], process["Title"], process["Version"], process["Key"], access_token=self.access_token)
+        return self._new_process(process)
 
-    def get_libraries(self, options=None):
+    def get_libraries(self, options=None, fields=None):
         """
         Gets all the libraries of a given organization
 
         @options: a dictionary of odata filtering options
+        @fields: list of columns to download ($select), Id and
+        Key are always included
         ========
         @returns: a list of Libraries of the given organization
         """
+        options = self._select(options, fields, required=self.library_fields)
         endpoint = "/Libraries"
         if options:
             query_params = urlencode(options)
@@ -220,12 +256,30 @@ class Orchestrator(OrchestratorHTTP):
         else:
             url = f"{self.base_url}{endpoint}"
         libraries = self._get(url)["value"]
-        return [Library(self.client_id, self.refresh_token, self.tenant_name, self.session,  lib["Key"], lib["Id"], lib["Title"], self.folder_id, access_token=self.access_token) for lib in libraries]
+        return [self._new_library(lib) for lib in libraries]
+
+    def iter_libraries(self, options=None, page_size=None, fields=None):
+        """
+        Generator over all the libraries of a given organization,
+        fetched one page at a time
+        """
+        options = self._select(options, fields, required=self.library_fields)
+        for lib in self._iter_values("/Libraries", options, page_size):
+            yield self._new_library(lib)
 
-    def get_machines(self, options=None):
+    def _new_library(self, lib):
+        return Library(self.client_id, self.refresh_token, self.tenant_name, self.session, lib["Key"], lib["Id"], lib.get("Title"), self.folder_id,
+                       **self._shared_state())
+
+    def get_machines(self, options=None, fields=None):
         """
         Gets all the machines of a given organization 
+
+        @options: dictionary of odata filtering options
+        @fields: list of columns to download ($select), Id is
+        always included
         """
+        options = self._select(options, fields, required=self.machine_fields)
         endpoint = "/Machines"
         if options:
             query_params = urlencode(options)
@@ -233,7 +287,20 @@ class Orchestrator(OrchestratorHTTP):
         else:
             url = f"{self.base_url}{endpoint}"
         data = self._get(url)["value"]
-        return [Machine(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.session, machine["Id"], machine["Key"], machine["Name"]) for machine in data]
+        return [self._new_machine(machine) for machine in data]
+
+    def iter_machines(self, options=None, page_size=None, fields=None):
+        """
+        Generator over all the machines of a given organization,
+        fetched one page at a time
+        """
+        options = self._select(options, fields, required=self.machine_fields)
+        for machine in self._iter_values("/Machines", options, page_size):
+            yield self._new_machine(machine)
+
+    def _new_machine(self, machine):
+        return Machine(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.session, machine["Id"], machine.get("Key"),
+                       machine.get("Name"), **self._shared_state())
 
     def get_machine_ids(self, options=None):
         """
@@ -242,11 +309,9 @@ class Orchestrator(OrchestratorHTTP):
 
         @options: dictionary of odata filtering options 
         """
-        machines = self.get_machines(options)
-        ids = {}
-        for machine in machines:
-            ids.update({machine.id: machine.name})
-        return ids
+        options = self._select(options, ["Id", "Name"])
+        machines = self._get(self._odata_url("/Machines", options))["value"]
+        return {machine["Id"]: machine["Name"] for machine in machines}
 
     def get_machine_by_id(self, machine_id):
         """
@@ -258,4 +323,5 @@ class Orchestrator(OrchestratorHTTP):
         endpoint = f"/Machines({machine_id})"
         url = f"{self.base_url}{endpoint}"
         machine = self._get(url)
-        return Machine(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.session, machine_id, machine["Key"], machine["Name"], access_token=self.access_token)
+        return Machine(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.session, machine_id, machine["Key"], machine["Name"],
+                       **self._shared_state())
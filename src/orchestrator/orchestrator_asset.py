@@ -1,5 +1,4 @@
 from orchestrator.orchestrator_http import OrchestratorHTTP
-import requests
 from orchestrator.exceptions import OrchestratorMissingParam
 
 """
@@ -37,23 +36,17 @@ class Asset(OrchestratorHTTP):
 
     """
 
-    def __init__(self, client_id, refresh_token, tenant_name, folder_id=None, folder_name=None, session=None, asset_id=None, asset_name=None, access_token=None):
+    def __init__(self, client_id=None, refresh_token=None, tenant_name=None, folder_id=None, folder_name=None, session=None, asset_id=None, asset_name=None,
+                 access_token=None, **kwargs):
         """Constructor"""
-        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session)
+        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session,
+                         access_token=access_token, **kwargs)
         if not asset_id:
             raise OrchestratorMissingParam(value="asset_id",
                                            message="Required parameter(s) missing: asset_id")
-        self.tenant_name = tenant_name
-        self.base_url = f"{self.cloud_url}/{self.tenant_name}/JTBOT/odata"
-        self.folder_id = folder_id
-        self.access_token = access_token
         self.folder_name = folder_name
         self.id = asset_id
         self.name = asset_name
-        if session:
-            self.session = session
-        else:
-            self.session = requests.Session()
 
     def __str__(self):
         return f"Asset Id: {self.id} \nAsset Name: {self.name} \nFolder Id: {self.folder_id} \nFolder Name: {self.folder_name}"
@@ -75,9 +68,11 @@ class Asset(OrchestratorHTTP):
         """
         endpoint = f"/Assets({self.id})"
         url = f"{self.base_url}{endpoint}"
+        self.name_index.get("assets", self.folder_id).discard(self.id)
         return self._put(url, body=body)
 
     def delete(self, body=None):
         endpoint = f"/Assets({self.id})"
         url = f"{self.base_url}{endpoint}"
+        self.name_index.get("assets", self.folder_id).discard(self.id)
         return self._delete(url, body=body)
@@ -0,0 +1,680 @@
+import asyncio
+import json
+import logging
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+from urllib.parse import urlparse
+from uuid import uuid4
+
+from orchestrator.exceptions import OrchestratorMissingParam, OrchestratorRequestError, OrchestratorCircuitOpen
+from orchestrator.orchestrator import Orchestrator
+from orchestrator.orchestrator_asset import Asset
+from orchestrator.orchestrator_bulk import BulkResult, chunk_items, read_rows
+from orchestrator.orchestrator_folder import Folder
+from orchestrator.orchestrator_http import OrchestratorHTTP
+from orchestrator.orchestrator_job import Job
+from orchestrator.orchestrator_logs import LogTail
+from orchestrator.orchestrator_queue import Queue
+from orchestrator.orchestrator_queue_item import QueueItem
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    _HTTPBase = OrchestratorHTTP
+else:
+    _HTTPBase = object
+
+__all__ = ["AsyncOrchestrator"]
+
+"""
+Asyncio counterparts of the Orchestrator entities. Every Async* class is a
+subclass of its blocking counterpart (an AsyncQueue is a Queue), but the
+methods overridden here are coroutines that go through a single aiohttp
+session shared by every entity derived from the same AsyncOrchestrator.
+The blocking methods that have no coroutine version raise NotImplementedError.
+"""
+
+
+class AsyncSessionPool(object):
+    """
+    The aiohttp.ClientSession shared by an AsyncOrchestrator and every
+    entity derived from it. It is created on first use, so the entities
+    created before it share it too.
+
+    @session: an aiohttp.ClientSession to use instead (optional)
+    @limit: maximum number of simultaneous connections (default 100)
+    """
+
+    def __init__(self, session=None, limit=100):
+        self.session = session
+        self.limit = limit
+
+    def get(self):
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for the async client: pip install python-orchestrator[async]")
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.limit))
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+
+def _blocking(name):
+    """
+    Method of an async entity whose blocking counterpart has no coroutine version
+    """
+    def method(self, *args, **kwargs):
+        raise NotImplementedError(f"{type(self).__name__}.{name} makes blocking calls and has no async version: "
+                                  f"use the blocking {type(self).__bases__[-1].__name__} instead")
+    method.__name__ = name
+    method.__doc__ = "Not available on the async client (blocking call)"
+    return method
+
+
+class AsyncOrchestratorHTTP(_HTTPBase):
+    """
+    Mixin adding a non blocking transport on top of OrchestratorHTTP.
+
+    It expects the attributes set up by OrchestratorHTTP (base_url,
+    folder_id, token_manager...) and shares an AsyncSessionPool with every
+    entity derived from it. The inherited blocking calls are disabled: the
+    methods listed in `blocking_methods` raise NotImplementedError, and so
+    does any other method reaching the blocking transport.
+
+    @async_session: an aiohttp.ClientSession to use (optional)
+    @async_pool: the AsyncSessionPool of the parent entity (optional)
+    @connection_limit: maximum number of simultaneous connections (default 100)
+    """
+    connection_limit = 100
+    blocking_methods: Tuple[str, ...] = ("batch",)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.blocking_methods:
+            setattr(cls, name, _blocking(name))
+
+    def __init__(self, *args, async_session=None, async_pool=None, connection_limit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if connection_limit:
+            self.connection_limit = connection_limit
+        self.async_pool = async_pool or AsyncSessionPool(async_session, self.connection_limit)
+
+    @property
+    def async_session(self):
+        return self.async_pool.session
+
+    def _get_async_session(self):
+        return self.async_pool.get()
+
+    async def close(self):
+        """
+        Closes the connection pool shared with the related entities
+        """
+        await self.async_pool.close()
+
+    async def __aenter__(self):
+        self._get_async_session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _shared_state(self):
+        state = super()._shared_state()
+        state["async_pool"] = self.async_pool
+        return state
+
+    def _internal_call(self, method, endpoint, *args, idempotent=None, **kwargs):
+        raise NotImplementedError(f"Blocking {method} call from {type(self).__name__}: use the coroutine methods of the async client")
+
+    async def _aget_token(self):
+        return await self.token_manager.arefresh(self._get_async_session(), stale=self.access_token)
+
+    @staticmethod
+    async def _aread(r):
+        try:
+            return await r.json(content_type=None)
+        except ValueError:
+            return await r.text()
+
+    async def _ainternal_call(self, method, endpoint, body=None, idempotent=None):
+        session = self._get_async_session()
+        token = await self.token_manager.aget_token(session)
+        headers = self._auth_header(token)
+        if method == "POST":
+            headers.update(self._content_header())
+        if self.folder_id:
+            headers.update(self._folder_header())
+        cached = self._cached(method, endpoint, headers)
+        if cached is not None and not cached.expired:
+            return cached.value()
+        response_headers: Dict[str, Any] = {}
+        status, data = await self._asend(session, method, endpoint, headers, body, idempotent, response_headers)
+        if status == 401:
+            token = await self.token_manager.arefresh(session, stale=token)
+            headers.update(self._auth_header(token))
+            status, data = await self._asend(session, method, endpoint, headers, body, idempotent, response_headers)
+        if cached is not None and status == 304:
+            self.response_cache.revalidated(cached)
+            return cached.value()
+        if method == "GET" and status == 200 and self.response_cache is not None:
+            self.response_cache.put(endpoint, self.folder_id, json.dumps(data).encode("utf-8"), response_headers.get("ETag"))
+        if status not in range(200, 400):
+            logging.error(f"An error ocurred.\nStatus code: {status}")
+        logging.debug(f"{status} ---- {endpoint}")
+        return data
+
+    async def _asend(self, session, method, endpoint, headers, body=None, idempotent=None, response_headers=None):
+        """
+        Coroutine version of OrchestratorHTTP._send. Returns the status code
+        and the decoded body of the response, and leaves the ETag of the
+        response in `response_headers` if given.
+        """
+        policy = self.retry_policy
+        host = urlparse(endpoint).netloc
+        breaker = policy.breaker(host)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                policy.record(attempt, exhausted=True)
+                raise OrchestratorCircuitOpen(value=host, message=f"Circuit open for {host}: too many consecutive failures")
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async(method, endpoint)
+            try:
+                async with session.request(method, endpoint, json=body, headers=headers) as r:
+                    status = r.status
+                    retry_after = policy.parse_retry_after(r.headers.get("Retry-After"))
+                    data = await self._aread(r)
+                    if response_headers is not None:
+                        response_headers.update({"ETag": r.headers.get("ETag")})
+            except aiohttp.ClientError as err:
+                breaker.record_failure()
+                sent = not isinstance(err, aiohttp.ClientConnectorError)
+                if attempt < policy.total and policy.should_retry_error(method, sent=sent, idempotent=idempotent):
+                    wait = policy.backoff(attempt)
+                    logging.warning(f"{method} {endpoint} failed ({err}), retrying in {wait:.2f}s")
+                    await asyncio.sleep(wait)
+                    attempt += 1
+                    continue
+                self.last_retries = attempt
+                policy.record(attempt, exhausted=attempt > 0)
+                raise
+            if self.rate_limiter:
+                if status == 429:
+                    self.rate_limiter.throttled(method, endpoint, retry_after)
+                else:
+                    self.rate_limiter.succeeded(method, endpoint)
+            if status >= 500:
+                breaker.record_failure()
+            elif status == 429:
+                breaker.record_throttled()
+            else:
+                breaker.record_success()
+            if policy.should_retry_status(method, status, retry_after, idempotent):
+                if attempt < policy.total:
+                    wait = policy.backoff(attempt, status, retry_after)
+                    logging.warning(f"{method} {endpoint} returned {status}, retrying in {wait:.2f}s")
+                    await asyncio.sleep(wait)
+                    attempt += 1
+                    continue
+                self.last_retries = attempt
+                policy.record(attempt, exhausted=True)
+                if policy.raise_on_exhausted:
+                    raise OrchestratorRequestError(value=status, message=f"{method} {endpoint} failed with status {status} after {attempt} retries")
+                return status, data
+            self.last_retries = attempt
+            policy.record(attempt)
+            return status, data
+
+    async def _aget(self, url):
+        return await self._ainternal_call("GET", url)
+
+    async def _apost(self, url, body=None, idempotent=None):
+        return await self._ainternal_call("POST", url, body=body, idempotent=idempotent)
+
+    async def _aput(self, url, body=None):
+        return await self._ainternal_call("PUT", url, body=body)
+
+    async def _adelete(self, url, body=None):
+        return await self._ainternal_call("DELETE", url, body=body)
+
+    async def _alookup_id(self, endpoint, index, value, column="Name"):
+        entity_id = index.id(value)
+        if entity_id is None:
+            data = await self._aget(self._odata_url(endpoint, self._lookup_query(column, value)))
+            entity_id = self._indexed(data["value"], index, value)
+        return entity_id
+
+    async def _acount(self, endpoint, options=None):
+        data = await self._aget(self._odata_url(endpoint, self._count_query(options)))
+        return int(data["@odata.count"])
+
+
+class AsyncOrchestrator(AsyncOrchestratorHTTP, Orchestrator):
+    """
+    Asyncio client for UiPath's Orchestrator's API.
+
+    Takes the same arguments as Orchestrator plus:
+
+    @connection_limit: maximum number of simultaneous connections of
+    the shared pool (default 100)
+    @async_session: an aiohttp.ClientSession to reuse (optional)
+
+    The async_session is created on first use and shared by every entity
+    derived from the client, even the ones created before it was opened.
+
+    The client should be closed when done, either with `await client.close()`
+    or by using it as an async context manager:
+
+        async with AsyncOrchestrator(...) as client:
+            folders = await client.get_folders()
+    """
+
+    blocking_methods = ("batch", "get_libraries", "get_machine_by_id", "get_machine_ids", "get_machines", "get_process_by_key", "get_processes",
+                        "get_processes_keys", "iter_folders", "iter_libraries", "iter_machines", "iter_processes", "permissions", "usernames")
+
+    def __init__(
+        self,
+        client_id=None,
+        refresh_token=None,
+        tenant_name=None,
+        folder_id=None,
+        session=None,
+        file=None,
+        connection_limit=None,
+        async_session=None,
+        **kwargs
+    ):
+        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session, file=file,
+                         async_session=async_session, connection_limit=connection_limit, **kwargs)
+
+    async def get_folders(self, options=None, fields=None):
+        """
+        Gets all the folders from a given organization
+
+        @options: dictionary of odata filtering options
+        @fields: list of columns to download ($select)
+        ========
+        @returns: a list of AsyncFolders of the given organization
+        """
+        options = self._select(options, fields, required=self.folder_fields)
+        data = await self._aget(self._odata_url("/Folders", options))
+        return [self._new_folder(folder) for folder in data['value']]
+
+    def _new_folder(self, folder):
+        if "FullyQualifiedName" in folder:
+            self.name_index.get("folders").add(folder["Id"], folder["FullyQualifiedName"])
+        return AsyncFolder(self.client_id, self.refresh_token, self.tenant_name, self.session, folder["DisplayName"], folder["Id"], **self._shared_state())
+
+    async def get_folder_ids(self, options=None):
+        data = await self._aget(self._odata_url("/Folders", self._select(options, self.folder_fields + ("FullyQualifiedName",))))
+        self.name_index.get("folders").update({folder["Id"]: folder["FullyQualifiedName"] for folder in data["value"]})
+        return {folder["Id"]: folder["DisplayName"] for folder in data["value"]}
+
+    async def get_folder_by_id(self, folder_id):
+        path = self.name_index.get("folders").name(int(folder_id))
+        folder_name = (await self.get_folder_ids())[folder_id] if path is None else path.split("/")[-1]
+        self.folder_id = folder_id
+        return AsyncFolder(client_id=self.client_id, refresh_token=self.refresh_token, tenant_name=self.tenant_name, session=self.session,
+                           folder_name=folder_name, folder_id=int(folder_id), **self._shared_state())
+
+    async def get_folder_by_name(self, folder_name):
+        index = self.name_index.get("folders")
+        folder_id = await self._alookup_id("/Folders", index, folder_name, column="FullyQualifiedName")
+        if folder_id is None and "/" not in folder_name:
+            folder_id = await self._alookup_id("/Folders", index, folder_name, column="DisplayName")
+        if folder_id is None:
+            return None
+        return self._new_folder({"Id": folder_id, "DisplayName": folder_name.split("/")[-1]})
+
+
+class AsyncFolder(AsyncOrchestratorHTTP, Folder):
+    blocking_methods = ("batch", "create_asset", "get_machine_runtime_sessions", "get_process_schedules",
+                        "get_processing_records", "get_schedule_ids", "get_sessions", "iter_assets", "iter_job_triggers",
+                        "iter_jobs", "iter_process_schedules", "iter_queues", "iter_sessions", "job_triggers", "jobs_to_arrow",
+                        "jobs_to_frame")
+
+    async def info(self):
+        return await self._aget(f"{self.base_url}/Folders({self.id})")
+
+    async def get_queues(self, options=None, fields=None):
+        options = self._select(options, fields, required=self.queue_fields)
+        data = await self._aget(self._odata_url("/QueueDefinitions", options))
+        return [self._new_queue(queue) for queue in data['value']]
+
+    def _new_queue(self, queue):
+        self.name_index.get("queues", self.id).add(queue["Id"], queue["Name"])
+        return AsyncQueue(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, queue["Name"], queue["Id"],
+                          **self._shared_state())
+
+    async def get_queue_ids(self, options=None):
+        data = await self._aget(self._odata_url("/QueueDefinitions", self._select(options, self.queue_fields)))
+        ids = {queue["Id"]: queue["Name"] for queue in data["value"]}
+        self.name_index.get("queues", self.id).update(ids)
+        return ids
+
+    async def get_queue_by_id(self, queue_id):
+        queue_name = self.name_index.get("queues", self.id).name(int(queue_id))
+        if queue_name is None:
+            queue_name = (await self.get_queue_ids())[queue_id]
+        return AsyncQueue(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, queue_name, queue_id=int(queue_id),
+                          **self._shared_state())
+
+    async def get_queue_by_name(self, queue_name):
+        queue_id = await self._alookup_id("/QueueDefinitions", self.name_index.get("queues", self.id), queue_name)
+        if queue_id is None:
+            return None
+        return self._new_queue({"Id": queue_id, "Name": queue_name})
+
+    async def get_assets(self, options=None, fields=None):
+        options = self._select(options, fields, required=self.asset_fields)
+        data = await self._aget(self._odata_url("/Assets", options))
+        return [self._new_asset(asset) for asset in data['value']]
+
+    def _new_asset(self, asset):
+        self.name_index.get("assets", self.id).add(asset["Id"], asset["Name"])
+        return AsyncAsset(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, asset["Id"], asset["Name"],
+                          **self._shared_state())
+
+    async def get_asset_ids(self, options=None):
+        data = await self._aget(self._odata_url("/Assets", self._select(options, self.asset_fields)))
+        ids = {asset["Id"]: asset["Name"] for asset in data["value"]}
+        self.name_index.get("assets", self.id).update(ids)
+        return ids
+
+    async def get_asset_by_id(self, asset_id):
+        asset_name = self.name_index.get("assets", self.id).name(int(asset_id))
+        if asset_name is None:
+            asset_name = (await self.get_asset_ids())[asset_id]
+        return AsyncAsset(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, asset_id, asset_name, **self._shared_state())
+
+    async def get_asset_by_name(self, asset_name):
+        asset_id = await self._alookup_id("/Assets", self.name_index.get("assets", self.id), asset_name)
+        if asset_id is None:
+            return None
+        return self._new_asset({"Id": asset_id, "Name": asset_name})
+
+    async def get_jobs(self, top="100", options=None, fields=None, expand=None, records=False):
+        default = {"$orderby": "StartTime desc", "$top": f"{top}"}
+        if options:
+            default.update(options)
+        data = await self._aget(self._odata_url("/Jobs", self._select(default, fields, expand, required=self.job_fields)))
+        new_job = self._job_factory(records)
+        return [new_job(job) for job in data["value"]]
+
+    def _new_job(self, job):
+        return AsyncJob(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, job["Id"], job["Key"], job["ReleaseName"],
+                        **self._shared_state())
+
+    async def get_job_keys(self, top="100", options=None):
+        query = {"$orderby": "StartTime desc", "$top": f"{top}"}
+        query.update(options or {})
+        data = await self._aget(self._odata_url("/Jobs", self._select(query, ["Key", "ReleaseName"])))
+        return {job["Key"]: job["ReleaseName"] for job in data["value"]}
+
+    async def count_jobs(self, state=None, filter=None):
+        odata_filter = self._and_filter(f"State eq '{state}'" if state else None, filter)
+        return await self._acount("/Jobs", {"$filter": odata_filter} if odata_filter else None)
+
+    async def count_sessions(self, filter=None):
+        return await self._acount("/Sessions", {"$filter": filter} if filter else None)
+
+    async def get_job_by_key(self, key):
+        data = (await self._aget(self._odata_url("/Jobs", {"$filter": f"Key eq {key}"})))["value"][0]
+        return self._new_job(data)
+
+
+class AsyncQueue(AsyncOrchestratorHTTP, Queue):
+    blocking_methods = ("batch", "changes", "check_duplicates", "consume", "consumer", "get_processing_records",
+                        "get_queue_item_comments", "items_to_arrow", "items_to_frame", "iter_queue_items", "reference_index",
+                        "scan_queue_items")
+
+    async def info(self):
+        return await self._aget(f"{self.base_url}/QueueDefinitions({self.id})")
+
+    async def start(self, machine_identifier, specific_content=None, references=None, separator="-", fields=None):
+        logging.debug("Starting new transaction")
+        body = self._format_start_body(machine_identifier, specific_content, references, separator, fields)
+        return await self._apost(f"{self.base_url}/Queues/UiPathODataSvc.StartTransaction", body=body)
+
+    def get_item_by_id(self, item_id):
+        return AsyncQueueItem(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.folder_name, self.name, self.id, self.session, item_id,
+                              **self._shared_state())
+
+    def _new_item(self, item):
+        return AsyncQueueItem(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.folder_name, self.name, self.id, session=self.session,
+                              item_id=item["Id"], content=item.get("SpecificContent"), reference=item.get("Reference"), **self._shared_state())
+
+    def _items_from(self, data, records=False):
+        new_item = self._item_factory(records)
+        return [new_item(item) for item in data['value']]
+
+    async def get_queue_items(self, options=None, fields=None, records=False):
+        odata_filter = self._select({"$filter": self._queue_filter(options)["$filter"]}, fields, required=self.item_fields)
+        return self._items_from(await self._aget(self._odata_url("/QueueItems", odata_filter)), records)
+
+    async def get_queue_items_by_status(self, status, fields=None, records=False):
+        odata_filter = self._select({"$filter": f"QueueDefinitionId eq {self.id} and Status eq '{status}'"}, fields, required=self.item_fields)
+        return self._items_from(await self._aget(self._odata_url("/QueueItems", odata_filter)), records)
+
+    async def count_items(self, status=None, filter=None):
+        return await self._acount("/QueueItems", self._status_filter(status, filter))
+
+    async def count_items_by_status(self, statuses=None, filter=None, max_workers=5):
+        statuses = list(statuses or self.item_statuses)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def count(status):
+            async with semaphore:
+                return await self.count_items(status, filter)
+
+        counts = await asyncio.gather(*(count(status) for status in statuses))
+        return dict(zip(statuses, counts))
+
+    async def get_queue_items_ids(self, options=None):
+        odata_filter = self._select({"$filter": self._queue_filter(options)["$filter"]}, self.item_fields)
+        data = await self._aget(self._odata_url("/QueueItems", odata_filter))
+        return {item["Id"]: self.name for item in data["value"]}
+
+    async def check_duplicate(self, reference):
+        filt_items = await self.get_queue_items(options={"$filter": f"contains(Reference, '{reference}') and Status eq 'Successful'"})
+        if len(filt_items) > 0:
+            return filt_items[0]
+        return False
+
+    async def add_queue_item(self, specific_content=None, priority="Low"):
+        if not specific_content:
+            raise OrchestratorMissingParam(value="specific_content", message="specific content cannot be null")
+        body = {
+            "itemData": {
+                "Priority": priority,
+                "Name": self.name,
+                "SpecificContent": specific_content,
+                "Reference": self.generate_reference(),
+            }
+        }
+        return await self._apost(f"{self.base_url}/Queues/UiPathODataSvc.AddQueueItem", body=body)
+
+    async def bulk_create_items(self, specific_contents=None, priority="Low", progress="New", reference=None,
+                                commit_type="StopOnFirstFailure", chunk_size=None, max_bytes=None, max_workers=None):
+        if not specific_contents:
+            raise OrchestratorMissingParam(value="specific_contents", message="specific contents cannot be null")
+        batch_id = str(uuid4())
+        items = ((i, self._format_specific_content(sp_content=sp_content, reference=reference, priority=priority, progress=progress, batch_id=batch_id))
+                 for i, sp_content in enumerate(specific_contents))
+        return await self._abulk_submit(items, batch_id, commit_type, chunk_size, max_bytes, max_workers)
+
+    async def ingest_file(self, path, format=None, reference=None, chunk_size=None, priority="Low", progress="New",
+                          commit_type="StopOnFirstFailure", max_bytes=None, max_workers=None, encoding="utf-8", delimiter=",", on_progress=None):
+        batch_id = str(uuid4())
+        rows = read_rows(path, format=format, encoding=encoding, delimiter=delimiter)
+        items = ((i, self._format_specific_content(sp_content=row, reference=reference, priority=priority, progress=progress, batch_id=batch_id))
+                 for i, row in enumerate(rows))
+        return await self._abulk_submit(items, batch_id, commit_type, chunk_size, max_bytes, max_workers, on_progress or self._log_ingest)
+
+    async def _abulk_submit(self, items, batch_id, commit_type="StopOnFirstFailure", chunk_size=None, max_bytes=None, max_workers=None, on_chunk=None):
+        url = f"{self.base_url}/Queues/UiPathODataSvc.BulkAddQueueItems"
+        max_workers = max_workers or self.bulk_workers
+        chunks = chunk_items(items, chunk_size or self.bulk_chunk_size, max_bytes or self.bulk_max_bytes)
+        result = BulkResult(batch_id, commit_type)
+        stop = False
+
+        def send(chunk):
+            return asyncio.ensure_future(self._apost(url, body=self._bulk_chunk_body(chunk, commit_type)))
+
+        pending = {send(chunk): chunk for chunk in islice(chunks, max_workers)}
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    failed = result.add(chunk, data=future.result())
+                except Exception as err:
+                    failed = result.add(chunk, error=err)
+                if failed and commit_type in self.bulk_stopping_commits:
+                    stop = True
+                if on_chunk:
+                    on_chunk(result)
+            if not stop:
+                pending.update({send(chunk): chunk for chunk in islice(chunks, len(done))})
+        if stop:
+            result.stopped = next(chunks, None) is not None
+            logging.warning(f"Bulk insert into {self.name} stopped after a failed call ({commit_type})")
+        return result.finish()
+
+    async def bulk_dataframe(self, df, priority="Low", progress="New", reference=None,
+                             commit_type="StopOnFirstFailure", chunk_size=None, max_bytes=None, max_workers=None):
+        if df is None or df.empty:
+            raise OrchestratorMissingParam(value="df", message="dataframe cannot be empty")
+        batch_id = str(uuid4())
+        items = self._dataframe_items(df, priority=priority, progress=progress, reference=reference, batch_id=batch_id)
+        return await self._abulk_submit(items, batch_id, commit_type, chunk_size, max_bytes, max_workers)
+
+    async def edit_queue(self, name=None, description=None):
+        if not name or not description:
+            raise OrchestratorMissingParam(value="name/description", message="name and/or description cannot be null")
+        body = {
+            "Name": name,
+            "Description": description
+        }
+        self.name_index.get("queues", self.folder_id).discard(self.id)
+        return await self._aput(f"{self.base_url}/QueueDefinitions({self.id})", body=body)
+
+    async def delete_queue(self):
+        self.name_index.get("queues", self.folder_id).discard(self.id)
+        return await self._adelete(f"{self.base_url}/QueueDefinitions({self.id})")
+
+
+class AsyncQueueItem(AsyncOrchestratorHTTP, QueueItem):
+    """
+    Queue item whose calls are coroutines. Transaction results and progress
+    updates are always sent directly: the ResultSink of the client is ignored.
+    """
+    blocking_methods = ("batch", "events")
+
+    async def content(self):
+        info = await self.info()
+        return info["SpecificContent"]
+
+    async def info(self):
+        return await self._aget(f"{self.base_url}/QueueItems({self.id})")
+
+    async def delete(self):
+        return await self._adelete(f"{self.base_url}/QueueItems({self.id})")
+
+    async def edit(self, body=None):
+        return await self._aput(f"{self.base_url}/QueueItems({self.id})", body=body)
+
+    async def last_entry(self):
+        return await self._aget(f"{self.base_url}/QueueItems({self.id})/UiPath.Server.Configuration.OData.GetItemLastRetry")
+
+    async def history(self):
+        return (await self._aget(f"{self.base_url}/QueueItems({self.id})/UiPathODataSvc.GetItemProcessingHistory"))["value"]
+
+    async def set_transaction_progress(self, status=None):
+        if not status:
+            raise OrchestratorMissingParam(value="status", message="status cannot be None")
+        url = f"{self.base_url}/QueueItems({self.id})/UiPathODataSvc.SetTransactionProgress"
+        return await self._apost(url, body={"progress": status}, idempotent=True)
+
+    async def set_transaction_status(self, success: bool, reason=None, details=None, exception_type=None, fail_reason=None):
+        url = f"{self.base_url}/Queues({self.id})/UiPathODataSvc.SetTransactionResult"
+        body = self._format_transaction_result(success, reason, details, exception_type, fail_reason)
+        return await self._apost(url, body=body)
+
+    async def make_comment(self, text=None):
+        body = {
+            "Text": text,
+            "QueueItemId": self.id
+        }
+        return await self._apost(f"{self.base_url}/QueueItemComments", body=body)
+
+
+class AsyncJob(AsyncOrchestratorHTTP, Job):
+    blocking_methods = ("batch", "iter_logs", "logs_to_arrow", "logs_to_frame", "scan_logs")
+
+    async def info(self):
+        return await self._aget(f"{self.base_url}/Jobs({self.id})")
+
+    async def stop(self):
+        url = f"{self.base_url}/Jobs({self.id})/UiPath.Server.Configuration.OData.StopJob"
+        return await self._apost(url, body={"strategy": "SoftStop"})
+
+    async def kill(self):
+        url = f"{self.base_url}/Jobs({self.id})/UiPath.Server.Configuration.OData.StopJob"
+        return await self._apost(url, body={"strategy": "Kill"})
+
+    async def restart(self):
+        url = f"{self.base_url}/Jobs/UiPath.Server.Configuration.OData.RestartJob"
+        return await self._apost(url, body={"jobId": self.id})
+
+    async def resume(self):
+        url = f"{self.base_url}/Jobs/UiPath.Server.Configuration.OData.ResumeJob"
+        return await self._apost(url, body={"jobKey": self.key})
+
+    async def count_logs(self, trace=None, filter=None):
+        return await self._acount("/RobotLogs", {"$filter": self._and_filter(self._logs_filter(trace), filter)})
+
+    async def get_logs(self, trace="Info", fields=None, records=False):
+        query_param = self._select({
+            "$filter": self._logs_filter(trace),
+            "$orderby": "TimeStamp desc"
+        }, fields)
+        logs = (await self._aget(self._odata_url("/RobotLogs", query_param)))["value"]
+        new_log = self._log_factory(records)
+        return [new_log(log) for log in logs]
+
+    async def tail_logs(self, levels=None, poll_interval=2, max_interval=30, since=None, until_finished=True, page_size=None,
+                        fields=None, records=True):
+        tail = LogTail(self, levels, poll_interval, max_interval, since, page_size, fields)
+        new_log = self._log_factory(records)
+        while True:
+            page = (await self._aget(self._odata_url("/RobotLogs", tail.query())))["value"]
+            for log in page:
+                yield new_log(log)
+            delay = tail.advance(page)
+            if not page and until_finished:
+                if tail.finished:
+                    return
+                tail.finished = (await self.info()).get("State") in self.final_states
+            if delay:
+                await asyncio.sleep(delay)
+
+
+class AsyncAsset(AsyncOrchestratorHTTP, Asset):
+
+    async def info(self):
+        return await self._aget(f"{self.base_url}/Assets({self.id})")
+
+    async def edit(self, body=None):
+        self.name_index.get("assets", self.folder_id).discard(self.id)
+        return await self._aput(f"{self.base_url}/Assets({self.id})", body=body)
+
+    async def delete(self, body=None):
+        self.name_index.get("assets", self.folder_id).discard(self.id)
+        return await self._adelete(f"{self.base_url}/Assets({self.id})", body=body)
@@ -0,0 +1,282 @@
+import email.parser
+import email.policy
+import threading
+import logging
+import json
+import uuid
+
+from orchestrator.exceptions import OrchestratorRequestError
+
+__all__ = ["Batch", "BatchResult"]
+
+"""
+OData $batch support: calls issued inside a batch are sent together
+in multipart requests instead of one round trip each
+"""
+
+_local = threading.local()
+
+
+class BatchResult(object):
+    """
+    Future like result of a call made inside a batch.
+
+    Indexing a result (`result["value"]`) or calling `then` returns a new
+    result that applies the operation once the response arrives, so
+    methods that read a key of the response can be batched too.
+    Iterating a result, or taking its length or truth value, needs the
+    response: the pending calls of the batch are sent first.
+
+    @status: the status code of the call once the batch has been sent
+    """
+
+    def __init__(self, batch, method, url):
+        self.batch = batch
+        self.method = method
+        self.url = url
+        self.status = None
+        self._data = None
+        self._error = None
+        self._done = False
+
+    def __repr__(self):
+        state = self.status if self._done else "pending"
+        return f"<BatchResult {self.method} {self.url} [{state}]>"
+
+    def __getitem__(self, key):
+        return self.then(lambda data: data[key])
+
+    def __iter__(self):
+        return iter(self.result())
+
+    def __len__(self):
+        return len(self.result())
+
+    def __bool__(self):
+        return bool(self.result())
+
+    def done(self):
+        return self._done
+
+    def result(self):
+        """
+        Returns the body of the response, like a call made outside a
+        batch would. Sends the pending calls of the batch first if needed.
+        """
+        if not self._done:
+            self.batch.flush()
+        if self._error is not None:
+            raise self._error
+        return self._data
+
+    def then(self, fn):
+        """
+        Returns a result resolving to fn(body)
+        """
+        return _DerivedResult(self, fn)
+
+    def _set(self, status, data):
+        self.status = status
+        self._data = data
+        self._done = True
+        if status not in range(200, 400):
+            logging.error(f"An error ocurred in a batch call.\nStatus code: {status} ---- {self.url}")
+
+    def _fail(self, error):
+        self._error = error
+        self._done = True
+
+
+class _DerivedResult(BatchResult):
+
+    def __init__(self, parent, fn):
+        super().__init__(parent.batch, parent.method, parent.url)
+        self.parent = parent
+        self.fn = fn
+
+    def done(self):
+        return self.parent.done()
+
+    def result(self):
+        if not self._done:
+            data = self.parent.result()
+            self.status = self.parent.status
+            self._data = self.fn(data)
+            self._done = True
+        return self._data
+
+
+class Batch(object):
+    """
+    Collects the calls made by a client, and by every entity derived from it,
+    on the current thread and sends them in OData $batch requests of at most
+    `max_size` calls. Calls return a BatchResult instead of the response.
+
+    Pending calls are sent when `max_size` of them have been collected, when
+    a result is requested and when the batch is closed:
+
+        with client.batch() as batch:
+            infos = [item.info() for item in items]
+            histories = [item.history() for item in items]
+        for info in infos:
+            print(info.result()["Status"])
+
+    Methods that only return the response, or a key of it, can be
+    batched; methods that make decisions on the response need it to be
+    sent first. Writes are each sent in their own change set.
+
+    @client: the OrchestratorHTTP whose calls are batched
+    @max_size: maximum number of calls per request (default OrchestratorHTTP.batch_size)
+    """
+
+    def __init__(self, client, max_size=None):
+        self.client = client
+        self.max_size = max_size or client.batch_size
+        self.url = f"{client.base_url}/$batch"
+        self.pending = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if not hasattr(_local, "batches"):
+            _local.batches = []
+        _local.batches.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.batches.remove(self)
+        if exc_type is None:
+            self.flush()
+        else:
+            for _, _, _, _, result in self.pending:
+                result._fail(OrchestratorRequestError(value=None, message="The batch was not sent"))
+            self.pending = []
+
+    @staticmethod
+    def current():
+        """
+        Returns the innermost batch open on this thread, if any
+        """
+        batches = getattr(_local, "batches", None)
+        return batches[-1] if batches else None
+
+    def accepts(self, http):
+        """
+        True if the calls of the given entity belong to this batch
+        """
+        return http.token_manager is self.client.token_manager
+
+    def add(self, method, url, headers, body=None):
+        result = BatchResult(self, method, url)
+        self._invalidate(method, url)
+        with self._lock:
+            self.pending.append((method, url, headers, body, result))
+            full = len(self.pending) >= self.max_size
+        if full:
+            self.flush()
+        return result
+
+    def flush(self):
+        """
+        Sends the pending calls
+        """
+        with self._lock:
+            pending, self.pending = self.pending, []
+        while pending:
+            chunk, pending = pending[:self.max_size], pending[self.max_size:]
+            self._send_chunk(chunk)
+
+    def _send_chunk(self, chunk):
+        boundary = f"batch_{uuid.uuid4()}"
+        reads_only = all(method == "GET" for method, *_ in chunk)
+        token = self.client.token_manager.get_token()
+        headers = self.client._auth_header(token)
+        headers.update({"Content-Type": f"multipart/mixed; boundary={boundary}", "Accept": "multipart/mixed"})
+        request_kwargs = {"data": self._encode(chunk, boundary)}
+        r = self.client._send("POST", self.url, headers, request_kwargs, idempotent=reads_only)
+        if r.status_code == 401:
+            headers.update(self.client._auth_header(self.client.token_manager.refresh(stale=token)))
+            r = self.client._send("POST", self.url, headers, request_kwargs, idempotent=reads_only)
+        if r.status_code == 413 and len(chunk) > 1:
+            half = (len(chunk) + 1) // 2
+            self.max_size = min(self.max_size, half)
+            logging.warning(f"Batch of {len(chunk)} calls too large, splitting in batches of {half}")
+            self._send_chunk(chunk[:half])
+            self._send_chunk(chunk[half:])
+            return
+        logging.debug(f"{r.status_code} ---- {self.url} ({len(chunk)} calls)")
+        for method, url, *_ in chunk:
+            self._invalidate(method, url)
+        if not r.headers.get("Content-Type", "").startswith("multipart/"):
+            error = OrchestratorRequestError(value=r.status_code, message=f"$batch failed with status {r.status_code}: {r.text[:200]}")
+            for *_, result in chunk:
+                result._fail(error)
+            return
+        responses = self._parse(r.headers["Content-Type"], r.content)
+        if len(responses) != len(chunk):
+            logging.error(f"$batch returned {len(responses)} responses for {len(chunk)} calls")
+        for i, (*_, result) in enumerate(chunk):
+            if i < len(responses):
+                result._set(*responses[i])
+            else:
+                result._fail(OrchestratorRequestError(value=r.status_code, message="Missing response in $batch"))
+
+    def _invalidate(self, method, url):
+        """
+        Drops the cached responses a write affects, both when it is queued
+        and once it has been sent, so that a GET made in between does not
+        keep a stale response
+        """
+        cache = self.client.response_cache
+        if method != "GET" and cache is not None:
+            cache.invalidate(url)
+
+    @staticmethod
+    def _encode(chunk, boundary):
+        lines = []
+        for content_id, (method, url, headers, body, _) in enumerate(chunk, start=1):
+            part_headers = {k: v for k, v in headers.items() if k != "Authorization"}
+            request = [f"{method} {url} HTTP/1.1", "Accept: application/json"]
+            request += [f"{k}: {v}" for k, v in part_headers.items()]
+            payload = "" if body is None and method in ("GET", "DELETE") else json.dumps(body)
+            if payload and "Content-Type" not in part_headers:
+                request.append("Content-Type: application/json")
+            part = ["Content-Type: application/http", "Content-Transfer-Encoding: binary",
+                    f"Content-ID: {content_id}", "", *request, "", payload]
+            if method == "GET":
+                lines += [f"--{boundary}", *part]
+            else:
+                changeset = f"changeset_{uuid.uuid4()}"
+                lines += [f"--{boundary}", f"Content-Type: multipart/mixed; boundary={changeset}", "",
+                          f"--{changeset}", *part, f"--{changeset}--"]
+        lines.append(f"--{boundary}--")
+        return "\r\n".join(lines).encode("utf-8")
+
+    @classmethod
+    def _parse(cls, content_type, content):
+        """
+        Returns the (status, body) of every response of a multipart
+        $batch response, change sets flattened, in order
+        """
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + content)
+        return cls._parse_parts(message)
+
+    @classmethod
+    def _parse_parts(cls, message):
+        responses = []
+        for part in message.iter_parts():
+            if part.get_content_maintype() == "multipart":
+                responses += cls._parse_parts(part)
+            else:
+                responses.append(cls._parse_response(part.get_payload(decode=True)))
+        return responses
+
+    @staticmethod
+    def _parse_response(raw):
+        head, _, body = raw.replace(b"\r\n", b"\n").partition(b"\n\n")
+        status = int(head.split(b"\n", 1)[0].split()[1])
+        body = body.strip()
+        try:
+            return status, json.loads(body) if body else ""
+        except ValueError:
+            return status, body.decode("utf-8", "replace")
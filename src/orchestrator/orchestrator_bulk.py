@@ -0,0 +1,182 @@
+import csv
+import json
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+__all__ = ["BulkResult", "BulkFailure", "chunk_items", "reference_ids", "read_rows"]
+
+"""
+Chunking and result aggregation of the BulkAddQueueItems calls
+"""
+
+
+class BulkFailure(object):
+    """
+    An item a bulk insert could not add
+
+    @index: position of the item in the input (None if it could not be matched)
+    @reference: the Reference of the item
+    @error_code: the error code returned by Orchestrator, if any
+    @message: the error message
+    """
+    __slots__ = ("index", "reference", "error_code", "message")
+
+    def __init__(self, index, reference, error_code, message):
+        self.index = index
+        self.reference = reference
+        self.error_code = error_code
+        self.message = message
+
+    def __repr__(self):
+        return f"BulkFailure(index={self.index!r}, reference={self.reference!r}, message={self.message!r})"
+
+
+class BulkResult(object):
+    """
+    Aggregated result of a bulk insert sent in several BulkAddQueueItems calls
+
+    @batch_id: the BatchID written in the SpecificContent of every item
+    @commit_type: the commitType of the calls
+    @total: number of items sent
+    @chunks: number of calls made
+    @failures: the BulkFailures, sorted by input index
+    @stopped: True if the remaining items were not sent because a call
+    failed with commitType StopOnFirstFailure or AllOrNothing
+    @elapsed: seconds spent sending the items
+    """
+
+    def __init__(self, batch_id=None, commit_type=None):
+        self.batch_id = batch_id
+        self.commit_type = commit_type
+        self.total = 0
+        self.chunks = 0
+        self.failures = []
+        self.stopped = False
+        self.elapsed = 0.0
+        self._started = time.perf_counter()
+
+    def __repr__(self):
+        return (f"<BulkResult {self.succeeded}/{self.total} items added in {self.chunks} calls, "
+                f"{len(self.failures)} failed{', stopped' if self.stopped else ''}>")
+
+    @property
+    def succeeded(self):
+        return self.total - len(self.failures)
+
+    @property
+    def rate(self):
+        """
+        Items sent per second so far
+        """
+        elapsed = self.elapsed or time.perf_counter() - self._started
+        return self.total / elapsed if elapsed else 0.0
+
+    @property
+    def ok(self):
+        return not self.failures and not self.stopped
+
+    def failed_indexes(self):
+        return [failure.index for failure in self.failures]
+
+    def add(self, chunk, data=None, error=None):
+        """
+        Records the answer to a call: the body returned by Orchestrator
+        (whose `value` lists the items that failed) or the error of the call
+
+        @chunk: list of (index, formatted item) pairs sent in the call
+        @returns: the number of failed items of the chunk
+        """
+        self.total += len(chunk)
+        self.chunks += 1
+        if error is None and not (isinstance(data, dict) and "value" in data):
+            error = data.get("message") if isinstance(data, dict) and data.get("message") else data
+        if error is not None:
+            failures = [BulkFailure(index, item.get("Reference"), None, str(error)) for index, item in chunk]
+        else:
+            failures = self._match(chunk, data["value"] or [])
+        self.failures += failures
+        return len(failures)
+
+    def finish(self):
+        self.failures.sort(key=lambda failure: (failure.index is None, failure.index or 0))
+        self.elapsed = time.perf_counter() - self._started
+        return self
+
+    @staticmethod
+    def _match(chunk, failed):
+        """
+        Maps the failed items returned by Orchestrator to their input index,
+        by the ReferenceID of their SpecificContent or else by their Reference
+        """
+        by_id: Dict[Any, int] = {}
+        by_reference: Dict[Any, int] = {}
+        for index, item in chunk:
+            by_id[(item.get("SpecificContent") or {}).get("ReferenceID")] = index
+            by_reference.setdefault(item.get("Reference"), index)
+        failures = []
+        for failure in failed:
+            item = failure.get("ItemData") or {}
+            reference_id = (item.get("SpecificContent") or {}).get("ReferenceID")
+            index = by_id.get(reference_id) if reference_id is not None else None
+            if index is None:
+                index = by_reference.get(item.get("Reference"))
+            failures.append(BulkFailure(index, item.get("Reference"), failure.get("ErrorCode"), failure.get("ErrorMessage")))
+        return failures
+
+
+def chunk_items(items, chunk_size=1000, max_bytes=None):
+    """
+    Groups (index, formatted item) pairs in lists of at most `chunk_size`
+    items whose JSON encoding takes at most `max_bytes`. Items are consumed
+    lazily, so a generator is only read one chunk ahead. An item bigger than
+    `max_bytes` is sent alone.
+    """
+    chunk: List[Tuple[Any, Any]] = []
+    size = 0
+    for index, item in items:
+        item_size = len(json.dumps(item)) + 1 if max_bytes else 0
+        if chunk and (len(chunk) >= chunk_size or (max_bytes and size + item_size > max_bytes)):
+            yield chunk
+            chunk = []
+            size = 0
+        chunk.append((index, item))
+        size += item_size
+    if chunk:
+        yield chunk
+
+
+def reference_ids(count):
+    """
+    Returns `count` random (version 4) UUID strings, like str(uuid4()),
+    generated from a single read of os.urandom
+    """
+    raw = bytearray(os.urandom(16 * count))
+    raw[6::16] = bytes(byte & 0x0F | 0x40 for byte in raw[6::16])
+    raw[8::16] = bytes(byte & 0x3F | 0x80 for byte in raw[8::16])
+    digits = raw.hex()
+    return [f"{digits[i:i + 8]}-{digits[i + 8:i + 12]}-{digits[i + 12:i + 16]}-{digits[i + 16:i + 20]}-{digits[i + 20:i + 32]}"
+            for i in range(0, 32 * count, 32)]
+
+
+def read_rows(path, format=None, encoding="utf-8", delimiter=","):
+    """
+    Generator over the rows of a CSV file (as dictionaries of strings, keyed
+    by the header) or of a JSON lines file (a JSON object per line), read
+    one line at a time
+
+    @path: the file path
+    @format: "csv" or "jsonl" (default: guessed from the extension, .jsonl
+    and .ndjson are JSON lines)
+    """
+    if format is None:
+        format = "jsonl" if str(path).lower().endswith((".jsonl", ".ndjson")) else "csv"
+    if format not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported file format: {format}")
+    with open(path, encoding=encoding, newline="") as f:
+        if format == "csv":
+            yield from csv.DictReader(f, delimiter=delimiter)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
@@ -0,0 +1,152 @@
+from collections import OrderedDict
+import threading
+import logging
+import json
+import re
+import time
+from urllib.parse import urlparse
+
+__all__ = ["ResponseCache"]
+
+"""
+Cache of GET responses shared by every entity derived from a client
+"""
+
+
+class _Entry(object):
+    __slots__ = ("rule", "content", "etag", "expires_at")
+
+    def __init__(self, rule, content, etag, expires_at):
+        self.rule = rule
+        self.content = content
+        self.etag = etag
+        self.expires_at = expires_at
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def value(self):
+        """
+        Decodes the cached body, so every caller gets its own copy
+        """
+        try:
+            return json.loads(self.content)
+        except ValueError:
+            return self.content.decode("utf-8", "replace")
+
+
+class ResponseCache(object):
+    """
+    LRU cache of GET responses for read mostly endpoints.
+
+    Each rule is a (name, pattern, ttl) tuple: successful GET calls whose
+    url path matches the `pattern` regular expression are kept for `ttl`
+    seconds. Once expired, an entry that came with an ETag is revalidated
+    with If-None-Match, and a 304 answer keeps it for another `ttl`.
+    Calls matching no rule are never cached. The cache holds at most
+    `max_entries` responses and `max_bytes` of response bodies, dropping
+    the least recently used ones first.
+
+    Any POST, PUT or DELETE to an endpoint matching a rule drops the cached
+    responses of that rule. `invalidate` and `clear` drop entries explicitly.
+
+    @rules: list of rules (default: ResponseCache.default_rules)
+    @max_entries: maximum number of responses kept (default 1024)
+    @max_bytes: maximum total size of the bodies kept (default 16 MB)
+    """
+    default_rules = [
+        ("folders", r"/Folders(\(\d+\))?$", 300),
+        ("queue_definitions", r"/QueueDefinitions(\(\d+\))?$", 60),
+        ("processes", r"/Processes(\(|$)", 300),
+        ("machines", r"/Machines(\(\d+\))?$", 300),
+        ("libraries", r"/Libraries(\(|$)", 300),
+    ]
+
+    def __init__(self, rules=None, max_entries=1024, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.rules = []
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        for rule in (self.default_rules if rules is None else rules):
+            self.add_rule(*rule)
+
+    def add_rule(self, name, pattern, ttl):
+        """
+        Caches the responses of a class of endpoints for `ttl` seconds
+        (checked after the existing rules)
+        """
+        self.rules.append((name, re.compile(pattern), ttl))
+
+    def rule(self, url):
+        """
+        Returns the (name, pattern, ttl) rule a url is cached under, or None
+        """
+        path = urlparse(url).path
+        for rule in self.rules:
+            if rule[1].search(path):
+                return rule
+        return None
+
+    def get(self, url, folder_id=None):
+        """
+        Returns the entry of a url, fresh or expired, or None
+        """
+        with self._lock:
+            entry = self._entries.get((url, folder_id))
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end((url, folder_id))
+            if not entry.expired:
+                self.stats["hits"] += 1
+            return entry
+
+    def put(self, url, folder_id, content, etag=None):
+        """
+        Keeps the body of a successful GET if its url matches a rule
+        """
+        rule = self.rule(url)
+        if rule is None or len(content) > self.max_bytes:
+            return
+        key = (url, folder_id)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = _Entry(rule[0], content, etag, time.monotonic() + rule[2])
+            self.size += len(content)
+            while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+
+    def revalidated(self, entry):
+        """
+        Called when the server answered 304 to an expired entry
+        """
+        with self._lock:
+            entry.expires_at = time.monotonic() + next((ttl for name, _, ttl in self.rules if name == entry.rule), 0)
+            self.stats["revalidated"] += 1
+
+    def invalidate(self, url=None, rule=None):
+        """
+        Drops the entries of the rule matching `url`, or of the rule named
+        `rule`. Without arguments every entry is dropped.
+        """
+        if url is not None:
+            matched = self.rule(url)
+            if matched is None:
+                return
+            rule = matched[0]
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if rule is None or entry.rule == rule]:
+                self._drop(key)
+        logging.debug(f"Response cache invalidated ({rule or 'all'})")
+
+    def clear(self):
+        self.invalidate()
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.content)
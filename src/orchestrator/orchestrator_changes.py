@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+
+__all__ = ["ChangeFeed", "Watermark", "WatermarkStore"]
+
+"""
+Incremental change feed of queue items based on their LastModificationTime
+"""
+
+
+class Watermark(object):
+    """
+    Position in a change feed: the LastModificationTime and Id of the last
+    modified item read, and the Id of the last item read that was never
+    modified. Items modified later, or at the same time with a greater Id,
+    come after it, and so do the never modified items with a greater Id.
+
+    @time: the LastModificationTime, as sent by Orchestrator (ISO 8601, UTC),
+    or None for the beginning of the queue
+    @id: the Id of the item
+    @new_id: the Id of the last never modified item read (None until the
+    feed has looked it up from `time`)
+    """
+    __slots__ = ("time", "id", "new_id")
+
+    def __init__(self, time, id=0, new_id=None):
+        self.time = time
+        self.id = id
+        self.new_id = new_id
+
+    def __repr__(self):
+        return f"Watermark({self.time!r}, {self.id!r}, {self.new_id!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Watermark) and (self.time, self.id, self.new_id) == (other.time, other.id, other.new_id)
+
+    @classmethod
+    def of(cls, since):
+        """
+        Returns the watermark of a Watermark, a datetime (naive ones are
+        taken as UTC) or an ISO 8601 string
+        """
+        if since is None or isinstance(since, Watermark):
+            return since
+        if isinstance(since, datetime):
+            if since.tzinfo is not None:
+                since = since.astimezone(timezone.utc)
+            return cls(since.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z")
+        return cls(str(since))
+
+    def filter(self, column="LastModificationTime"):
+        """
+        odata $filter of the entities after the watermark, ordered by the
+        given timestamp column and Id (entities without a timestamp are
+        left out)
+        """
+        if self.time is None:
+            return f"{column} ne null"
+        return f"({column} gt {self.time} or ({column} eq {self.time} and Id gt {self.id}))"
+
+    def new_filter(self, column="LastModificationTime"):
+        """
+        odata $filter of the entities without a timestamp created after the watermark
+        """
+        return f"{column} eq null and Id gt {self.new_id or 0}"
+
+    def as_dict(self):
+        return {"time": self.time, "id": self.id, "new_id": self.new_id}
+
+
+class WatermarkStore(object):
+    """
+    Keeps the watermarks of change feeds in a JSON file, one per key.
+    Writes are atomic: the file is replaced, never rewritten in place, so a
+    crash leaves either the previous or the new watermark.
+
+    @path: the path of the file
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def load(self, key):
+        """
+        Returns the watermark stored for the key, or None
+        """
+        entry = self._read().get(key)
+        return Watermark(entry["time"], entry["id"], entry.get("new_id")) if entry else None
+
+    def save(self, key, watermark):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = self._read()
+        data[key] = watermark.as_dict()
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".watermarks-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+class ChangeFeed(object):
+    """
+    Iterable over the items of a queue created or modified after a
+    watermark.
+
+    Orchestrator leaves the LastModificationTime of an item empty until it
+    is first modified, so the feed reads in two passes: the items never
+    modified, by Id, then the modified ones, in (LastModificationTime, Id)
+    order. An item modified after it was read comes again in a later pass.
+
+    Pages are requested with a $filter after the last item read (keyset
+    pagination, no $skip), so items modified while the feed is read are
+    neither skipped nor repeated within a page. The watermark moves to the
+    end of each page as it is read, and is saved to the store once every
+    item of the page has been yielded, so a restarted process resumes where
+    the last one stopped (the items of an unfinished page are yielded again).
+
+    Iterating again reads the changes made since the previous iteration.
+
+    @queue: the Queue
+    @since: the starting point (Watermark, datetime or ISO 8601 string);
+    by default the stored watermark, or the beginning of the queue
+    @store: a WatermarkStore, or the path of one (optional)
+    @page_size: number of items per call (default 1000)
+    @fields: list of columns to download ($select)
+    @records: yield QueueItemRecords instead of QueueItems
+    @options: dictionary of odata filtering options ($filter is combined)
+    """
+
+    def __init__(self, queue, since=None, store=None, page_size=None, fields=None, records=False, options=None):
+        self.queue = queue
+        self.store = WatermarkStore(store) if isinstance(store, str) else store
+        self.key = f"{queue.tenant_name}:{queue.folder_id}:{queue.id}"
+        self.page_size = int(page_size or queue.page_size)
+        self.fields = fields
+        self.records = records
+        self.options = dict(options or {})
+        self.watermark = Watermark.of(since)
+        if self.watermark is None and self.store is not None:
+            self.watermark = self.store.load(self.key)
+
+    def __repr__(self):
+        return f"<ChangeFeed {self.queue.name} since {self.watermark}>"
+
+    def __iter__(self):
+        new_item = self.queue._item_factory(self.records)
+        for page in self.pages():
+            for item in page:
+                yield new_item(item)
+
+    def pages(self):
+        """
+        Same as iterating the feed, but yields the pages of rows returned
+        by Orchestrator (dictionaries). The watermark is already past the
+        page when it is yielded, and it is saved to the store once the
+        next page is requested.
+        """
+        if self.watermark is None:
+            self.watermark = Watermark(None, 0, 0)
+        elif self.watermark.new_id is None:
+            time = self.watermark.time
+            self.watermark = Watermark(time, self.watermark.id, self._last_id_at(time) if time is not None else 0)
+        yield from self._pages(new=True)
+        yield from self._pages(new=False)
+
+    def _pages(self, new):
+        queue = self.queue
+        required = queue.item_fields + ("LastModificationTime",)
+        while True:
+            query = dict(self.options)
+            after = self.watermark.new_filter() if new else self.watermark.filter()
+            query["$filter"] = queue._and_filter(query.get("$filter"), after)
+            query.update({"$orderby": "Id" if new else "LastModificationTime,Id", "$top": self.page_size})
+            query = queue._select(queue._queue_filter(query), self.fields, required=required)
+            page = queue._get(queue._odata_url("/QueueItems", query))["value"]
+            if page:
+                last = page[-1]
+                if new:
+                    self.watermark = Watermark(self.watermark.time, self.watermark.id, last["Id"])
+                else:
+                    self.watermark = Watermark(last["LastModificationTime"], last["Id"], self.watermark.new_id)
+            logging.debug(f"Change feed of {queue.name}: {len(page)} items, now at {self.watermark}")
+            if page:
+                yield page
+                if self.store is not None:
+                    self.store.save(self.key, self.watermark)
+            if len(page) < self.page_size:
+                return
+
+    def _last_id_at(self, time):
+        """
+        Id of the last item created at or before `time`, where the feed of
+        the never modified items starts
+        """
+        queue = self.queue
+        query = queue._queue_filter({"$filter": f"CreationTime le {time}", "$orderby": "Id desc", "$top": 1, "$select": "Id"})
+        page = queue._get(queue._odata_url("/QueueItems", query))["value"]
+        return page[0]["Id"] if page else 0
@@ -0,0 +1,297 @@
+import logging
+import queue as _queue
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Optional, Tuple
+
+from orchestrator.exceptions import OrchestratorBusinessException, OrchestratorRequestError
+
+__all__ = ["QueueConsumer", "ConsumerStats", "ItemTiming"]
+
+"""
+Transaction consumer: processes the items of a queue with concurrent
+workers, keeping a few transactions started ahead of them
+"""
+
+
+class ItemTiming(object):
+    """
+    Timing of a processed transaction, in seconds
+
+    @fetch: StartTransaction call
+    @wait: time started before a worker picked it up
+    @handle: the handler
+    @report: SetTransactionResult call
+    """
+    __slots__ = ("item_id", "reference", "success", "fetch", "wait", "handle", "report")
+
+    def __init__(self, item_id, reference, success, fetch, wait, handle, report):
+        self.item_id = item_id
+        self.reference = reference
+        self.success = success
+        self.fetch = fetch
+        self.wait = wait
+        self.handle = handle
+        self.report = report
+
+    def __repr__(self):
+        return (f"ItemTiming(item_id={self.item_id!r}, success={self.success}, fetch={self.fetch:.3f}, "
+                f"wait={self.wait:.3f}, handle={self.handle:.3f}, report={self.report:.3f})")
+
+
+class ConsumerStats(object):
+    """
+    Counters and timings of a QueueConsumer
+
+    @started: transactions started
+    @succeeded, @failed: transactions reported as successful / failed
+    @report_errors: transactions whose result could not be reported
+    @fetch_errors: StartTransaction calls that failed
+    @timings: the ItemTimings of the last `keep` transactions
+    """
+
+    def __init__(self, keep=1000):
+        self.started = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.report_errors = 0
+        self.fetch_errors = 0
+        self.timings: Deque[ItemTiming] = deque(maxlen=keep)
+        self.totals = {"fetch": 0.0, "wait": 0.0, "handle": 0.0, "report": 0.0}
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+        self._started_at = time.perf_counter()
+
+    def __repr__(self):
+        return (f"<ConsumerStats {self.processed} processed ({self.succeeded} ok, {self.failed} failed) "
+                f"in {self.elapsed or time.perf_counter() - self._started_at:.1f}s, {self.rate:.1f} items/s>")
+
+    @property
+    def processed(self):
+        return self.succeeded + self.failed
+
+    @property
+    def rate(self):
+        elapsed = self.elapsed or time.perf_counter() - self._started_at
+        return self.processed / elapsed if elapsed else 0.0
+
+    def mean(self, phase):
+        """
+        Mean time of a phase (fetch, wait, handle or report) per transaction
+        """
+        return self.totals[phase] / self.processed if self.processed else 0.0
+
+    def record(self, timing, reported=True):
+        with self._lock:
+            if timing.success:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            if not reported:
+                self.report_errors += 1
+            for phase in self.totals:
+                self.totals[phase] += getattr(timing, phase)
+            self.timings.append(timing)
+
+
+class QueueConsumer(object):
+    """
+    Processes the transactions of a queue with `concurrency` worker threads,
+    while up to `prefetch` transactions are started ahead of them, so the
+    workers do not wait for StartTransaction.
+
+    The handler is called with the QueueItem of each transaction. When it
+    returns the transaction is reported as successful; when it raises, as
+    failed (an OrchestratorBusinessException is reported as a
+    BusinessException, anything else as an ApplicationException), exactly
+    like QueueItem.set_transaction_status.
+
+    `stop()` stops starting transactions; the ones already started are
+    still processed and reported before `run()` returns (graceful drain).
+    A KeyboardInterrupt during `run()` does the same.
+
+    A StartTransaction call that fails (an exception or an error body) is
+    not taken for an empty queue: it is retried after `poll_interval`, and
+    after `max_fetch_errors` consecutive failures the consumer stops and
+    `run()` raises OrchestratorRequestError once the started transactions
+    have been processed.
+
+    @queue: the Queue
+    @handler: function called with each QueueItem
+    @machine_identifier: the robot identifier of the transactions
+    @concurrency: number of worker threads (default 4)
+    @prefetch: maximum number of transactions started and waiting for a
+    worker (default: concurrency)
+    @poll_interval: seconds to wait when the queue is empty (default 5)
+    @stop_when_empty: stop once the queue has no more items (default False)
+    @max_items: stop after starting this many transactions (optional)
+    @max_fetch_errors: consecutive failed StartTransaction calls after which
+    the consumer gives up (default 5)
+    """
+    error_keys = ("errorCode", "message", "error")
+
+    def __init__(self, queue, handler, machine_identifier, concurrency=4, prefetch=None, poll_interval=5,
+                 stop_when_empty=False, max_items=None, max_fetch_errors=5):
+        self.queue = queue
+        self.handler = handler
+        self.machine_identifier = machine_identifier
+        self.concurrency = concurrency
+        self.prefetch = prefetch or concurrency
+        self.poll_interval = poll_interval
+        self.stop_when_empty = stop_when_empty
+        self.max_items = max_items
+        self.max_fetch_errors = max_fetch_errors
+        self.stats = ConsumerStats()
+        self.error: Optional[Exception] = None
+        self._fetch_errors = 0
+        self._stopping = threading.Event()
+        self._ready: "_queue.Queue[Optional[Tuple[Any, float, float]]]" = _queue.Queue()
+        self._slots = threading.Semaphore(self.prefetch)
+        self._lock = threading.Lock()
+
+    def stop(self):
+        """
+        Stops starting transactions; the started ones are still processed
+        """
+        if not self._stopping.is_set():
+            logging.info(f"Stopping the consumer of {self.queue.name}")
+        self._stopping.set()
+
+    @property
+    def stopping(self):
+        return self._stopping.is_set()
+
+    def run(self):
+        """
+        Processes transactions until stopped, and returns the ConsumerStats.
+        Raises OrchestratorRequestError if StartTransaction kept failing.
+        """
+        fetchers = [threading.Thread(target=self._fetch, name=f"consumer-fetch-{i}", daemon=True) for i in range(self.prefetch)]
+        workers = [threading.Thread(target=self._work, name=f"consumer-worker-{i}", daemon=True) for i in range(self.concurrency)]
+        for thread in fetchers + workers:
+            thread.start()
+        try:
+            for thread in fetchers:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in fetchers:
+                thread.join()
+        for _ in workers:
+            self._ready.put(None)
+        for thread in workers:
+            thread.join()
+        self.stats.elapsed = time.perf_counter() - self.stats._started_at
+        logging.info(f"Consumer of {self.queue.name} finished: {self.stats}")
+        if self.error is not None:
+            raise self.error
+        return self.stats
+
+    def _fetch(self):
+        while not self._stopping.is_set():
+            self._slots.acquire()
+            if self._stopping.is_set() or not self._reserve():
+                self._slots.release()
+                return
+            started = time.perf_counter()
+            try:
+                data = self.queue.start(self.machine_identifier)
+            except Exception as err:
+                data = err
+            fetch = time.perf_counter() - started
+            if isinstance(data, dict) and data.get("Id"):
+                self._fetched()
+                self._ready.put((self.queue._new_item(data), fetch, time.perf_counter()))
+                continue
+            self._release()
+            self._slots.release()
+            if self._is_error(data):
+                self._fetch_failed(data)
+                self._stopping.wait(self.poll_interval)
+            elif self.stop_when_empty:
+                self._fetched()
+                self.stop()
+            else:
+                self._fetched()
+                self._stopping.wait(self.poll_interval)
+
+    def _is_error(self, data):
+        """
+        False when StartTransaction found no item (an empty answer),
+        True when the call failed
+        """
+        if isinstance(data, Exception):
+            return True
+        if isinstance(data, dict):
+            return any(key in data for key in self.error_keys)
+        return bool(data)
+
+    def _fetched(self):
+        with self._lock:
+            self._fetch_errors = 0
+
+    def _fetch_failed(self, data):
+        with self._lock:
+            self.stats.fetch_errors += 1
+            self._fetch_errors += 1
+            give_up = self._fetch_errors >= self.max_fetch_errors and self.error is None
+            if give_up:
+                self.error = OrchestratorRequestError(value=self.queue.name, message=f"StartTransaction failed {self._fetch_errors} times in a row: {data}")
+        logging.error(f"StartTransaction failed on {self.queue.name}: {data}")
+        if give_up:
+            self.stop()
+
+    def _reserve(self):
+        with self._lock:
+            if self.max_items is not None and self.stats.started >= self.max_items:
+                self._stopping.set()
+                return False
+            self.stats.started += 1
+            return True
+
+    def _release(self):
+        with self._lock:
+            self.stats.started -= 1
+
+    def _work(self):
+        while True:
+            task = self._ready.get()
+            if task is None:
+                return
+            self._slots.release()
+            item, fetch, queued_at = task
+            started = time.perf_counter()
+            error = None
+            try:
+                self.handler(item)
+            except Exception as err:
+                error = err
+                details = traceback.format_exc()
+            handled = time.perf_counter()
+            if error is None:
+                reported = self._report(item, True)
+            else:
+                business = isinstance(error, OrchestratorBusinessException)
+                reported = self._report(item, False, reason=self._reason(error), details=details,
+                                        exception_type="BusinessException" if business else "ApplicationException")
+            self.stats.record(ItemTiming(item.id, item.reference, error is None, fetch, started - queued_at,
+                                         handled - started, time.perf_counter() - handled), reported)
+
+    def _report(self, item, success, **kwargs):
+        try:
+            data = item.set_transaction_status(success, **kwargs)
+            if isinstance(data, dict) and "errorCode" in data:
+                raise OrchestratorRequestError(value=data.get("errorCode"), message=data.get("message"))
+            return True
+        except Exception as err:
+            logging.error(f"Could not report the result of item {item.id}: {err}")
+            return False
+
+    @staticmethod
+    def _reason(error):
+        if error.args:
+            return str(error.args[-1])
+        return type(error).__name__
@@ -0,0 +1,82 @@
+from typing import Any, Dict
+
+__all__ = ["ClientContext"]
+
+"""
+Immutable state shared by a client and every entity derived from it
+"""
+
+
+class ClientContext(object):
+    """
+    Credentials, urls and shared objects of a client.
+
+    Every entity derived from a client references the same context instead
+    of copying its credentials and settings, so creating an entity only
+    stores the context, its folder id and its own fields, and a refreshed
+    token or a new session is seen by all of them. The context cannot be
+    modified: use `replace` to derive a new one.
+
+    @client_id: the client id
+    @refresh_token: a refresh token
+    @tenant_name: account's logical name
+    @base_url: the odata url of the tenant
+    @session: the requests.Session the calls are sent with
+    @token_manager: the TokenManager of the access token
+    @retry_policy: the RetryPolicy of the calls
+    @rate_limiter: a RateLimiter, or None
+    @response_cache: a ResponseCache, or None
+    @name_index: the NameIndexes of the name lookups
+    @result_sink: a ResultSink the transaction results are sent through, or None
+    """
+    _fields = ("client_id", "refresh_token", "tenant_name", "base_url", "session", "token_manager",
+               "retry_policy", "rate_limiter", "response_cache", "name_index", "result_sink")
+    __slots__ = _fields + ("_folder_headers",)
+
+    client_id: str
+    refresh_token: str
+    tenant_name: str
+    base_url: str
+    session: Any
+    token_manager: Any
+    retry_policy: Any
+    rate_limiter: Any
+    response_cache: Any
+    name_index: Any
+    result_sink: Any
+    _folder_headers: Dict[Any, Dict[str, str]]
+
+    def __init__(self, client_id, refresh_token, tenant_name, base_url, session, token_manager,
+                 retry_policy, rate_limiter=None, response_cache=None, name_index=None, result_sink=None):
+        for field, value in zip(self._fields, (client_id, refresh_token, tenant_name, base_url, session, token_manager,
+                                               retry_policy, rate_limiter, response_cache, name_index, result_sink)):
+            object.__setattr__(self, field, value)
+        object.__setattr__(self, "_folder_headers", {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ClientContext is read only")
+
+    def __delattr__(self, name):
+        raise AttributeError("ClientContext is read only")
+
+    def __repr__(self):
+        return f"ClientContext(tenant_name={self.tenant_name!r}, client_id={self.client_id!r})"
+
+    def folder_header(self, folder_id):
+        """
+        Returns the folder header of a folder id, built once per folder.
+        The returned dictionary must not be modified.
+        """
+        header = self._folder_headers.get(folder_id)
+        if header is None:
+            header = self._folder_headers[folder_id] = {"X-UIPATH-OrganizationUnitId": f"{folder_id}"}
+        return header
+
+    def replace(self, **changes):
+        """
+        Returns a copy of the context with the given fields changed.
+        The base_url is not derived from the tenant_name again.
+        """
+        fields = {field: getattr(self, field) for field in self._fields}
+        fields.update(changes)
+        return ClientContext(**fields)
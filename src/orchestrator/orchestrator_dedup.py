@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from typing import Set, Union
+
+__all__ = ["ReferenceIndex", "BloomFilter", "base_reference"]
+
+"""
+In memory index of the references of a queue, used to find the duplicates
+of many references at once
+"""
+
+
+_batch_suffix = re.compile(r"#[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+
+def base_reference(reference):
+    """
+    Returns the reference without the "#<BatchID>" suffix added by the bulk
+    inserts (see Queue._format_specific_content). Other "#" in a reference
+    are kept: only a UUID suffix is removed.
+    """
+    match = _batch_suffix.search(reference)
+    return reference[:match.start()] if match else reference
+
+
+class BloomFilter(object):
+    """
+    Fixed size set of strings that answers membership with a false positive
+    rate of about `error_rate` while it holds at most `capacity` values, and
+    never gives false negatives. It takes about 1.8 bytes per value at 0.1%.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * step) % self.size for i in range(self.hashes))
+
+
+class ReferenceIndex(object):
+    """
+    The references of the items of a queue with the given statuses, kept
+    in a set (or a BloomFilter) to check many references without a call each.
+
+    References are compared without their "#<BatchID>" suffix (see `key`),
+    so the references passed to the bulk inserts match the items they created.
+
+    `refresh` downloads the references of the items created since the last
+    refresh (by Id), projected to the Reference column and paginated. Items
+    that leave the statuses afterwards stay in the index. With a
+    `refresh_interval`, lookups refresh the index when it is older than that.
+
+    @queue: the Queue
+    @statuses: statuses of the items to index (default: Successful, New and InProgress)
+    @bloom: keep the references in a BloomFilter instead of a set (default False)
+    @capacity: number of references the BloomFilter is sized for (default:
+    twice the number of items of the queue with the statuses)
+    @error_rate: false positive rate of the BloomFilter (default 0.001)
+    @refresh_interval: maximum age in seconds of the index on lookups (default: never refreshed)
+    @key: function applied to the references before storing or looking them up
+    (default: base_reference)
+    """
+    default_statuses = ("Successful", "New", "InProgress")
+
+    def __init__(self, queue, statuses=None, bloom=False, capacity=None, error_rate=0.001, refresh_interval=None, key=None):
+        self.queue = queue
+        self.statuses = tuple(statuses or self.default_statuses)
+        self.refresh_interval = refresh_interval
+        self.key = key or base_reference
+        self.last_id = 0
+        self.size = 0
+        self.refreshed_at = None
+        self._lock = threading.Lock()
+        self._references: Union[Set[str], BloomFilter]
+        if bloom:
+            capacity = capacity or max(1000, 2 * queue.count_items(filter=self._status_filter()))
+            self._references = BloomFilter(capacity, error_rate)
+        else:
+            self._references = set()
+
+    def __repr__(self):
+        return f"<ReferenceIndex {self.queue.name} ({self.size} references, last id {self.last_id})>"
+
+    def __contains__(self, reference):
+        self._refresh_if_stale()
+        return self.key(reference) in self._references
+
+    def duplicates(self, references):
+        """
+        Returns the given references that are already in the queue, in order
+        """
+        self._refresh_if_stale()
+        return [reference for reference in references if self.key(reference) in self._references]
+
+    def add(self, reference):
+        """
+        Records a reference added by this process, without waiting for a refresh
+        """
+        with self._lock:
+            self._references.add(self.key(reference))
+            self.size += 1
+
+    def refresh(self):
+        """
+        Downloads the references of the items created since the last refresh
+        (all of them the first time)
+
+        @returns: the number of references added
+        """
+        queue = self.queue
+        with self._lock:
+            odata_filter = queue._and_filter(self._status_filter(), f"Id gt {self.last_id}")
+            query = queue._select(queue._queue_filter({"$filter": odata_filter}), ["Reference"], required=("Id",))
+            added = 0
+            for item in queue._iter_values("/QueueItems", query):
+                if item.get("Reference"):
+                    self._references.add(self.key(item["Reference"]))
+                    added += 1
+                self.last_id = max(self.last_id, item["Id"])
+            self.size += added
+            self.refreshed_at = time.monotonic()
+        logging.debug(f"Reference index of {queue.name}: {added} references added")
+        return added
+
+    def _refresh_if_stale(self):
+        if self.refreshed_at is None or (self.refresh_interval is not None and time.monotonic() - self.refreshed_at >= self.refresh_interval):
+            self.refresh()
+
+    def _status_filter(self):
+        return " or ".join(f"Status eq '{status}'" for status in self.statuses)
@@ -3,9 +3,10 @@ from orchestrator.orchestrator_asset import Asset
 from orchestrator.orchestrator_queue import Queue
 from orchestrator.orchestrator_job import Job
 from orchestrator.orchestrator_process_schedule import ProcessSchedule
+from orchestrator.orchestrator_frames import pages_to_frame, pages_to_arrow
+from orchestrator.orchestrator_records import JobRecord
 from orchestrator.exceptions import OrchestratorMissingParam
 from urllib.parse import urlencode
-import requests
 
 
 """
@@ -35,22 +36,19 @@ class Folder(OrchestratorHTTP):
     :param folder_name - the name of the folder 
     :type folder_name : str
     """
-
-    def __init__(self, client_id, refresh_token, tenant_name, session=None, folder_name=None,  folder_id=None, access_token=None):
-        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session)
-        if not tenant_name or not folder_id:
+    queue_fields = ("Id", "Name")
+    asset_fields = ("Id", "Name")
+    schedule_fields = ("Id", "Name")
+    job_fields = ("Id", "Key", "ReleaseName")
+
+    def __init__(self, client_id=None, refresh_token=None, tenant_name=None, session=None, folder_name=None,  folder_id=None, access_token=None, **kwargs):
+        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session,
+                         access_token=access_token, **kwargs)
+        if not self.tenant_name or not folder_id:
             raise OrchestratorMissingParam(value="tenant_name",
                                            message="Required parameter missing: tenant_name")
         self.id = folder_id
-        self.access_token = access_token
-        self.refresh_token = refresh_token
-        self.tenant_name = tenant_name
         self.name = folder_name
-        self.base_url = f"{self.cloud_url}/{self.tenant_name}/JTBOT/odata"
-        if session:
-            self.session = session
-        else:
-            self.session = requests.Session()
 
     def __str__(self):
         return f"Folder Id: {self.id} \nFolder Name: {self.name}"
@@ -64,11 +62,14 @@ class Folder(OrchestratorHTTP):
         data = self._get(url)
         return data
 
-    def get_queues(self, options=None):
+    def get_queues(self, options=None, fields=None):
         """Parameters:
             :param options - dictionary of filtering odata options
             :type options - dict
+            :param fields - columns to download ($select), Id and Name are always included
+            :type fields - list
         """
+        options = self._select(options, fields, required=self.queue_fields)
         endpoint = "/QueueDefinitions"
         if options:
             query_params = urlencode(options)
@@ -77,7 +78,26 @@ class Folder(OrchestratorHTTP):
             url = f"{self.base_url}{endpoint}"
         data = self._get(url)
         filt_data = data['value']
-        return [Queue(self.client_id, self.access_token, self.tenant_name, self.id, self.name, self.session, queue["Name"],  queue["Id"], access_token=self.access_token) for queue in filt_data]
+        return [self._new_queue(queue) for queue in filt_data]
+
+    def iter_queues(self, options=None, page_size=None, fields=None):
+        """Generator over all the queues of the folder, fetched
+            one page at a time
+
+            :param options - dictionary of filtering odata options
+            :type options - dict
+            :param page_size - number of queues per call (default 1000)
+            :type page_size - int
+            :param fields - columns to download ($select)
+            :type fields - list
+        """
+        options = self._select(options, fields, required=self.queue_fields)
+        for queue in self._iter_values("/QueueDefinitions", options, page_size):
+            yield self._new_queue(queue)
+
+    def _new_queue(self, queue):
+        self.name_index.get("queues", self.id).add(queue["Id"], queue["Name"])
+        return Queue(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, queue["Name"], queue["Id"], **self._shared_state())
 
     def get_queue_ids(self, options=None):
         """
@@ -87,10 +107,10 @@ class Folder(OrchestratorHTTP):
             :options dictionary for odata options
 
         """
-        queues = self.get_queues(options)
-        ids = {}
-        for queue in queues:
-            ids.update({queue.id: queue.name})
+        options = self._select(options, self.queue_fields)
+        queues = self._get(self._odata_url("/QueueDefinitions", options))["value"]
+        ids = {queue["Id"]: queue["Name"] for queue in queues}
+        self.name_index.get("queues", self.id).update(ids)
         return ids
 
     def get_processing_records(self, options=None):
@@ -112,14 +132,35 @@ class Folder(OrchestratorHTTP):
         return data['value']
 
     def get_queue_by_id(self, queue_id):
-        queues = self.get_queue_ids()
-        return Queue(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, queues[queue_id], queue_id=int(queue_id), access_token=self.access_token)
+        queue_name = self.name_index.get("queues", self.id).name(int(queue_id))
+        if queue_name is None:
+            queue_name = self.get_queue_ids()[queue_id]
+        return Queue(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, queue_name, queue_id=int(queue_id),
+                     **self._shared_state())
 
-    def get_assets(self, options=None):
+    def get_queue_by_name(self, queue_name):
+        """
+            Returns a single queue by its name, pushing an exact $filter
+            down to the server the first time and using the folder's
+            name index afterwards
+
+            :param queue_name - the name of the queue
+            :type queue_name - str
+
+            Returns None if there is no queue with that name
+        """
+        queue_id = self._lookup_id("/QueueDefinitions", self.name_index.get("queues", self.id), queue_name)
+        if queue_id is None:
+            return None
+        return self._new_queue({"Id": queue_id, "Name": queue_name})
+
+    def get_assets(self, options=None, fields=None):
         """
             Returns list of assets
             :options dict of odata filter options
+            :fields list of columns to download ($select), Id and Name are always included
         """
+        options = self._select(options, fields, required=self.asset_fields)
         endpoint = "/Assets"
         if options:
             query_params = urlencode(options)
@@ -130,7 +171,23 @@ class Folder(OrchestratorHTTP):
         # pprint(data)
         # pprint(self.id)
         filt_data = data['value']
-        return [Asset(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, asset["Id"], asset["Name"], access_token=self.access_token) for asset in filt_data]
+        return [self._new_asset(asset) for asset in filt_data]
+
+    def iter_assets(self, options=None, page_size=None, fields=None):
+        """
+            Generator over all the assets of the folder, fetched
+            one page at a time
+            :options dict of odata filter options
+            :page_size number of assets per call (default 1000)
+            :fields list of columns to download ($select)
+        """
+        options = self._select(options, fields, required=self.asset_fields)
+        for asset in self._iter_values("/Assets", options, page_size):
+            yield self._new_asset(asset)
+
+    def _new_asset(self, asset):
+        self.name_index.get("assets", self.id).add(asset["Id"], asset["Name"])
+        return Asset(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, asset["Id"], asset["Name"], **self._shared_state())
 
     def get_asset_ids(self, options=None):
         """
@@ -141,21 +198,39 @@ class Folder(OrchestratorHTTP):
 
             :param options - dictionary of odata filter options
         """
-
-        assets = self.get_assets(options)
-        ids = {}
-        for asset in assets:
-            ids.update({asset.id: asset.name})
+        options = self._select(options, self.asset_fields)
+        assets = self._get(self._odata_url("/Assets", options))["value"]
+        ids = {asset["Id"]: asset["Name"] for asset in assets}
+        self.name_index.get("assets", self.id).update(ids)
         return ids
 
     def get_asset_by_id(self, asset_id):
-        assets = self.get_asset_ids()
-        return Asset(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, asset_id, assets[asset_id], access_token=self.access_token)
+        asset_name = self.name_index.get("assets", self.id).name(int(asset_id))
+        if asset_name is None:
+            asset_name = self.get_asset_ids()[asset_id]
+        return Asset(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, asset_id, asset_name, **self._shared_state())
+
+    def get_asset_by_name(self, asset_name):
+        """
+            Returns a single asset by its name, pushing an exact $filter
+            down to the server the first time and using the folder's
+            name index afterwards
+
+            :param asset_name - the name of the asset
+            :type asset_name - str
+
+            Returns None if there is no asset with that name
+        """
+        asset_id = self._lookup_id("/Assets", self.name_index.get("assets", self.id), asset_name)
+        if asset_id is None:
+            return None
+        return self._new_asset({"Id": asset_id, "Name": asset_name})
 
     def create_asset(self, body=None):
         pass
 
-    def get_process_schedules(self, options=None):
+    def get_process_schedules(self, options=None, fields=None):
+        options = self._select(options, fields, required=self.schedule_fields)
         endpoint = "/ProcessSchedules"
         if options:
             query_params = urlencode(options)
@@ -164,23 +239,38 @@ class Folder(OrchestratorHTTP):
             url = f"{self.base_url}{endpoint}"
         data = self._get(url)
         filt_data = data["value"]
-        return [ProcessSchedule(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.session, process["Id"], process["Name"], access_token=self.access_token) for process in filt_data]
+        return [self._new_schedule(process) for process in filt_data]
+
+    def iter_process_schedules(self, options=None, page_size=None, fields=None):
+        """
+            Generator over all the process schedules of the folder,
+            fetched one page at a time
+        """
+        options = self._select(options, fields, required=self.schedule_fields)
+        for process in self._iter_values("/ProcessSchedules", options, page_size):
+            yield self._new_schedule(process)
+
+    def _new_schedule(self, process):
+        return ProcessSchedule(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.session, process["Id"], process["Name"],
+                               **self._shared_state())
 
     def get_schedule_ids(self, options=None):
         """
             Returns a list of dictionaries
                 name -- schedule_id
         """
-        process_schedules = self.get_process_schedules(options=options)
-        ids = {}
-        for schedule in process_schedules:
-            ids.update({schedule.id: schedule.name})
-        return ids
+        options = self._select(options, self.schedule_fields)
+        schedules = self._get(self._odata_url("/ProcessSchedules", options))["value"]
+        return {schedule["Id"]: schedule["Name"] for schedule in schedules}
 
-    def get_sessions(self, options=None):
+    def get_sessions(self, options=None, fields=None, expand=None):
         """
             Gets all the sessions for the current folder
+
+            :fields list of columns to download ($select)
+            :expand list of related entities to include ($expand), e.g. ["Robot"]
         """
+        options = self._select(options, fields, expand)
         endpoint = "/Sessions"
         if options:
             query_params = urlencode(options)
@@ -189,6 +279,21 @@ class Folder(OrchestratorHTTP):
             url = f"{self.base_url}{endpoint}"
         return self._get(url)["value"]
 
+    def iter_sessions(self, options=None, page_size=None, fields=None, expand=None):
+        """
+            Generator over all the sessions of the current folder,
+            fetched one page at a time
+        """
+        return self._iter_values("/Sessions", self._select(options, fields, expand), page_size)
+
+    def count_sessions(self, filter=None):
+        """
+            Returns the number of sessions of the current folder ($count)
+
+            :filter an odata $filter expression (optional)
+        """
+        return self._count("/Sessions", {"$filter": filter} if filter else None)
+
     def get_machine_runtime_sessions(self):
         """
             No se por que no va
@@ -198,44 +303,115 @@ class Folder(OrchestratorHTTP):
         url = f"{self.base_url}{endpoint}{uipath_svc}"
         return self._get(url)
 
-    def get_jobs(self, top="100", options=None):
+    def get_jobs(self, top="100", options=None, fields=None, expand=None, records=False):
         """
         Returns the jobs of a given folder
 
         @top : maximum number of results (100 default)
         @options: dictionary of odata filtering options
+        @fields: list of columns to download ($select), Id, Key and
+        ReleaseName are always included
+        @expand: list of related entities to include ($expand), e.g. ["Robot"]
+        @records: return compact read only JobRecords instead of Jobs (default False)
         """
         endpoint = "/Jobs"
         default = {"$orderby": "StartTime desc", "$top": f"{top}"}
-        enc_default = urlencode(default)
         if options:
             default.update(options)
-            query_params = urlencode(default)
-            url = f"{self.base_url}{endpoint}?{query_params}"
-        else:
-            url = f"{self.base_url}{endpoint}?{enc_default}"
+        query_params = urlencode(self._select(default, fields, expand, required=self.job_fields))
+        url = f"{self.base_url}{endpoint}?{query_params}"
         data = self._get(url)["value"]
         # print(len(data))
-        return [Job(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, job["Id"], job["Key"], job["ReleaseName"], access_token=self.access_token) for job in data]
+        new_job = self._job_factory(records)
+        return [new_job(job) for job in data]
+
+    def iter_jobs(self, options=None, page_size=None, fields=None, expand=None, records=False):
+        """
+        Generator over all the jobs of a given folder (most recent
+        first), fetched one page at a time
+
+        @options: dictionary of odata filtering options ($top limits the
+        total number of jobs)
+        @page_size: number of jobs per call (default 1000)
+        @fields: list of columns to download ($select)
+        @expand: list of related entities to include ($expand)
+        @records: yield JobRecords instead of Jobs (default False)
+        """
+        options = self._select(options, fields, expand, required=self.job_fields)
+        new_job = self._job_factory(records)
+        for job in self._iter_values("/Jobs", options, page_size, order_by="StartTime desc,Id desc"):
+            yield new_job(job)
+
+    def jobs_to_frame(self, options=None, fields=None, expand=None, parse_dates=True, page_size=None, max_workers=8):
+        """
+        Downloads the jobs of the folder (most recent first) into a pandas
+        DataFrame, built from the pages of a parallel scan without creating Jobs
+
+        @options: dictionary of odata filtering options ($top limits the
+        total number of jobs)
+        @fields: list of columns to download ($select)
+        @expand: list of related entities to include ($expand), kept as
+        dictionaries
+        @parse_dates: parse StartTime, EndTime and CreationTime into UTC
+        datetimes (default True)
+        @page_size: number of jobs per call (default 1000)
+        @max_workers: maximum number of simultaneous calls (default 8)
+        """
+        return pages_to_frame(self._job_pages(options, fields, expand, page_size, max_workers), parse_dates=parse_dates)
+
+    def jobs_to_arrow(self, options=None, fields=None, expand=None, parse_dates=True, page_size=None, max_workers=8):
+        """
+        Same as jobs_to_frame, but returns a pyarrow Table (expanded
+        entities are kept as JSON strings)
+        """
+        return pages_to_arrow(self._job_pages(options, fields, expand, page_size, max_workers), parse_dates=parse_dates)
+
+    def _job_pages(self, options=None, fields=None, expand=None, page_size=None, max_workers=8):
+        query = self._select(options, fields, expand, required=self.job_fields)
+        return self._scan_pages("/Jobs", query, page_size, max_workers, order_by="StartTime desc,Id desc")
+
+    def count_jobs(self, state=None, filter=None):
+        """
+        Returns the number of jobs of a given folder without
+        downloading them ($count)
+
+        @state: only count the jobs in this state, e.g. "Running" (optional)
+        @filter: an odata $filter expression the jobs must match (optional)
+        """
+        odata_filter = self._and_filter(f"State eq '{state}'" if state else None, filter)
+        return self._count("/Jobs", {"$filter": odata_filter} if odata_filter else None)
+
+    def _job_factory(self, records=False):
+        return self._new_job_record if records else self._new_job
+
+    def _new_job_record(self, job):
+        return JobRecord.from_row(self, job)
+
+    def _new_job(self, job):
+        return Job(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, job["Id"], job["Key"], job["ReleaseName"],
+                   **self._shared_state())
 
     def get_job_keys(self, top="100", options=None):
         """
+        Returns a dictionary of the job keys and their process names
 
+        @top : maximum number of results (100 default)
+        @options: dictionary of odata filtering options
         """
-        jobs = self.get_jobs(top, options)
-        ids = {}
-        for job in jobs:
-            ids.update({job.key: job.name})
-        return ids
+        query = {"$orderby": "StartTime desc", "$top": f"{top}"}
+        query.update(options or {})
+        jobs = self._get(self._odata_url("/Jobs", self._select(query, ["Key", "ReleaseName"])))["value"]
+        return {job["Key"]: job["ReleaseName"] for job in jobs}
 
     def get_job_by_key(self, key):
         endpoint = "/Jobs"
         query_param = urlencode({"$filter": f"Key eq {key}"})
         url = f"{self.base_url}{endpoint}?{query_param}"
         data = self._get(url)["value"][0]
-        return Job(self.client_id, self.refresh_token, self.tenant_name, self.id, self.name, self.session, data["Id"], data["Key"], data["ReleaseName"], access_token=self.access_token)
+        return self._new_job(data)
 
-    def job_triggers(self, options=None):
+    def job_triggers(self, options=None, fields=None):
+        options = self._select(options, fields)
         endpoint = "/JobTriggers"
         if options:
             query_params = urlencode(options)
@@ -243,3 +419,10 @@ class Folder(OrchestratorHTTP):
         else:
             url = f"{self.base_url}{endpoint}"
         return self._get(url)["value"]
+
+    def iter_job_triggers(self, options=None, page_size=None, fields=None):
+        """
+            Generator over all the job triggers of the folder,
+            fetched one page at a time
+        """
+        return self._iter_values("/JobTriggers", self._select(options, fields), page_size)
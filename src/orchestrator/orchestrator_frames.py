@@ -0,0 +1,187 @@
+import datetime
+import decimal
+import json
+import logging
+from typing import Any, Dict, Literal, Set
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # pragma: no cover - optional dependency
+    np = pd = None  # type: ignore[assignment]
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+__all__ = ["pages_to_frame", "pages_to_arrow", "frame_to_columns", "date_columns"]
+
+"""
+Columnar exports (pandas DataFrames and pyarrow Tables) built straight
+from the decoded pages of the odata list endpoints, and the conversion of
+DataFrames into queue item contents
+"""
+
+date_columns = ("CreationTime", "LastModificationTime", "StartProcessing", "EndProcessing", "DeferDate", "DueDate",
+                "RiskSlaDate", "StartTime", "EndTime", "TimeStamp")
+
+
+def pages_to_frame(pages, flatten=None, parse_dates=True):
+    """
+    Builds a pandas DataFrame from pages of raw entities.
+
+    Every page is turned into columns and then into a DataFrame on its own,
+    so the decoded JSON of only one page is alive at a time and the frame
+    holds the data in columnar form only.
+
+    @pages: iterable of lists of raw entities (e.g. OrchestratorHTTP._scan_pages)
+    @flatten: name of a dictionary column (e.g. "SpecificContent") whose keys
+    become columns named "<column>.<key>"
+    @parse_dates: parse the date_columns into UTC datetimes (default True)
+    """
+    if pd is None:
+        raise ImportError("pandas is required for DataFrame exports: pip install python-orchestrator[dataframe]")
+    frames = []
+    for page in pages:
+        frame = pd.DataFrame(_page_columns(page, flatten))
+        if parse_dates:
+            for column in date_columns:
+                if column in frame.columns:
+                    frame[column] = _to_datetime(frame[column])
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def pages_to_arrow(pages, flatten=None, parse_dates=True):
+    """
+    Builds a pyarrow Table from pages of raw entities, one record batch
+    per page. Nested values that are not flattened are kept as JSON strings.
+
+    @pages: iterable of lists of raw entities
+    @flatten: name of a dictionary column whose keys become columns
+    @parse_dates: parse the date_columns into UTC timestamps (default True)
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow exports: pip install python-orchestrator[arrow]")
+    tables = []
+    for page in pages:
+        columns = _page_columns(page, flatten)
+        arrays = {}
+        for name, values in columns.items():
+            array = _arrow_array(values)
+            if parse_dates and name in date_columns and pa.types.is_string(array.type):
+                try:
+                    array = pc.cast(array, pa.timestamp("ns", tz="UTC"))
+                except pa.ArrowInvalid as err:
+                    logging.debug(f"Column {name} left as strings: {err}")
+            arrays[name] = array
+        tables.append(pa.table(arrays))
+    if not tables:
+        return pa.table({})
+    return pa.concat_tables(_unify(tables), promote_options="permissive")
+
+
+def frame_to_columns(df):
+    """
+    Converts the columns of a DataFrame into lists of JSON serializable
+    values, a column at a time. Missing values (NaN, NaT, None, NA) become
+    None, datetimes ISO 8601 strings (UTC for timezone aware columns),
+    timedeltas seconds, Decimals strings and numpy scalars Python numbers.
+    The index is ignored.
+
+    @df: a pandas DataFrame
+    @returns: a dictionary of column name -> list of values
+    """
+    return {str(name): _json_column(series) for name, series in df.items()}
+
+
+def _page_columns(page, flatten=None):
+    """
+    Turns a list of entities into a dictionary of columns, leaving out
+    the odata annotations
+    """
+    names = [name for name in dict.fromkeys(key for row in page for key in row) if "@odata" not in name]
+    columns = {name: [row.get(name) for row in page] for name in names}
+    if flatten and flatten in columns:
+        contents = [content or {} for content in columns.pop(flatten)]
+        for key in dict.fromkeys(key for content in contents for key in content):
+            if "@odata" not in key:
+                columns[f"{flatten}.{key}"] = [content.get(key) for content in contents]
+    return columns
+
+
+def _to_datetime(column):
+    # format="ISO8601" (pandas 2) accepts dates with and without fractional seconds in the same column
+    return pd.to_datetime(column, utc=True, format="ISO8601", errors="coerce")
+
+
+def _arrow_array(values):
+    if any(isinstance(value, (dict, list)) for value in values):
+        values = [value if value is None or isinstance(value, str) else json.dumps(value) for value in values]
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([value if value is None else str(value) for value in values])
+
+
+def _unify(tables):
+    """
+    Casts to strings the columns whose type changes from one page to another
+    (e.g. a SpecificContent key holding numbers and text)
+    """
+    types: Dict[str, Set[Any]] = {}
+    for table in tables:
+        for field in table.schema:
+            if not pa.types.is_null(field.type):
+                types.setdefault(field.name, set()).add(field.type)
+    mixed = {name for name, found in types.items() if len(found) > 1}
+    if not mixed:
+        return tables
+    unified = []
+    for table in tables:
+        for name in mixed & set(table.column_names):
+            index = table.column_names.index(name)
+            table = table.set_column(index, name, pc.cast(table.column(index), pa.string()))
+        unified.append(table)
+    return unified
+
+
+def _json_column(series):
+    missing = series.isna()
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series
+        if getattr(series.dt, "tz", None) is not None:
+            values = series.dt.tz_convert("UTC").dt.tz_localize(None)
+        suffix = "Z" if values is not series else ""
+        micros = values.dt.microsecond[~missing]
+        unit: Literal["s", "ms", "us"] = "s" if not micros.any() else "ms" if not (micros % 1000).any() else "us"
+        values = [value + suffix for value in np.datetime_as_string(values.to_numpy(), unit=unit)]
+    elif pd.api.types.is_timedelta64_dtype(series.dtype):
+        values = series.dt.total_seconds().tolist()
+    else:
+        values = series.tolist()
+        if series.dtype == object:
+            values = [_json_value(value) for value in values]
+    if missing.any():
+        values = [None if absent else value for value, absent in zip(values, missing.tolist())]
+    return values
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return value
+    if isinstance(value, (datetime.timedelta, np.timedelta64)):
+        return pd.Timedelta(value).total_seconds()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
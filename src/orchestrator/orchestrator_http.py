@@ -1,21 +1,38 @@
-from datetime import datetime
 import requests
 import random
 import json
 import string
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from itertools import islice
+from typing import Any, Deque, List
 from pprint import pprint
 import logging
+from urllib.parse import urlparse, urlencode
+from urllib3.exceptions import NewConnectionError
+from requests.adapters import HTTPAdapter
 
-from orchestrator.exceptions import OrchestratorAuthException, OrchestratorMissingParam
+from orchestrator.exceptions import OrchestratorAuthException, OrchestratorMissingParam, OrchestratorRequestError, OrchestratorCircuitOpen
+from orchestrator.orchestrator_batch import Batch
+from orchestrator.orchestrator_cache import ResponseCache
+from orchestrator.orchestrator_context import ClientContext
+from orchestrator.orchestrator_index import NameIndexes
+from orchestrator.orchestrator_retry import RetryPolicy
+from orchestrator.orchestrator_token import TokenManager, FileTokenStore
 
 
 class OrchestratorHTTP(object):
     cloud_url = "https://cloud.uipath.com"
     account_url = "https://account.uipath.com"
     oauth_endpoint = "/oauth/token"
-    _now = datetime.now()
-    _token_expires = datetime.now()
-    access_token = None
+    pool_connections = 4
+    pool_maxsize = 32
+    page_size = 1000
+    batch_size = 100
+    _default_session = None
+    _default_session_lock = threading.Lock()
 
     def __init__(
         self,
@@ -24,19 +41,34 @@ class OrchestratorHTTP(object):
         tenant_name=None,
         folder_id=None,
         session=None,
-        file=None
+        file=None,
+        access_token=None,
+        token_manager=None,
+        token_margin=60,
+        token_store=None,
+        retry_policy=None,
+        rate_limiter=None,
+        response_cache=None,
+        name_index=None,
+        result_sink=None,
+        context=None
 
     ):
+        self.folder_id = folder_id
+        self.last_retries = 0
+        if context is not None:
+            self.context = context
+            return
         if not client_id or not refresh_token:
             if file:
                 f = open(file)
                 try:
                     data = json.load(f)
-                    self.client_id = data["client_id"]
-                    self.refresh_token = data["refresh_token"]
-                    self.tenant_name = data["tenant_name"]
-                    self.base_url = f"{self.cloud_url}/{self.tenant_name}/JTBOT/odata"
+                    client_id = data["client_id"]
+                    refresh_token = data["refresh_token"]
+                    tenant_name = data["tenant_name"]
                     self.folder_id = data["folder_id"]
+                    token_store = token_store or data.get("token_cache")
                 except KeyError as err:
                     print(err)
                     raise
@@ -44,43 +76,127 @@ class OrchestratorHTTP(object):
                 raise OrchestratorAuthException(
                     value=None, message="client id and refresh token cannot be left empty"
                 )
+        if not session:
+            session = self.default_session()
+        if not token_manager:
+            if isinstance(token_store, str):
+                token_store = FileTokenStore(token_store)
+            token_manager = TokenManager(client_id, refresh_token, f"{self.account_url}{self.oauth_endpoint}",
+                                         session=session, margin=token_margin, access_token=access_token,
+                                         store=token_store, store_key=FileTokenStore.key(client_id, tenant_name))
+        if response_cache is None:
+            response_cache = ResponseCache()
+        self.context = ClientContext(client_id, refresh_token, tenant_name, f"{self.cloud_url}/{tenant_name}/JTBOT/odata",
+                                     session, token_manager, retry_policy or RetryPolicy(), rate_limiter,
+                                     response_cache if response_cache is not False else None, name_index or NameIndexes(), result_sink)
 
-        else:
-            self.client_id = client_id
-            self.refresh_token = refresh_token
-            self.folder_id = folder_id
-            self.tenant_name = tenant_name
-            self.base_url = f"{self.cloud_url}/{self.tenant_name}/JTBOT/odata"
-        if session:
-            self.session = session
-        else:
-            self.session = requests.Session()
-        self.expired = True
+    @classmethod
+    def new_session(cls, pool_connections=None, pool_maxsize=None):
+        """
+        Returns a requests.Session whose connection pool keeps up to
+        `pool_maxsize` keep-alive connections per host, so that threads
+        sharing it do not open (and TLS handshake) new connections
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections or cls.pool_connections,
+                              pool_maxsize=pool_maxsize or cls.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @classmethod
+    def default_session(cls):
+        """
+        Session shared by the entities created without one
+        """
+        with cls._default_session_lock:
+            if OrchestratorHTTP._default_session is None:
+                OrchestratorHTTP._default_session = cls.new_session()
+            return OrchestratorHTTP._default_session
+
+    @property
+    def client_id(self):
+        return self.context.client_id
+
+    @property
+    def refresh_token(self):
+        return self.context.refresh_token
+
+    @property
+    def tenant_name(self):
+        return self.context.tenant_name
+
+    @property
+    def base_url(self):
+        return self.context.base_url
+
+    @property
+    def session(self):
+        return self.context.session
+
+    @property
+    def token_manager(self):
+        return self.context.token_manager
+
+    @property
+    def retry_policy(self):
+        return self.context.retry_policy
+
+    @property
+    def rate_limiter(self):
+        return self.context.rate_limiter
+
+    @property
+    def response_cache(self):
+        return self.context.response_cache
+
+    @property
+    def name_index(self):
+        return self.context.name_index
+
+    @property
+    def result_sink(self):
+        return self.context.result_sink
+
+    @property
+    def access_token(self):
+        return self.token_manager.access_token
+
+    @access_token.setter
+    def access_token(self, token):
+        self.token_manager.access_token = token
+
+    @property
+    def expired(self):
+        return self.token_manager.expired
+
+    def _shared_state(self):
+        """
+        Keyword arguments handed to every entity derived from this one so
+        that they all share the same context (credentials, session, token,
+        retry policy, rate limiter, response cache, name indexes and result sink)
+        """
+        return {"context": self.context}
+
+    def invalidate_cache(self, endpoint=None):
+        """
+        Drops the cached responses of the endpoint's class (e.g. "/Folders"),
+        or every cached response if no endpoint is given
+        """
+        if self.response_cache is not None:
+            self.response_cache.invalidate(f"{self.base_url}{endpoint}" if endpoint else None)
 
     @staticmethod
     def generate_reference():
         return ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
 
     def _get_token(self):
-        body = {
-            "grant_type": "refresh_token",
-            "client_id": self.client_id,
-            "refresh_token": self.refresh_token,
-        }
-        headers = {"Content-Type": "application/json"}
-        url = f"{self.account_url}{self.oauth_endpoint}"
-        try:
-            r = self.session.post(url=url, data=json.dumps(body), headers=headers)
-            token_data = r.json()
-            token = token_data["access_token"]
-            expiracy = token_data["expires_in"]
-            self.access_token = token
-            self._token_expires = expiracy
-        except Exception as err:
-            print(err)
+        return self.token_manager.refresh(stale=self.access_token)
 
-    def _auth_header(self):
-        return {"Authorization": f"Bearer {self.access_token}"}
+    def _auth_header(self, token=None):
+        if token is None:
+            token = self.token_manager.get_token()
+        return {"Authorization": f"Bearer {token}"}
 
     @staticmethod
     def _content_header():
@@ -89,40 +205,52 @@ class OrchestratorHTTP(object):
     def _folder_header(self):
         if not self.folder_id:
             raise OrchestratorAuthException(value="folder id", message="folder cannot be null")
-        return {"X-UIPATH-OrganizationUnitId": f"{self.folder_id}"}
+        return self.context.folder_header(self.folder_id)
 
-    def _internal_call(self, method, endpoint, *args, **kwargs):
-        # pprint(self.folder_id)
-        # if self.expired:
-        #     logging.debug("Token has expired")
-        #     self._get_token()
-        #     self.expired = False
+    def batch(self, max_size=None):
+        """
+        Returns a Batch context: the calls made inside it by this client
+        and its entities are sent together in OData $batch requests
+
+        @max_size: maximum number of calls per request (default 100)
+        """
+        return Batch(self, max_size)
 
-        headers = self._auth_header()
-        # pprint(headers)
+    def _internal_call(self, method, endpoint, *args, idempotent=None, **kwargs):
+        # pprint(self.folder_id)
+        headers = {}
         if method == "POST":
             headers.update(self._content_header())
         if self.folder_id:
             headers.update(self._folder_header())
+        request_kwargs = {}
+        if kwargs:
+            # pprint(kwargs)
+            request_kwargs["json"] = kwargs['body'].get('body')
+        batch = Batch.current()
+        if batch is not None and batch.accepts(self):
+            return batch.add(method, endpoint, headers, request_kwargs.get("json"))
+        cached = self._cached(method, endpoint, headers)
+        if cached is not None and not cached.expired:
+            return cached.value()
+        token = self.token_manager.get_token()
+        headers.update(self._auth_header(token))
         try:
             # print(endpoint)
-            if kwargs:
-                # pprint(kwargs)
-                item_data = kwargs['body']['body']
-                # pprint(json.dumps(item_data))
-                # pprint(item_data)
-                r = self.session.request(method, endpoint, json=item_data, headers=headers)
-            else:
-                r = self.session.request(method, endpoint, headers=headers)
-                # print(r.status_code)
-                if r.status_code == 401:
-                    self._get_token()
-                    headers = self._auth_header()
-                    r_retry = self.session.request(method, endpoint, headers=headers)
-                    return r_retry.json()
-                if r.status_code not in range(200, 400):
-                    logging.error(f"An error ocurred.\nStatus code: {r.status_code}")
-                    # print(r.json())
+            r = self._send(method, endpoint, headers, request_kwargs, idempotent)
+            # print(r.status_code)
+            if r.status_code == 401:
+                token = self.token_manager.refresh(stale=token)
+                headers.update(self._auth_header(token))
+                r = self._send(method, endpoint, headers, request_kwargs, idempotent)
+            if cached is not None and r.status_code == 304:
+                self.response_cache.revalidated(cached)
+                return cached.value()
+            if method == "GET" and r.status_code == 200 and self.response_cache is not None:
+                self.response_cache.put(endpoint, self.folder_id, r.content, r.headers.get("ETag"))
+            if r.status_code not in range(200, 400):
+                logging.error(f"An error ocurred.\nStatus code: {r.status_code}")
+                # print(r.json())
             # print(endpoint)
             logging.debug(f"{r.status_code} ---- {r.url}")
             try:
@@ -134,16 +262,292 @@ class OrchestratorHTTP(object):
             print(err)
             raise
 
+    def _cached(self, method, endpoint, headers):
+        """
+        Returns the cache entry of a GET (adding If-None-Match to the headers
+        when it has expired), and drops the cached responses a write affects
+        """
+        if self.response_cache is None:
+            return None
+        if method != "GET":
+            self.response_cache.invalidate(endpoint)
+            return None
+        entry = self.response_cache.get(endpoint, self.folder_id)
+        if entry is not None and entry.expired:
+            if not entry.etag:
+                return None
+            headers["If-None-Match"] = entry.etag
+        return entry
+
+    def _send(self, method, endpoint, headers, request_kwargs, idempotent=None):
+        """
+        Sends a request applying the retry policy and the circuit breaker of
+        the target host. The number of retries of the call is left in
+        self.last_retries.
+        """
+        policy = self.retry_policy
+        host = urlparse(endpoint).netloc
+        breaker = policy.breaker(host)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                policy.record(attempt, exhausted=True)
+                raise OrchestratorCircuitOpen(value=host, message=f"Circuit open for {host}: too many consecutive failures")
+            if self.rate_limiter:
+                self.rate_limiter.acquire(method, endpoint)
+            try:
+                r = self.session.request(method, endpoint, headers=headers, **request_kwargs)
+            except requests.exceptions.RequestException as err:
+                breaker.record_failure()
+                if attempt < policy.total and policy.should_retry_error(method, sent=self._request_sent(err), idempotent=idempotent):
+                    wait = policy.backoff(attempt)
+                    logging.warning(f"{method} {endpoint} failed ({err}), retrying in {wait:.2f}s")
+                    time.sleep(wait)
+                    attempt += 1
+                    continue
+                self.last_retries = attempt
+                policy.record(attempt, exhausted=attempt > 0)
+                raise
+            if r.status_code >= 500:
+                breaker.record_failure()
+            elif r.status_code == 429:
+                breaker.record_throttled()
+            else:
+                breaker.record_success()
+            retry_after = policy.parse_retry_after(r.headers.get("Retry-After"))
+            if self.rate_limiter:
+                if r.status_code == 429:
+                    self.rate_limiter.throttled(method, endpoint, retry_after)
+                else:
+                    self.rate_limiter.succeeded(method, endpoint)
+            if policy.should_retry_status(method, r.status_code, retry_after, idempotent):
+                if attempt < policy.total:
+                    wait = policy.backoff(attempt, r.status_code, retry_after)
+                    logging.warning(f"{method} {endpoint} returned {r.status_code}, retrying in {wait:.2f}s")
+                    time.sleep(wait)
+                    attempt += 1
+                    continue
+                self.last_retries = attempt
+                policy.record(attempt, exhausted=True)
+                if policy.raise_on_exhausted:
+                    raise OrchestratorRequestError(value=r.status_code,
+                                                   message=f"{method} {endpoint} failed with status {r.status_code} after {attempt} retries")
+                return r
+            self.last_retries = attempt
+            policy.record(attempt)
+            return r
+
+    @staticmethod
+    def _request_sent(err):
+        """
+        False when the connection could not even be established
+        """
+        if isinstance(err, requests.exceptions.ConnectTimeout):
+            return False
+        if isinstance(err, requests.exceptions.ConnectionError):
+            reason = getattr(err.args[0], "reason", None) if err.args else None
+            return not isinstance(reason, NewConnectionError)
+        return True
+
     def _get(self, url, *args, **kwargs):
 
         return self._internal_call("GET", url, args, kwargs)
 
-    def _post(self, url, *args, **kwargs):
+    def _post(self, url, *args, idempotent=None, **kwargs):
         # pprint(kwargs)
-        return self._internal_call("POST", url, args, body=kwargs)
+        return self._internal_call("POST", url, args, idempotent=idempotent, body=kwargs)
 
     def _put(self, url, *args, **kwargs):
         return self._internal_call("PUT", url, args, body=kwargs)
 
     def _delete(self, url, *args, **kwargs):
         return self._internal_call("DELETE", url, args, kwargs)
+
+    @staticmethod
+    def _select(options=None, fields=None, expand=None, required=()):
+        """
+        Returns a copy of the odata options projected to the given fields
+
+        @options: dictionary of odata filtering options
+        @fields: list of columns to download ($select). The `required`
+        columns, needed to build the entities, are always added
+        @expand: list of navigation properties to expand ($expand)
+        """
+        query = dict(options or {})
+        if fields:
+            columns = list(required) + [field for field in fields if field not in required]
+            query["$select"] = ",".join(columns)
+        if expand:
+            query["$expand"] = ",".join(expand)
+        return query
+
+    @staticmethod
+    def _odata_string(value):
+        """
+        Quotes a value as an odata string literal
+        """
+        return "'" + str(value).replace("'", "''") + "'"
+
+    def _lookup_query(self, column, value):
+        return {"$filter": f"{column} eq {self._odata_string(value)}", "$select": f"Id,{column}", "$top": 2}
+
+    def _lookup_id(self, endpoint, index, value, column="Name"):
+        """
+        Returns the id of the entity whose `column` equals `value`, from
+        the index or with an exact $filter, recording it in the index
+        """
+        entity_id = index.id(value)
+        if entity_id is None:
+            rows = self._get(self._odata_url(endpoint, self._lookup_query(column, value)))["value"]
+            entity_id = self._indexed(rows, index, value)
+        return entity_id
+
+    @staticmethod
+    def _indexed(rows, index, value):
+        if not rows:
+            return None
+        if len(rows) > 1:
+            logging.warning(f"More than one entity named {value}, using the first one")
+        index.add(rows[0]["Id"], value)
+        return rows[0]["Id"]
+
+    def _odata_url(self, endpoint, options=None):
+        if options:
+            return f"{self.base_url}{endpoint}?{urlencode(options)}"
+        return f"{self.base_url}{endpoint}"
+
+    def _iter_pages(self, endpoint, options=None, page_size=None, order_by="Id"):
+        """
+        Generator over the pages (lists of raw entities) of an odata list endpoint.
+
+        Pages of `page_size` entities are requested with $top/$skip, and any
+        @odata.nextLink the server sends within a page is followed. A $top
+        in the options limits the total number of entities returned.
+        Unless the options set an $orderby, results are sorted by `order_by`
+        so that pages do not overlap.
+
+        @endpoint: the endpoint, relative to the base url (e.g. "/QueueItems")
+        @options: dictionary of odata filtering options
+        @page_size: number of entities per request (default 1000)
+        """
+        page_size = int(page_size or self.page_size)
+        query = dict(options or {})
+        remaining = int(query.pop("$top")) if "$top" in query else None
+        skip = int(query.pop("$skip", 0))
+        if order_by and "$orderby" not in query:
+            query["$orderby"] = order_by
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            got = 0
+            for values in self._iter_window(endpoint, query, skip, size):
+                got += len(values)
+                yield values
+            skip += got
+            if remaining is not None:
+                remaining -= got
+            if got < size:
+                return
+
+    def _iter_window(self, endpoint, query, skip, size):
+        """
+        Yields the pages of the `size` entities starting at `skip`,
+        following the @odata.nextLink of the server if it sends smaller pages
+        """
+        url = f"{self.base_url}{endpoint}?{urlencode(dict(query, **{'$top': size, '$skip': skip}))}"
+        while url:
+            data = self._get(url)
+            if data["value"]:
+                yield data["value"]
+            url = data.get("@odata.nextLink")
+
+    def _count(self, endpoint, options=None):
+        """
+        Returns the number of entities matching the $filter of the options
+        without downloading them ($count=true&$top=0)
+        """
+        data = self._get(self._odata_url(endpoint, self._count_query(options)))
+        return int(data["@odata.count"])
+
+    @staticmethod
+    def _count_query(options=None):
+        query = {k: v for k, v in (options or {}).items() if k in ("$filter", "$search")}
+        query.update({"$count": "true", "$top": 0})
+        return query
+
+    @staticmethod
+    def _and_filter(*clauses):
+        """
+        Joins the non empty odata $filter clauses with `and`
+        """
+        present = [clause for clause in clauses if clause]
+        if len(present) == 1:
+            return present[0]
+        return " and ".join(f"({clause})" for clause in present) or None
+
+    def _scan_pages(self, endpoint, options=None, page_size=None, max_workers=8, ordered=True, order_by="Id"):
+        """
+        Parallel version of _iter_pages for big result sets.
+
+        The total is read first with $count, then the $skip ranges are
+        downloaded by up to `max_workers` threads. Only `max_workers` pages
+        are requested ahead of the consumer, so memory stays bounded.
+        With `ordered` the pages are yielded in order, otherwise as soon as
+        they arrive. Entities created or deleted during the scan can shift
+        the ranges, so prefer a stable $filter (e.g. on CreationTime) for
+        queues that are being worked on.
+
+        @endpoint: the endpoint, relative to the base url
+        @options: dictionary of odata filtering options ($top limits the total)
+        @page_size: number of entities per request (default 1000)
+        @max_workers: maximum number of simultaneous requests (default 8)
+        @ordered: yield the pages in order (default True)
+        """
+        page_size = int(page_size or self.page_size)
+        query = dict(options or {})
+        top = int(query.pop("$top")) if "$top" in query else None
+        start = int(query.pop("$skip", 0))
+        if order_by and "$orderby" not in query:
+            query["$orderby"] = order_by
+        end = self._count(endpoint, query)
+        if top is not None:
+            end = min(end, start + top)
+        windows = iter([(skip, min(page_size, end - skip)) for skip in range(start, end, page_size)])
+
+        def fetch(window):
+            return [value for page in self._iter_window(endpoint, query, *window) for value in page]
+
+        pending: Deque["Future[List[Any]]"] = deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for window in islice(windows, max_workers):
+                    pending.append(executor.submit(fetch, window))
+                while pending:
+                    if ordered:
+                        done = pending.popleft()
+                    else:
+                        done = next(as_completed(pending))
+                        pending.remove(done)
+                    page = done.result()
+                    for window in islice(windows, 1):
+                        pending.append(executor.submit(fetch, window))
+                    if page:
+                        yield page
+            finally:
+                # when the consumer stops early, drop the pages not started yet
+                # and let the executor wait for the requests in flight
+                for future in pending:
+                    future.cancel()
+
+    def _scan_values(self, endpoint, options=None, page_size=None, max_workers=8, ordered=True, order_by="Id"):
+        """
+        Same as _scan_pages, but yields the raw entities one by one
+        """
+        for page in self._scan_pages(endpoint, options, page_size, max_workers, ordered, order_by):
+            yield from page
+
+    def _iter_values(self, endpoint, options=None, page_size=None, order_by="Id"):
+        """
+        Same as _iter_pages, but yields the raw entities one by one
+        """
+        for page in self._iter_pages(endpoint, options, page_size, order_by):
+            yield from page
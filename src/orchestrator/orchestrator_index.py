@@ -0,0 +1,94 @@
+import threading
+
+__all__ = ["NameIndex", "NameIndexes"]
+
+"""
+In memory name <-> id indexes used by the name lookups
+"""
+
+
+class NameIndex(object):
+    """
+    Bidirectional map between the names and the ids of one kind of entity
+    (e.g. the queues of a folder).
+
+    It is filled lazily: by the name lookups, and by every list call that
+    downloads entities of its kind, so it is refreshed incrementally
+    instead of being rebuilt.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def id(self, name):
+        """
+        Returns the id of the entity with the given name, or None
+        """
+        return self._ids.get(name)
+
+    def name(self, entity_id):
+        """
+        Returns the name of the entity with the given id, or None
+        """
+        return self._names.get(entity_id)
+
+    def add(self, entity_id, name):
+        """
+        Records an entity, replacing any previous name of the id
+        """
+        with self._lock:
+            self._discard(entity_id)
+            self._ids[name] = entity_id
+            self._names[entity_id] = name
+
+    def update(self, names):
+        """
+        Records a dictionary of ids and names
+        """
+        for entity_id, name in names.items():
+            self.add(entity_id, name)
+
+    def discard(self, entity_id):
+        """
+        Forgets an entity (e.g. after deleting it)
+        """
+        with self._lock:
+            self._discard(entity_id)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+
+    def _discard(self, entity_id):
+        name = self._names.pop(entity_id, None)
+        if name is not None and self._ids.get(name) == entity_id:
+            del self._ids[name]
+
+
+class NameIndexes(object):
+    """
+    The NameIndex of every kind of entity and folder of a client, shared by
+    every entity derived from it
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, folder_id=None):
+        """
+        Returns the index of the `kind` entities (e.g. "queues") of a folder
+        """
+        key = (kind, None if folder_id is None else str(folder_id))
+        index = self._indexes.get(key)
+        if index is None:
+            with self._lock:
+                index = self._indexes.setdefault(key, NameIndex())
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
@@ -1,29 +1,28 @@
+import logging
+import time
 from pprint import pprint
 from orchestrator.orchestrator_http import OrchestratorHTTP
-import requests
 from orchestrator.exceptions import OrchestratorMissingParam
 from urllib.parse import urlencode
-from orchestrator.orchestrator_logs import Log
+from orchestrator.orchestrator_logs import Log, LogTail
+from orchestrator.orchestrator_frames import pages_to_frame, pages_to_arrow
+from orchestrator.orchestrator_records import LogRecord
 
 
 class Job(OrchestratorHTTP):
-    def __init__(self, client_id, refresh_token, tenant_name, folder_id=None, folder_name=None, session=None, job_id=None, job_key=None, job_name=None, access_token=None):
-        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session)
+    final_states = ("Successful", "Faulted", "Stopped")
+
+    def __init__(self, client_id=None, refresh_token=None, tenant_name=None, folder_id=None, folder_name=None, session=None, job_id=None, job_key=None,
+                 job_name=None, access_token=None, **kwargs):
+        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session,
+                         access_token=access_token, **kwargs)
         if not job_key:
             raise OrchestratorMissingParam(value="asset_id",
                                            message="Required parameter(s) missing: asset_id")
-        self.tenant_name = tenant_name
-        self.access_token = access_token
-        self.base_url = f"{self.cloud_url}/{self.tenant_name}/JTBOT/odata"
-        self.folder_id = folder_id
         self.folder_name = folder_name
         self.id = job_id
         self.key = job_key
         self.name = job_name
-        if session:
-            self.session = session
-        else:
-            self.session = requests.Session()
 
     def __str__(self):
         return f"Key: {self.key}\nName: {self.name}"
@@ -81,14 +80,142 @@ class Job(OrchestratorHTTP):
         }
         return self._post(url, body=resume_body)
 
-    def get_logs(self, trace="Info"):
-        # need a Log Message class
+    def get_logs(self, trace="Info", fields=None, records=False):
+        """
+        Returns the most recent page of logs of the given level (see
+        iter_logs for all the logs, and tail_logs to follow them)
+        """
         endpoint = "/RobotLogs"
-        query_param = urlencode({
-            "$filter": f"ProcessName eq '{self.name}' and Level eq '{trace}' and JobKey eq {self.key}",
+        query_param = urlencode(self._select({
+            "$filter": self._logs_filter(trace),
             "$orderby": "TimeStamp desc"
-        })
+        }, fields))
         url = f"{self.base_url}{endpoint}?{query_param}"
         logs = self._get(url)["value"]
         # pprint(data[0])
-        return [Log(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.folder_name, self.session, log["Message"], log["Level"], self.key, log["TimeStamp"]) for log in logs]
+        new_log = self._log_factory(records)
+        return [new_log(log) for log in logs]
+
+    def iter_logs(self, levels=None, options=None, page_size=None, fields=None, records=True):
+        """
+        Generator over all the logs of the job (oldest first), fetched one
+        page at a time
+
+        @levels: a level or a list of levels, e.g. ["Warn", "Error"] (default: all levels)
+        @options: dictionary of odata filtering options
+        @page_size: number of logs requested per call (default 1000)
+        @fields: list of columns to download ($select)
+        @records: yield compact read only LogRecords (default True) instead of Logs
+        """
+        new_log = self._log_factory(records)
+        query = self._logs_query(levels, options, fields, required=("Id", "TimeStamp"))
+        for log in self._iter_values("/RobotLogs", query, page_size, order_by="TimeStamp,Id"):
+            yield new_log(log)
+
+    def tail_logs(self, levels=None, poll_interval=2, max_interval=30, since=None, until_finished=True, page_size=None,
+                  fields=None, records=True):
+        """
+        Generator that follows the logs of the job as they are written:
+        it yields the existing logs, then polls for the ones after the last
+        log read (by TimeStamp and Id), so every poll only downloads the
+        new logs. Polls are spaced out while the job writes nothing (see LogTail).
+
+        Logs that reach Orchestrator with a TimeStamp older than the last
+        log read (e.g. sent late by a disconnected robot) are not yielded.
+
+        @levels: a level or a list of levels, e.g. ["Warn", "Error"] (default: all levels)
+        @poll_interval: seconds between polls while logs arrive (default 2)
+        @max_interval: maximum seconds between polls (default 30)
+        @since: only logs after this datetime or ISO 8601 string (default: all)
+        @until_finished: return once the job has finished (Successful,
+        Faulted or Stopped) and its last logs have been read (default True);
+        otherwise the generator never returns
+        @page_size: maximum number of logs per call (default 1000)
+        @fields: list of columns to download ($select)
+        @records: yield compact read only LogRecords (default True) instead of Logs
+        """
+        tail = LogTail(self, levels, poll_interval, max_interval, since, page_size, fields)
+        new_log = self._log_factory(records)
+        while True:
+            page = self._get(self._odata_url("/RobotLogs", tail.query()))["value"]
+            for log in page:
+                yield new_log(log)
+            delay = tail.advance(page)
+            if not page and until_finished:
+                if tail.finished:
+                    return
+                tail.finished = self.info().get("State") in self.final_states
+            if delay:
+                logging.debug(f"Tailing the logs of {self.key}: next poll in {delay}s")
+                time.sleep(delay)
+
+    def scan_logs(self, trace=None, options=None, page_size=None, max_workers=8, ordered=True, fields=None, records=False):
+        """
+        Downloads all the logs of the job, fetching the pages concurrently
+
+        @trace: only return logs of this level (default: all levels)
+        @options: dictionary of odata filtering options
+        @page_size: number of logs requested per call (default 1000)
+        @max_workers: maximum number of simultaneous calls (default 8)
+        @ordered: yield the logs in order (default True)
+        @fields: list of columns to download ($select)
+        @records: yield compact read only LogRecords instead of Logs (default False)
+        """
+        new_log = self._log_factory(records)
+        for log in self._scan_values("/RobotLogs", self._logs_query(trace, options, fields), page_size, max_workers, ordered, order_by="TimeStamp,Id"):
+            yield new_log(log)
+
+    def logs_to_frame(self, trace=None, options=None, fields=None, parse_dates=True, page_size=None, max_workers=8):
+        """
+        Downloads all the logs of the job into a pandas DataFrame, built
+        from the pages of a parallel scan without creating Logs
+
+        @trace: only return logs of this level (default: all levels)
+        @options: dictionary of odata filtering options
+        @fields: list of columns to download ($select)
+        @parse_dates: parse the TimeStamp into UTC datetimes (default True)
+        @page_size: number of logs requested per call (default 1000)
+        @max_workers: maximum number of simultaneous calls (default 8)
+        """
+        return pages_to_frame(self._log_pages(trace, options, fields, page_size, max_workers), parse_dates=parse_dates)
+
+    def logs_to_arrow(self, trace=None, options=None, fields=None, parse_dates=True, page_size=None, max_workers=8):
+        """
+        Same as logs_to_frame, but returns a pyarrow Table
+        """
+        return pages_to_arrow(self._log_pages(trace, options, fields, page_size, max_workers), parse_dates=parse_dates)
+
+    def _log_pages(self, trace=None, options=None, fields=None, page_size=None, max_workers=8):
+        return self._scan_pages("/RobotLogs", self._logs_query(trace, options, fields), page_size, max_workers, order_by="TimeStamp,Id")
+
+    def _logs_query(self, trace=None, options=None, fields=None, required=()):
+        query = self._select(options, fields, required=required)
+        query["$filter"] = f"{self._logs_filter(trace)} and {query['$filter']}" if "$filter" in query else self._logs_filter(trace)
+        return query
+
+    def count_logs(self, trace=None, filter=None):
+        """
+        Returns the number of logs of the job without downloading them ($count)
+
+        @trace: only count logs of this level (default: all levels)
+        @filter: an odata $filter expression the logs must match (optional)
+        """
+        return self._count("/RobotLogs", {"$filter": self._and_filter(self._logs_filter(trace), filter)})
+
+    def _logs_filter(self, trace=None):
+        if isinstance(trace, (list, tuple, set)):
+            levels = " or ".join(f"Level eq '{level}'" for level in trace)
+            return f"ProcessName eq '{self.name}' and ({levels}) and JobKey eq {self.key}"
+        if trace:
+            return f"ProcessName eq '{self.name}' and Level eq '{trace}' and JobKey eq {self.key}"
+        return f"ProcessName eq '{self.name}' and JobKey eq {self.key}"
+
+    def _log_factory(self, records=False):
+        return self._new_log_record if records else self._new_log
+
+    def _new_log_record(self, log):
+        return LogRecord.from_row(self, log)
+
+    def _new_log(self, log):
+        return Log(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.folder_name, self.session, log.get("Message"), log.get("Level"),
+                   self.key, log.get("TimeStamp"), **self._shared_state())
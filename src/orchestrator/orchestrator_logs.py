@@ -1,27 +1,21 @@
 from datetime import datetime
 from orchestrator.orchestrator_http import OrchestratorHTTP
-import requests
 from orchestrator.exceptions import OrchestratorMissingParam
+from orchestrator.orchestrator_changes import Watermark
 
 
 class Log(OrchestratorHTTP):
-    def __init__(self, client_id, refresh_token, tenant_name, folder_id=None, folder_name=None, session=None, msg=None, trace=None, key=None, stamp=None):
-        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session)
+    def __init__(self, client_id=None, refresh_token=None, tenant_name=None, folder_id=None, folder_name=None, session=None, msg=None, trace=None, key=None,
+                 stamp=None, **kwargs):
+        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session, **kwargs)
         if not key:
             raise OrchestratorMissingParam(value="job key",
                                            message="Required parameter(s) missing: key")
-        self.tenant_name = tenant_name
-        self.base_url = f"{self.cloud_url}/{self.tenant_name}/JTBOT/odata"
-        self.folder_id = folder_id
         self.folder_name = folder_name
         self.key = key
         self.message = msg
         self.timestamp = stamp
         self.trace = trace
-        if session:
-            self.session = session
-        else:
-            self.session = requests.Session()
 
     def __str__(self):
         return f"Job Key: {self.key}\nMessage: {self.message}\nTimeStamp: {self.timestamp}\nTrace: {self.trace}"
@@ -36,3 +30,56 @@ class Log(OrchestratorHTTP):
         }
         url = f"{self.base_url}{endpoint}"
         return self._post(url, body=body)
+
+
+class LogTail(object):
+    """
+    Position and polling interval of Job.tail_logs.
+
+    The logs after the last one read (by TimeStamp, then Id) are requested
+    one page at a time. The interval between polls starts at
+    `poll_interval`, doubles after every poll that returns nothing up to
+    `max_interval`, and goes back to `poll_interval` when logs arrive.
+
+    @job: the Job
+    @levels: a level or a list of levels (default: all levels)
+    @poll_interval: seconds between polls while logs arrive (default 2)
+    @max_interval: maximum seconds between polls (default 30)
+    @since: only logs after this Watermark, datetime or ISO 8601 string
+    (default: all the logs of the job)
+    @page_size: maximum number of logs per call (default 1000)
+    @fields: list of columns to download ($select)
+    """
+
+    def __init__(self, job, levels=None, poll_interval=2, max_interval=30, since=None, page_size=None, fields=None):
+        self.job = job
+        self.levels = levels
+        self.poll_interval = poll_interval
+        self.max_interval = max(max_interval, poll_interval)
+        self.interval = poll_interval
+        self.watermark = Watermark.of(since)
+        self.page_size = int(page_size or job.page_size)
+        self.fields = fields
+        self.finished = False
+
+    def __repr__(self):
+        return f"<LogTail {self.job.key} at {self.watermark}, next poll in {self.interval}s>"
+
+    def query(self):
+        after = self.watermark.filter("TimeStamp") if self.watermark else None
+        query = {"$filter": self.job._and_filter(self.job._logs_filter(self.levels), after),
+                 "$orderby": "TimeStamp,Id", "$top": self.page_size}
+        return self.job._select(query, self.fields, required=("Id", "TimeStamp"))
+
+    def advance(self, page):
+        """
+        Moves past the logs of a page
+
+        @returns: seconds to wait before the next poll (0 after a full page)
+        """
+        if page:
+            self.watermark = Watermark(page[-1]["TimeStamp"], page[-1]["Id"])
+        if len(page) >= self.page_size:
+            return 0
+        self.interval = self.poll_interval if page else min(self.interval * 2, self.max_interval)
+        return self.interval
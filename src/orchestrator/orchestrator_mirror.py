@@ -0,0 +1,341 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+from orchestrator.orchestrator_changes import ChangeFeed, Watermark
+
+__all__ = ["Mirror"]
+
+"""
+Local SQLite copy of queue items, jobs and robot logs, kept up to date with
+incremental syncs and queried without calling Orchestrator
+"""
+
+QUEUE_ITEM_COLUMNS = (
+    ("id", "Id"), ("queue_id", "QueueDefinitionId"), ("folder_id", None), ("reference", "Reference"),
+    ("status", "Status"), ("priority", "Priority"), ("exception_type", "ProcessingExceptionType"),
+    ("exception_reason", "ProcessingException"), ("retry_number", "RetryNumber"),
+    ("creation_time", "CreationTime"), ("start_processing", "StartProcessing"),
+    ("end_processing", "EndProcessing"), ("last_modification_time", "LastModificationTime"),
+    ("specific_content", "SpecificContent"),
+)
+JOB_COLUMNS = (
+    ("id", "Id"), ("key", "Key"), ("folder_id", None), ("release_name", "ReleaseName"), ("state", "State"),
+    ("source", "Source"), ("host_machine_name", "HostMachineName"), ("info", "Info"),
+    ("creation_time", "CreationTime"), ("start_time", "StartTime"), ("end_time", "EndTime"),
+)
+LOG_COLUMNS = (
+    ("id", "Id"), ("job_key", "JobKey"), ("folder_id", None), ("process_name", "ProcessName"),
+    ("robot_name", "RobotName"), ("level", "Level"), ("timestamp", "TimeStamp"), ("message", "Message"),
+)
+TIME_COLUMNS = ("creation_time", "start_processing", "end_processing", "last_modification_time",
+                "start_time", "end_time", "timestamp")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_items (
+    id INTEGER PRIMARY KEY, queue_id INTEGER, folder_id INTEGER, reference TEXT, status TEXT,
+    priority TEXT, exception_type TEXT, exception_reason TEXT, retry_number INTEGER,
+    creation_time TEXT, start_processing TEXT, end_processing TEXT, last_modification_time TEXT,
+    specific_content TEXT
+);
+CREATE INDEX IF NOT EXISTS queue_items_status ON queue_items (queue_id, status);
+CREATE INDEX IF NOT EXISTS queue_items_reference ON queue_items (reference);
+CREATE INDEX IF NOT EXISTS queue_items_creation_time ON queue_items (creation_time);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY, key TEXT, folder_id INTEGER, release_name TEXT, state TEXT, source TEXT,
+    host_machine_name TEXT, info TEXT, creation_time TEXT, start_time TEXT, end_time TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+CREATE INDEX IF NOT EXISTS jobs_creation_time ON jobs (creation_time);
+CREATE TABLE IF NOT EXISTS robot_logs (
+    id INTEGER PRIMARY KEY, job_key TEXT, folder_id INTEGER, process_name TEXT, robot_name TEXT,
+    level TEXT, timestamp TEXT, message TEXT
+);
+CREATE INDEX IF NOT EXISTS robot_logs_job_key ON robot_logs (job_key, timestamp);
+CREATE INDEX IF NOT EXISTS robot_logs_timestamp ON robot_logs (timestamp);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY, time TEXT, last_id INTEGER, new_id INTEGER, synced_at TEXT
+);
+"""
+
+
+_offset = re.compile(r"[+-]\d{2}:?\d{2}$")
+
+
+def _timestamp(value):
+    """
+    Normalizes an Orchestrator timestamp or a datetime to UTC, as
+    YYYY-MM-DDTHH:MM:SS.ffffffZ, so that timestamps compare as strings.
+    Strings and datetimes without an offset are taken as UTC.
+    """
+    if not value:
+        return None
+    offset = None if isinstance(value, datetime) else _offset.search(value)
+    if offset is not None:
+        seconds, _, fraction = value[:offset.start()].partition(".")
+        sign, digits = offset.group()[0], offset.group()[1:].replace(":", "")
+        delta = timedelta(hours=int(digits[:2]), minutes=int(digits[2:]))
+        value = datetime.fromisoformat(f"{seconds[:19]}.{(fraction + '000000')[:6]}").replace(tzinfo=timezone(-delta if sign == "-" else delta))
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    seconds, _, fraction = value.rstrip("Z").partition(".")
+    return f"{seconds[:19]}.{(fraction + '000000')[:6]}Z"
+
+
+class Mirror(object):
+    """
+    A SQLite database holding a copy of the queue items, jobs and robot
+    logs of some queues, folders and jobs, for analytics that would
+    otherwise mean scanning the tenant again and again.
+
+    Every sync only downloads what changed since the previous one of the
+    same source, and upserts it (by Id) in a single transaction with the
+    position reached, so an interrupted sync resumes where it stopped:
+
+    - queue items: the change feed of the queue (see Queue.changes)
+    - jobs: the jobs created since the last sync, and the ones that were
+      not finished then
+    - robot logs: the logs created since the last sync (by Id)
+
+    Deleted queue items are not removed from the mirror. Status, Reference,
+    CreationTime and JobKey are indexed; SpecificContent is only stored (as
+    JSON, queried with json_extract) when the queue is synced with
+    specific_content=True.
+
+    @path: the database file (":memory:" for a temporary one)
+    """
+    final_job_states = ("Successful", "Faulted", "Stopped")
+
+    def __init__(self, path):
+        self.path = path if path == ":memory:" else os.path.abspath(os.path.expanduser(path))
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"<Mirror {self.path}>"
+
+    def close(self):
+        self.connection.close()
+
+    def sync_queue(self, queue, specific_content=False, page_size=None):
+        """
+        Upserts the items of the queue created or modified since the last sync
+
+        @queue: the Queue
+        @specific_content: also store the SpecificContent of the items (default False)
+        @page_size: number of items per call (default 1000)
+        @returns: the number of items upserted
+        """
+        fields = [field for column, field in QUEUE_ITEM_COLUMNS if field and (specific_content or column != "specific_content")]
+        name = f"queue:{queue.tenant_name}:{queue.folder_id}:{queue.id}"
+        watermark = self._watermark(name)
+        feed = ChangeFeed(queue, watermark, page_size=page_size, fields=fields)
+        count = 0
+        started = time.perf_counter()
+        for page in feed.pages():
+            position = feed.watermark
+            self._upsert("queue_items", QUEUE_ITEM_COLUMNS, page, queue.folder_id, name, position.time, position.id, position.new_id)
+            count += len(page)
+        logging.info(f"Mirror: {count} items of {queue.name} synced in {time.perf_counter() - started:.2f}s")
+        return count
+
+    def sync_jobs(self, folder, page_size=None):
+        """
+        Upserts the jobs of the folder created since the last sync, and
+        updates the ones that were not finished (Successful, Faulted or Stopped)
+
+        @folder: the Folder
+        @page_size: number of jobs per call (default 1000)
+        @returns: the number of jobs upserted
+        """
+        name = f"jobs:{folder.tenant_name}:{folder.id}"
+        fields = [field for _, field in JOB_COLUMNS if field]
+        open_ids = [row[0] for row in self.connection.execute(
+            f"SELECT id FROM jobs WHERE folder_id = ? AND (state NOT IN ({', '.join('?' * len(self.final_job_states))}) OR state IS NULL)",
+            (folder.id, *self.final_job_states))]
+        count = 0
+        for start in range(0, len(open_ids), 50):
+            odata_filter = " or ".join(f"Id eq {job_id}" for job_id in open_ids[start:start + 50])
+            rows = folder._get(folder._odata_url("/Jobs", folder._select({"$filter": odata_filter}, fields)))["value"]
+            self._upsert("jobs", JOB_COLUMNS, rows, folder.id)
+            count += len(rows)
+        count += self._sync_by_id(folder, "/Jobs", "jobs", JOB_COLUMNS, fields, None, name, folder.id, page_size)
+        logging.info(f"Mirror: {count} jobs of {folder.name} synced")
+        return count
+
+    def sync_logs(self, source, levels=None, page_size=None):
+        """
+        Upserts the robot logs created since the last sync
+
+        @source: a Job (its logs) or a Folder (all the logs of the folder)
+        @levels: only store logs of these levels, e.g. ["Warn", "Error"] (default: all)
+        @page_size: number of logs per call (default 1000)
+        @returns: the number of logs upserted
+        """
+        if hasattr(source, "key"):
+            name = f"logs:{source.tenant_name}:{source.folder_id}:{source.key}"
+            odata_filter = source._logs_filter()
+        else:
+            name = f"logs:{source.tenant_name}:{source.folder_id}"
+            odata_filter = None
+        if levels:
+            name += ":" + ",".join(sorted(levels))
+            odata_filter = source._and_filter(odata_filter, " or ".join(f"Level eq '{level}'" for level in levels))
+        fields = [field for _, field in LOG_COLUMNS if field]
+        count = self._sync_by_id(source, "/RobotLogs", "robot_logs", LOG_COLUMNS, fields, odata_filter, name, source.folder_id, page_size)
+        logging.info(f"Mirror: {count} logs synced ({name})")
+        return count
+
+    def query(self, sql, params=()):
+        """
+        Runs a SQL query on the mirror and returns the rows as dictionaries
+        (tables: queue_items, jobs, robot_logs)
+        """
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def items(self, queue_id=None, status=None, reference=None, exception_type=None, since=None, until=None,
+              content=None, limit=None):
+        """
+        Returns the mirrored queue items matching all the given criteria,
+        oldest first, as dictionaries (SpecificContent decoded)
+
+        @queue_id: the queue definition id
+        @status: an item status, e.g. "Failed"
+        @reference: the exact Reference
+        @exception_type: e.g. "BusinessException"
+        @since, @until: CreationTime range (datetime or ISO 8601 string)
+        @content: dictionary of SpecificContent values, e.g. {"Vendor": "X"}
+        (only for queues synced with specific_content=True)
+        @limit: maximum number of items
+        """
+        where, params = self._item_filter(queue_id, status, reference, exception_type, since, until, content)
+        sql = f"SELECT * FROM queue_items{where} ORDER BY creation_time, id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        rows = self.query(sql, params)
+        for row in rows:
+            if row["specific_content"] is not None:
+                row["specific_content"] = json.loads(row["specific_content"])
+        return rows
+
+    def count_items(self, queue_id=None, status=None, reference=None, exception_type=None, since=None, until=None,
+                    content=None):
+        """
+        Returns the number of mirrored queue items matching all the given
+        criteria (see items)
+        """
+        where, params = self._item_filter(queue_id, status, reference, exception_type, since, until, content)
+        return self.connection.execute(f"SELECT COUNT(*) FROM queue_items{where}", params).fetchone()[0]
+
+    def jobs(self, folder_id=None, state=None, release_name=None, since=None, until=None, limit=None):
+        """
+        Returns the mirrored jobs matching all the given criteria, most
+        recent first (@since, @until: CreationTime range)
+        """
+        where, params = self._where(("folder_id", folder_id), ("state", state), ("release_name", release_name),
+                                    ("creation_time >=", since), ("creation_time <", until))
+        sql = f"SELECT * FROM jobs{where} ORDER BY creation_time DESC, id DESC"
+        return self.query(sql + (f" LIMIT {int(limit)}" if limit else ""), params)
+
+    def logs(self, job_key=None, level=None, since=None, until=None, limit=None):
+        """
+        Returns the mirrored robot logs matching all the given criteria,
+        in order (@since, @until: TimeStamp range)
+        """
+        where, params = self._where(("job_key", job_key), ("level", level), ("timestamp >=", since), ("timestamp <", until))
+        sql = f"SELECT * FROM robot_logs{where} ORDER BY timestamp, id"
+        return self.query(sql + (f" LIMIT {int(limit)}" if limit else ""), params)
+
+    def _item_filter(self, queue_id, status, reference, exception_type, since, until, content):
+        conditions = [("queue_id", queue_id), ("status", status), ("reference", reference),
+                      ("exception_type", exception_type), ("creation_time >=", since), ("creation_time <", until)]
+        where, params = self._where(*conditions)
+        for key, value in (content or {}).items():
+            where += f"{' AND' if where else ' WHERE'} json_extract(specific_content, ?) = ?"
+            params += [f'$."{key}"', value]
+        return where, params
+
+    @staticmethod
+    def _where(*conditions):
+        clauses = []
+        params = []
+        for column, value in conditions:
+            if value is None:
+                continue
+            clauses.append(f"{column} ?" if " " in column else f"{column} = ?")
+            params.append(_timestamp(value) if column.split()[0] in TIME_COLUMNS else value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _sync_by_id(self, client, endpoint, table, columns, fields, odata_filter, name, folder_id, page_size=None):
+        """
+        Upserts the entities with an Id greater than the last one synced,
+        paging with an Id filter
+        """
+        page_size = int(page_size or client.page_size)
+        watermark = self._watermark(name)
+        last_id = watermark.id if watermark else 0
+        count = 0
+        while True:
+            query = {"$filter": client._and_filter(odata_filter, f"Id gt {last_id}"), "$orderby": "Id", "$top": page_size}
+            rows = client._get(client._odata_url(endpoint, client._select(query, fields)))["value"]
+            if rows:
+                last_id = rows[-1]["Id"]
+                self._upsert(table, columns, rows, folder_id, name, None, last_id)
+                count += len(rows)
+            if len(rows) < page_size:
+                return count
+
+    def _upsert(self, table, columns, rows, folder_id, name=None, time=None, last_id=None, new_id=None):
+        """
+        Upserts the rows, and records the sync position in the same transaction
+        """
+        names = [column for column, _ in columns]
+        values = [tuple(self._value(column, field, row, folder_id) for column, field in columns) for row in rows]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in names[1:]
+                            if column != "specific_content" or not rows or "SpecificContent" in rows[0])
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}", values)
+            if name is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO sync_state (name, time, last_id, new_id, synced_at) VALUES (?, ?, ?, ?, ?)",
+                    (name, time, last_id, new_id, _timestamp(datetime.now(timezone.utc))))
+
+    @staticmethod
+    def _value(column, field, row, folder_id):
+        if field is None:
+            return folder_id
+        value = row.get(field)
+        if value is None:
+            return None
+        if column in TIME_COLUMNS:
+            return _timestamp(value)
+        if column == "exception_reason":
+            return value.get("Reason") if isinstance(value, dict) else str(value)
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    def _watermark(self, name):
+        row = self.connection.execute("SELECT time, last_id, new_id FROM sync_state WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        return Watermark(row["time"], row["last_id"], row["new_id"])
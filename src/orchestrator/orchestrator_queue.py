@@ -2,18 +2,30 @@ import logging
 from pprint import pprint
 from uuid import uuid4
 import uuid
-import json
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
 from orchestrator.exceptions import OrchestratorMissingParam
+from orchestrator.orchestrator_bulk import BulkResult, chunk_items, reference_ids, read_rows
+from orchestrator.orchestrator_changes import ChangeFeed
+from orchestrator.orchestrator_consumer import QueueConsumer
+from orchestrator.orchestrator_dedup import ReferenceIndex
+from orchestrator.orchestrator_frames import pages_to_frame, pages_to_arrow, frame_to_columns
 from orchestrator.orchestrator_http import OrchestratorHTTP
-import requests
 from urllib.parse import urlencode
 from orchestrator.orchestrator_queue_item import QueueItem
+from orchestrator.orchestrator_records import QueueItemRecord
 
 __all__ = ["Queue"]
 
 
 class Queue(OrchestratorHTTP):
     classes = ["Comments", "Status", "Reference", "SpecificContent"]
+    item_fields = ("Id",)
+    item_statuses = ("New", "InProgress", "Failed", "Successful", "Abandoned")
+    bulk_chunk_size = 1000
+    bulk_max_bytes = 4 * 1024 * 1024
+    bulk_workers = 4
+    bulk_stopping_commits = ("StopOnFirstFailure", "AllOrNothing")
     """
     Constructor. 
 
@@ -27,23 +39,16 @@ class Queue(OrchestratorHTTP):
     @queue_id: the queue id
     """
 
-    def __init__(self, client_id, refresh_token, tenant_name, folder_id=None, folder_name=None, session=None, queue_name=None, queue_id=None, access_token=None):
-        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session)
+    def __init__(self, client_id=None, refresh_token=None, tenant_name=None, folder_id=None, folder_name=None, session=None, queue_name=None, queue_id=None,
+                 access_token=None, **kwargs):
+        super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id, session=session,
+                         access_token=access_token, **kwargs)
         if not queue_id:
             raise OrchestratorMissingParam(value="queue_id",
                                            message="Required parameter(s) missing: queue_id")
         self.id = queue_id
         self.name = queue_name
         self.folder_name = folder_name
-        self.folder_id = folder_id
-        self.tenant_name = tenant_name
-        self.base_url = f"{self.cloud_url}/{self.tenant_name}/JTBOT/odata"
-        self.access_token = access_token
-        self.refresh_token = refresh_token
-        if session:
-            self.session = session
-        else:
-            self.session = requests.Session()
 
     def __str__(self):
         return f"Queue Id: {self.id} \nQueue Name: {self.name} \nFolder Id: {self.folder_id} \nFolder Name: {self.folder_name}"
@@ -69,10 +74,47 @@ class Queue(OrchestratorHTTP):
             @reference: a reference from the specific content 
             @fields: a dictionary of additional fields to be added to the specific content
         """
-        ran_uuid = str(uuid4())
-        batch_id = str(uuid.uuid4())
         logging.debug("Starting new transaction")
         endpoint = "/Queues/UiPathODataSvc.StartTransaction"
+        format_body_start = self._format_start_body(machine_identifier, specific_content, references, separator, fields)
+        url = f"{self.base_url}{endpoint}"
+        return self._post(url, body=format_body_start)
+
+    def consume(self, handler, machine_identifier, concurrency=4, prefetch=None, poll_interval=5, stop_when_empty=False, max_items=None,
+                max_fetch_errors=5):
+        """
+            Processes the transactions of the queue with concurrent workers
+            until the consumer is stopped (see QueueConsumer), keeping up to
+            `prefetch` transactions started ahead of the workers
+
+            @handler: function called with the QueueItem of each transaction.
+            The transaction is reported as successful when it returns, and
+            as failed when it raises (OrchestratorBusinessException for
+            business exceptions)
+            @machine_identifier: the machine's unique identifier
+            @concurrency: number of worker threads (default 4)
+            @prefetch: maximum number of transactions started ahead (default: concurrency)
+            @poll_interval: seconds to wait when the queue is empty (default 5)
+            @stop_when_empty: return once the queue has no more items (default False)
+            @max_items: return after this many transactions (optional)
+            @max_fetch_errors: consecutive failed StartTransaction calls after
+            which OrchestratorRequestError is raised (default 5)
+            =========
+            @returns: the ConsumerStats (counts and per item timings)
+        """
+        return self.consumer(handler, machine_identifier, concurrency, prefetch, poll_interval, stop_when_empty, max_items, max_fetch_errors).run()
+
+    def consumer(self, handler, machine_identifier, concurrency=4, prefetch=None, poll_interval=5, stop_when_empty=False, max_items=None,
+                 max_fetch_errors=5):
+        """
+            Same as consume, but returns the QueueConsumer without running
+            it, so that it can be stopped from another thread (consumer.stop())
+        """
+        return QueueConsumer(self, handler, machine_identifier, concurrency, prefetch, poll_interval, stop_when_empty, max_items, max_fetch_errors)
+
+    def _format_start_body(self, machine_identifier, specific_content=None, references=None, separator="-", fields=None):
+        ran_uuid = str(uuid4())
+        batch_id = str(uuid.uuid4())
         format_body_start = {
             "transactionData": {
                 "Name": self.name,
@@ -97,8 +139,7 @@ class Queue(OrchestratorHTTP):
         if fields:
             format_body_start["transactionData"]["SpecificContent"].update(fields)
 
-        url = f"{self.base_url}{endpoint}"
-        return self._post(url, body=format_body_start)
+        return format_body_start
 
     def get_processing_records(self, num_days=1, options=None):
         """
@@ -129,13 +170,19 @@ class Queue(OrchestratorHTTP):
             ========
             @returns: an Item object with the specified item id
         """
-        return QueueItem(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.folder_name, self.name, self.id, self.session, item_id, access_token=self.access_token)
+        return QueueItem(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.folder_name, self.name, self.id, self.session, item_id,
+                         **self._shared_state())
 
-    def get_queue_items(self, options=None):
+    def get_queue_items(self, options=None, fields=None, records=False):
         """
             Returns a list of queue items of the given queue
 
             @options: dictionary of odata filtering options ($filter tag will be overwritten)
+            @fields: list of columns to download ($select), the Id is always
+            included. Leaving out SpecificContent makes big queues much
+            lighter to download
+            @records: return compact read only QueueItemRecords instead of
+            QueueItems (default False)
             =========
             @returns: a list of QueueItem objects of the given queue (Maximum number of results: 1000)
         """
@@ -147,35 +194,162 @@ class Queue(OrchestratorHTTP):
             odata_filter = {"$Filter": f"QueueDefinitionId eq {self.id}"}
         # if options:
         #     odata_filter.update(options)
-        query_params = urlencode(odata_filter)
+        query_params = urlencode(self._select(odata_filter, fields, required=self.item_fields))
         url = f"{self.base_url}{endpoint}?{query_params}"
         data = self._get(url)
         # pprint(data)
         filt_data = data['value']
-        return [QueueItem(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.folder_name, self.name, self.id, session=self.session, item_id=item["Id"], content=item["SpecificContent"], reference=item["Reference"], access_token=self.access_token) for item in filt_data]
+        new_item = self._item_factory(records)
+        return [new_item(item) for item in filt_data]
+
+    def iter_queue_items(self, options=None, page_size=None, fields=None, records=False):
+        """
+            Generator over all the queue items of the given queue,
+            fetched lazily one page at a time
+
+            @options: dictionary of odata filtering options (the $filter is
+            combined with the queue filter; $top limits the total of items)
+            @page_size: number of items requested per call (default 1000)
+            @fields: list of columns to download ($select)
+            @records: yield QueueItemRecords instead of QueueItems (default False)
+            =========
+            @yields: QueueItem objects of the given queue
+        """
+        query = self._select(self._queue_filter(options), fields, required=self.item_fields)
+        new_item = self._item_factory(records)
+        for item in self._iter_values("/QueueItems", query, page_size):
+            yield new_item(item)
+
+    def scan_queue_items(self, options=None, page_size=None, max_workers=8, ordered=True, fields=None, records=False):
+        """
+            Parallel version of iter_queue_items for big queues: the number
+            of items is read first and then the pages are downloaded
+            concurrently
+
+            @options: dictionary of odata filtering options (the $filter is
+            combined with the queue filter; $top limits the total of items)
+            @page_size: number of items requested per call (default 1000)
+            @max_workers: maximum number of simultaneous calls (default 8)
+            @ordered: yield the items in order (default True); otherwise
+            pages are yielded as soon as they arrive
+            @fields: list of columns to download ($select)
+            @records: yield QueueItemRecords instead of QueueItems (default False)
+            =========
+            @yields: QueueItem objects of the given queue
+        """
+        query = self._select(self._queue_filter(options), fields, required=self.item_fields)
+        new_item = self._item_factory(records)
+        for item in self._scan_values("/QueueItems", query, page_size, max_workers, ordered):
+            yield new_item(item)
+
+    def items_to_frame(self, options=None, fields=None, flatten_content=False, parse_dates=True, page_size=None, max_workers=8):
+        """
+            Downloads the queue items into a pandas DataFrame, built from
+            the pages of a parallel scan without creating QueueItems
+
+            @options: dictionary of odata filtering options (the $filter is
+            combined with the queue filter; $top limits the total of items)
+            @fields: list of columns to download ($select)
+            @flatten_content: turn the SpecificContent keys into columns
+            named "SpecificContent.<key>" (default False)
+            @parse_dates: parse the dates (CreationTime, StartProcessing...)
+            into UTC datetimes (default True)
+            @page_size: number of items requested per call (default 1000)
+            @max_workers: maximum number of simultaneous calls (default 8)
+            =========
+            @returns: a DataFrame with a row per item
+        """
+        return pages_to_frame(self._item_pages(options, fields, page_size, max_workers),
+                              "SpecificContent" if flatten_content else None, parse_dates)
+
+    def items_to_arrow(self, options=None, fields=None, flatten_content=False, parse_dates=True, page_size=None, max_workers=8):
+        """
+            Same as items_to_frame, but returns a pyarrow Table. SpecificContent
+            is kept as a JSON string unless it is flattened
+        """
+        return pages_to_arrow(self._item_pages(options, fields, page_size, max_workers),
+                              "SpecificContent" if flatten_content else None, parse_dates)
+
+    def _item_pages(self, options=None, fields=None, page_size=None, max_workers=8):
+        query = self._select(self._queue_filter(options), fields, required=self.item_fields)
+        return self._scan_pages("/QueueItems", query, page_size, max_workers)
+
+    def count_items(self, status=None, filter=None):
+        """
+            Returns the number of items of the queue without downloading
+            them ($count)
+
+            @status: only count the items with this status (optional)
+            @filter: an odata $filter expression the items must match (optional)
+        """
+        return self._count("/QueueItems", self._status_filter(status, filter))
+
+    def count_items_by_status(self, statuses=None, filter=None, max_workers=5):
+        """
+            Returns the number of items of the queue for each status. The
+            counts are requested concurrently
+
+            @statuses: list of statuses (default: New, InProgress, Failed,
+            Successful and Abandoned)
+            @filter: an odata $filter expression the items must match (optional)
+            @max_workers: maximum number of simultaneous calls (default 5)
+            =========
+            @returns: a dictionary where the keys are the statuses and the
+            values the number of items
+        """
+        statuses = list(statuses or self.item_statuses)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            counts = executor.map(lambda status: self.count_items(status, filter), statuses)
+            return dict(zip(statuses, counts))
+
+    def _status_filter(self, status=None, filter=None):
+        clauses = [f"Status eq '{status}'" if status else None, f"({filter})" if filter else None]
+        return self._queue_filter({"$filter": self._and_filter(*clauses)} if status or filter else None)
+
+    def _queue_filter(self, options=None):
+        query = dict(options or {})
+        if "$filter" in query:
+            query["$filter"] = f"QueueDefinitionId eq {self.id} and {query['$filter']}"
+        else:
+            query["$filter"] = f"QueueDefinitionId eq {self.id}"
+        return query
+
+    def _new_item(self, item):
+        return QueueItem(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.folder_name, self.name, self.id, session=self.session,
+                         item_id=item["Id"], content=item.get("SpecificContent"), reference=item.get("Reference"), **self._shared_state())
+
+    def _item_factory(self, records=False):
+        return self._new_item_record if records else self._new_item
+
+    def _new_item_record(self, item):
+        return QueueItemRecord.from_row(self, item)
 
-    def get_queue_items_by_status(self, status):
+    def get_queue_items_by_status(self, status, fields=None, records=False):
         """
         Returns a list of QueueItems with the status 
         as indicated in the argument.
+
+        @fields: list of columns to download ($select)
+        @records: return QueueItemRecords instead of QueueItems (default False)
         """
         endpoint = "/QueueItems"
         odata_filter = {"$filter": f"QueueDefinitionId eq {self.id} and Status eq '{status}'"}
-        query_params = urlencode(odata_filter)
+        query_params = urlencode(self._select(odata_filter, fields, required=self.item_fields))
         url = f"{self.base_url}{endpoint}?{query_params}"
         data = self._get(url)
         filt_data = data['value']
-        return [QueueItem(self.client_id, self.refresh_token, self.tenant_name, self.folder_id, self.folder_name, self.name, self.id, session=self.session, item_id=item["Id"], content=item["SpecificContent"], reference=item["Reference"], access_token=self.access_token) for item in filt_data]
+        new_item = self._item_factory(records)
+        return [new_item(item) for item in filt_data]
 
     def _get_sp_contents(self, options=None):
-        items = self.get_queue_items(options=options)
+        items = self.get_queue_items(options=options, fields=["SpecificContent"])
         contents = []
         for item in items:
             contents.append(item.content)
         return contents
 
     def _get_references(self, options=None):
-        items = self.get_queue_items(options=options)
+        items = self.get_queue_items(options=options, fields=["Reference"])
         references = []
         for item in items:
             references.append(item.reference)
@@ -194,6 +368,8 @@ class Queue(OrchestratorHTTP):
             If a reference is found in the queue with the given status, it returns the first
             item whose reference matches the one indicated as an argument. Otherwise it returns
             False.
+
+        To check many references, use check_duplicates.
         """
         filt_items = self.get_queue_items(options={"$filter": f"contains(Reference, '{reference}') and Status eq 'Successful'"})
 
@@ -202,6 +378,60 @@ class Queue(OrchestratorHTTP):
         else:
             return False
 
+    def reference_index(self, statuses=None, bloom=False, capacity=None, error_rate=0.001, refresh_interval=None):
+        """
+        Downloads the references of the queue items with the given statuses
+        (the Reference column only, page by page) into a ReferenceIndex,
+        to check many references for duplicates without a call each
+
+        @statuses: statuses of the items to index (default: Successful, New and InProgress)
+        @bloom: keep the references in a Bloom filter instead of a set, for
+        very big queues (default False)
+        @capacity: number of references the Bloom filter is sized for
+        @error_rate: false positive rate of the Bloom filter (default 0.001)
+        @refresh_interval: seconds after which lookups download the items
+        created since the last refresh (default: only on refresh())
+        """
+        index = ReferenceIndex(self, statuses, bloom, capacity, error_rate, refresh_interval)
+        index.refresh()
+        return index
+
+    def check_duplicates(self, references, statuses=None, index=None):
+        """
+        Batch version of check_duplicate: returns the given references
+        that already belong to an item of the queue with the given
+        statuses, in order. References are compared exactly, without the
+        "#<BatchID>" suffix of the bulk inserts.
+
+        @references: list of references
+        @statuses: statuses of the items to check (default: Successful, New and InProgress)
+        @index: a ReferenceIndex to reuse (see reference_index); a new one
+        is downloaded otherwise
+        """
+        index = index or self.reference_index(statuses)
+        return index.duplicates(references)
+
+    def changes(self, since=None, store=None, page_size=None, fields=None, records=False, options=None):
+        """
+            Returns a ChangeFeed over the items of the queue created or
+            modified after `since`, ordered by LastModificationTime and Id.
+            Iterating the feed again returns the changes made since the
+            last item read, so it can be polled to keep a copy in sync
+            without downloading the whole queue each time.
+
+            @since: Watermark, datetime or ISO 8601 string (default: the
+            watermark saved in the store, or the whole queue)
+            @store: WatermarkStore, or file path, where the watermark is
+            saved after every page (optional)
+            @page_size: number of items per call (default 1000)
+            @fields: list of columns to download ($select)
+            @records: yield QueueItemRecords instead of QueueItems
+            @options: dictionary of odata filtering options
+            =========
+            @returns: the ChangeFeed (its `watermark` is the last item read)
+        """
+        return ChangeFeed(self, since, store, page_size, fields, records, options)
+
     def get_queue_items_ids(self, options=None):
         """
             Returns a list of dictionaries with the queue 
@@ -212,11 +442,9 @@ class Queue(OrchestratorHTTP):
             @returns: a dictionary where the keys are the queue item
             ids of the given queue and the values the queue name
         """
-        items = self.get_queue_items(options)
-        ids = {}
-        for item in items:
-            ids.update({item.id: item.queue_name})
-        return ids
+        query = self._queue_filter({"$filter": options["$filter"]} if options and "$filter" in options else None)
+        items = self._get(self._odata_url("/QueueItems", self._select(query, self.item_fields)))["value"]
+        return {item["Id"]: self.name for item in items}
 
     def add_queue_item(self, specific_content=None, priority="Low"):
         """Creates a new Item
@@ -276,29 +504,63 @@ class Queue(OrchestratorHTTP):
             formatted_sp_content.update(ref_uuid)
             return formatted_sp_content
 
-    def _format_dataframe(self, df):
-        specific_contents = []
-        for i in df.index:
-            specific_contents.append(df.iloc[i].to_json())
-        # pprint(specific_contents)
-        return specific_contents
+    def _dataframe_items(self, df, priority="Low", progress="New", reference=None, batch_id=None):
+        """
+        Formats the rows of a dataframe as BulkAddQueueItems items, like
+        _format_specific_content does for a dictionary, converting the
+        frame a column at a time (see frame_to_columns)
 
-    def bulk_dataframe(self, df, priority="Low", progress="New", reference=None):
-        """Adds a dataframe of items to a given queue"""
-        endpoint = "/Queues"
-        uipath_svc = "/UiPathODataSvc.BulkAddQueueItems"
-        url = f"{self.base_url}{endpoint}{uipath_svc}"
-        sp_contents = self._format_dataframe(df=df)
+        @returns: a generator of (row position, formatted item) pairs
+        """
+        columns = frame_to_columns(df)
+        if reference and str(reference) not in columns:
+            raise OrchestratorMissingParam(value=reference, message=f"Invalid reference: {reference} not found in the dataframe columns")
+        num_rows = len(df)
+        columns["ReferenceID"] = reference_ids(num_rows)
+        columns["BatchID"] = [batch_id] * num_rows
+        if reference:
+            columns["ItemID"] = columns[str(reference)]
+            references = [f"{value}#{batch_id}" for value in columns["ItemID"]]
+        else:
+            references = columns["ReferenceID"]
+        names = list(columns)
+        return ((i, {
+            "Name": self.name,
+            "Priority": priority,
+            "SpecificContent": dict(zip(names, row)),
+            "Progress": progress,
+            "Reference": references[i],
+        }) for i, row in enumerate(zip(*columns.values())))
+
+    def bulk_dataframe(self, df, priority="Low", progress="New", reference=None,
+                       commit_type="StopOnFirstFailure", chunk_size=None, max_bytes=None, max_workers=None):
+        """Adds a dataframe of items to a given queue, a row per item
+
+            The frame is converted a column at a time: missing values (NaN,
+            NaT, None) are sent as null, datetimes as ISO 8601 strings,
+            timedeltas as seconds and Decimals as strings. The index is
+            ignored. The ReferenceID, BatchID and ItemID columns are added
+            as in bulk_create_items, and the items are sent in chunks the
+            same way.
+
+            @df: a pandas DataFrame
+            @priority: sets up the priority (default: Low)
+            @progress: sets up the progress bar (default: New)
+            @reference: a column of the frame to be used as a queue reference
+            @commit_type, @chunk_size, @max_bytes, @max_workers: see bulk_create_items
+            =========
+            @returns: a BulkResult, whose failure indexes are row positions.
+            Before chunked sending this method returned the raw response
+            of the BulkAddQueueItems call, use BulkResult.failures instead
+        """
+        if df is None or df.empty:
+            raise OrchestratorMissingParam(value="df", message="dataframe cannot be empty")
         batch_id = str(uuid4())
-        format_body_queue = {
-            "commitType": "StopOnFirstFailure",
-            "queueName": self.name,
-            "queueItems": [self._format_specific_content(sp_content=json.loads(sp_content), reference=reference, priority=priority, progress=progress, batch_id=batch_id) for sp_content in sp_contents]
-        }
-        # pprint(format_body_queue)
-        return self._post(url, body=format_body_queue)
+        items = self._dataframe_items(df, priority=priority, progress=progress, reference=reference, batch_id=batch_id)
+        return self._bulk_submit(items, batch_id, commit_type, chunk_size, max_bytes, max_workers)
 
-    def bulk_create_items(self, specific_contents=None, priority="Low", progress="New", reference=None):
+    def bulk_create_items(self, specific_contents=None, priority="Low", progress="New", reference=None,
+                          commit_type="StopOnFirstFailure", chunk_size=None, max_bytes=None, max_workers=None):
         """Adds a list of items for a given queue
             @param specific_content: dictionary of key value pairs. It does not
             admit nested dictionaries. If you want to be able to pass a dictionary 
@@ -309,27 +571,112 @@ class Queue(OrchestratorHTTP):
             @progress: sets up the progress bar (default: New)
             @reference: indicates a specific field of the specific content to
             be used as a queue reference.
+            @commit_type: StopOnFirstFailure (default), AllOrNothing or
+            ProcessAllIndependently. It applies to each call: with
+            StopOnFirstFailure and AllOrNothing the calls are sent one at a
+            time and no more calls are made once one of them fails, but the
+            calls already committed are not undone (AllOrNothing is only
+            atomic within a call)
+            @chunk_size: maximum number of items per call (default Queue.bulk_chunk_size)
+            @max_bytes: maximum size of the body of a call (default Queue.bulk_max_bytes)
+            @max_workers: maximum number of simultaneous calls with
+            ProcessAllIndependently (default Queue.bulk_workers)
 
             Specific Content includes by default the following columns:
                 - BatchID: representing a unique ID for the specific batch of items to be uploaded
                 - ReferenceID: a unique ID of the item
                 - ItemID: if reference is set to true, ads a new field with the reference
+
+            =========
+            @returns: a BulkResult with the items that could not be added,
+            mapped to their position in specific_contents. Before chunked
+            sending this method returned the raw response of the
+            BulkAddQueueItems call, use BulkResult.failures instead
         """
-        endpoint = "/Queues"
-        uipath_svc = "/UiPathODataSvc.BulkAddQueueItems"
-        #print(self.name)
-        url = f"{self.base_url}{endpoint}{uipath_svc}"
         if not specific_contents:
             raise OrchestratorMissingParam(value="specific_contents", message="specific contents cannot be null")
+        batch_id = str(uuid4())
+        items = ((i, self._format_specific_content(sp_content=sp_content, reference=reference, priority=priority, progress=progress, batch_id=batch_id))
+                 for i, sp_content in enumerate(specific_contents))
+        return self._bulk_submit(items, batch_id, commit_type, chunk_size, max_bytes, max_workers)
 
+    def ingest_file(self, path, format=None, reference=None, chunk_size=None, priority="Low", progress="New",
+                    commit_type="StopOnFirstFailure", max_bytes=None, max_workers=None, encoding="utf-8", delimiter=",", on_progress=None):
+        """
+            Adds the rows of a CSV or JSON lines file to the queue, streaming
+            them: rows are read and formatted only as chunks are sent, so
+            at most `max_workers` chunks are in flight and one more is being
+            built, whatever the size of the file
+
+            @path: the file path
+            @format: "csv" or "jsonl" (default: guessed from the extension).
+            CSV values are sent as strings, keyed by the header
+            @reference: a column of the file to be used as a queue reference
+            @chunk_size: maximum number of items per call (default Queue.bulk_chunk_size)
+            @priority: sets up the priority (default: Low)
+            @progress: sets up the progress bar (default: New)
+            @commit_type, @max_bytes, @max_workers: see bulk_create_items
+            @encoding: the file encoding (default utf-8)
+            @delimiter: the CSV delimiter (default ",")
+            @on_progress: function called with the BulkResult after every
+            call (default: the progress and throughput are logged)
+            =========
+            @returns: a BulkResult, whose failure indexes are row numbers
+            (starting at 0, header and blank lines excluded)
+        """
         batch_id = str(uuid4())
-        format_body_queue = {
-            "commitType": "StopOnFirstFailure",
+        rows = read_rows(path, format=format, encoding=encoding, delimiter=delimiter)
+        items = ((i, self._format_specific_content(sp_content=row, reference=reference, priority=priority, progress=progress, batch_id=batch_id))
+                 for i, row in enumerate(rows))
+        return self._bulk_submit(items, batch_id, commit_type, chunk_size, max_bytes, max_workers, on_progress or self._log_ingest)
+
+    def _log_ingest(self, result):
+        logging.info(f"{self.name}: {result.total} items sent, {len(result.failures)} failed ({result.rate:.0f} items/s)")
+
+    def _bulk_submit(self, items, batch_id, commit_type="StopOnFirstFailure", chunk_size=None, max_bytes=None, max_workers=None, on_chunk=None):
+        """
+        Sends (index, formatted item) pairs in chunks, with at most
+        `max_workers` calls in flight. Commit types that stop at the first
+        failure send one chunk at a time, so that no chunk is committed
+        after a failed one. Items are read from `items` only as chunks are
+        submitted. `on_chunk` is called with the BulkResult after every call.
+        """
+        url = f"{self.base_url}/Queues/UiPathODataSvc.BulkAddQueueItems"
+        max_workers = 1 if commit_type in self.bulk_stopping_commits else max_workers or self.bulk_workers
+        chunks = chunk_items(items, chunk_size or self.bulk_chunk_size, max_bytes or self.bulk_max_bytes)
+        result = BulkResult(batch_id, commit_type)
+        stop = False
+
+        def send(chunk):
+            return self._post(url, body=self._bulk_chunk_body(chunk, commit_type))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(send, chunk): chunk for chunk in islice(chunks, max_workers)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    try:
+                        failed = result.add(chunk, data=future.result())
+                    except Exception as err:
+                        failed = result.add(chunk, error=err)
+                    if failed and commit_type in self.bulk_stopping_commits:
+                        stop = True
+                    if on_chunk:
+                        on_chunk(result)
+                if not stop:
+                    pending.update({executor.submit(send, chunk): chunk for chunk in islice(chunks, len(done))})
+        if stop:
+            result.stopped = next(chunks, None) is not None
+            logging.warning(f"Bulk insert into {self.name} stopped after a failed call ({commit_type})")
+        return result.finish()
+
+    def _bulk_chunk_body(self, chunk, commit_type="StopOnFirstFailure"):
+        return {
+            "commitType": commit_type,
             "queueName": self.name,
-            "queueItems": [self._format_specific_content(sp_content=sp_content, reference=reference, priority=priority, progress=progress, batch_id=batch_id) for sp_content in specific_contents]
+            "queueItems": [item for _, item in chunk]
         }
-        # pprint(format_body_queue)
-        return self._post(url, body=format_body_queue)
 
     def edit_queue(self, name=None, description=None):
         """Edits the queue with a new name and a new 
@@ -347,12 +694,14 @@ class Queue(OrchestratorHTTP):
             "Name": name,
             "Description": description
         }
+        self.name_index.get("queues", self.folder_id).discard(self.id)
         return self._put(url, body=format_body_queue)
 
     def delete_queue(self):
         """Deletes the queue"""
         endpoint = f"/QueueDefinitions({self.id})"
         url = f"{self.base_url}{endpoint}"
+        self.name_index.get("queues", self.folder_id).discard(self.id)
         return self._delete(url)
 
     def get_queue_item_comments(self, q=None):
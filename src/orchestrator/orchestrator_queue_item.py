@@ -1,7 +1,6 @@
 from pprint import pprint
 from orchestrator.orchestrator_http import OrchestratorHTTP
 from orchestrator.exceptions import OrchestratorMissingParam
-import requests
 from urllib.parse import urlencode
 import json
 
@@ -10,28 +9,20 @@ __all__ = ["QueueItem"]
 
 class QueueItem(OrchestratorHTTP):
 
-    def __init__(self, client_id, refresh_token, tenant_name, folder_id=None, folder_name=None, queue_name=None, queue_id=None, session=None, item_id=None, content=None, reference=None, access_token=None):
+    def __init__(self, client_id=None, refresh_token=None, tenant_name=None, folder_id=None, folder_name=None, queue_name=None, queue_id=None, session=None,
+                 item_id=None, content=None, reference=None, access_token=None, **kwargs):
         super().__init__(client_id=client_id, refresh_token=refresh_token, tenant_name=tenant_name, folder_id=folder_id,
-                         session=session)
+                         session=session, access_token=access_token, **kwargs)
         if not item_id:
             raise OrchestratorMissingParam(value="item id",
                                            message="Required parameter(s) missing: item_id")
         self.specific_content = content
-        self.access_token = access_token
         self.reference = reference
-        self.tenant_name = tenant_name
-        self.folder_id = folder_id
         self.folder_name = folder_name
         self.queue_name = queue_name
         self.queue_id = queue_id
         self.id = item_id
 
-        self.base_url = f"{self.cloud_url}/{self.tenant_name}/JTBOT/odata"
-        if session:
-            self.session = session
-        else:
-            self.session = requests.Session()
-
     def __str__(self):
         return f"Item Id: {self.id} \nQueue: {self.queue_name} \nFolder: {self.folder_name}"
 
@@ -93,22 +84,43 @@ class QueueItem(OrchestratorHTTP):
     def set_transaction_progress(self, status=None):
         """
             Updates the progress field of a given queue
-            item (note: it must be already In Progress)
+            item (note: it must be already In Progress). When the client
+            has a result sink, the update is only queued and None is returned
         """
         if not status:
             raise OrchestratorMissingParam(value="status", message="status cannot be None")
+        if self.result_sink is not None:
+            return self.result_sink.set_progress(self, status)
+        return self._send_transaction_progress(status)
+
+    def _send_transaction_progress(self, status):
         endpoint = f"/QueueItems({self.id})"
         uipath_svc = "/UiPathODataSvc.SetTransactionProgress"
         url = f"{self.base_url}{endpoint}{uipath_svc}"
         body = {
             "progress": status
         }
-        return self._post(url, body=body)
+        return self._post(url, body=body, idempotent=True)
 
     def set_transaction_status(self, success: bool, reason=None, details=None, exception_type=None, fail_reason=None):
+        """
+            Sets the result of the transaction. When the client has a
+            result sink, the result is only queued and None is returned
+        """
+        if self.result_sink is not None:
+            return self.result_sink.set_status(self, success, reason=reason, details=details, exception_type=exception_type, fail_reason=fail_reason)
+        return self._send_transaction_status(success, reason, details, exception_type, fail_reason)
+
+    def _send_transaction_status(self, success: bool, reason=None, details=None, exception_type=None, fail_reason=None):
         endpoint = f"/Queues({self.id})"
         uipath_svc = "/UiPathODataSvc.SetTransactionResult"
         url = f"{self.base_url}{endpoint}{uipath_svc}"
+        transaction_body = self._format_transaction_result(success, reason, details, exception_type, fail_reason)
+        # pprint(transaction_body)
+        return self._post(url, body=transaction_body)
+
+    @staticmethod
+    def _format_transaction_result(success: bool, reason=None, details=None, exception_type=None, fail_reason=None):
         if success:
             transaction_body = {
                 "transactionResult": {
@@ -141,8 +153,7 @@ class QueueItem(OrchestratorHTTP):
 
                 }
             }
-        # pprint(transaction_body)
-        return self._post(url, body=transaction_body)
+        return transaction_body
 
     def events(self):
         """
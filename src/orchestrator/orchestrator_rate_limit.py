@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+__all__ = ["RateLimiter", "TokenBucket"]
+
+"""
+Client side rate limiting shared by every entity derived from a client
+"""
+
+
+class TokenBucket(object):
+    """
+    Token bucket allowing `rate` requests per second with bursts of up to
+    `capacity` requests.
+
+    Calls reserve their token up front, so concurrent callers are spaced
+    evenly instead of all waking up at once when the bucket refills.
+    When `adaptive` is set, a throttled response halves the rate (down to
+    `min_rate`) and every successful call adds back a small step until the
+    configured rate is reached again, so the bucket settles on the highest
+    rate the server accepts.
+
+    @rate: requests per second
+    @capacity: maximum burst (default: one second worth of requests)
+    @adaptive: adapt the rate to throttled responses (default True)
+    @min_rate: lowest rate reached when adapting (default 1/10 of rate)
+    """
+
+    def __init__(self, rate, capacity=None, adaptive=True, min_rate=None):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.adaptive = adaptive
+        self.min_rate = float(min_rate or rate / 10.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """
+        Takes a token and returns the number of seconds the caller has to
+        wait before using it
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """
+        Blocks until a request can be sent
+        """
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        """
+        Waits without blocking the event loop until a request can be sent
+        """
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def throttled(self, retry_after=None):
+        """
+        Called when the server answered 429
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.adaptive:
+                self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self.tokens = min(self.tokens, -retry_after * self.rate)
+            logging.debug(f"Throttled, rate lowered to {self.rate:.2f} req/s")
+
+    def succeeded(self):
+        """
+        Called after a call that was not throttled
+        """
+        if self.adaptive and self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+class RateLimiter(object):
+    """
+    Set of token buckets, one per class of endpoint.
+
+    Each rule is a (name, methods, pattern, rate, capacity) tuple: calls whose
+    method is in `methods` (None for any) and whose url path matches the
+    `pattern` regular expression consume from the bucket of that rule.
+    The first matching rule wins. Calls matching no rule use the
+    `default_rate` bucket, or are not limited if it is None.
+
+    The default rules follow the limits of Orchestrator Cloud for the most
+    used endpoints (requests per second).
+
+    @rules: list of rules (default: RateLimiter.default_rules)
+    @default_rate: rate of the calls not matched by any rule (default None)
+    @adaptive: adapt the buckets to throttled responses (default True)
+    """
+    default_rules = [
+        ("queue_item_reads", ("GET",), r"/QueueItems(\(|$|/)", 100 / 60, 10),
+        ("queue_writes", ("POST",), r"/Queues(\(\d+\))?/UiPathODataSvc\.", 20, 20),
+        ("job_reads", ("GET",), r"/Jobs(\(|$|/)", 100 / 60, 10),
+        ("robot_logs", None, r"/RobotLogs", 100 / 60, 10),
+    ]
+
+    def __init__(self, rules=None, default_rate=None, adaptive=True):
+        self.adaptive = adaptive
+        self.rules = []
+        self.buckets = {}
+        for rule in (self.default_rules if rules is None else rules):
+            self.add_rule(*rule)
+        self.default = TokenBucket(default_rate, adaptive=adaptive) if default_rate else None
+
+    def add_rule(self, name, methods, pattern, rate, capacity=None):
+        """
+        Adds a budget for a class of endpoints (checked after the existing ones)
+        """
+        methods = frozenset(m.upper() for m in methods) if methods else None
+        self.rules.append((name, methods, re.compile(pattern)))
+        self.buckets[name] = TokenBucket(rate, capacity, adaptive=self.adaptive)
+
+    def bucket(self, method, url):
+        """
+        Returns the bucket a call consumes from (None if it is not limited)
+        """
+        path = urlparse(url).path
+        for name, methods, pattern in self.rules:
+            if (methods is None or method.upper() in methods) and pattern.search(path):
+                return self.buckets[name]
+        return self.default
+
+    def acquire(self, method, url):
+        bucket = self.bucket(method, url)
+        return bucket.acquire() if bucket else 0.0
+
+    async def acquire_async(self, method, url):
+        bucket = self.bucket(method, url)
+        return await bucket.acquire_async() if bucket else 0.0
+
+    def throttled(self, method, url, retry_after=None):
+        bucket = self.bucket(method, url)
+        if bucket:
+            bucket.throttled(retry_after)
+
+    def succeeded(self, method, url):
+        bucket = self.bucket(method, url)
+        if bucket:
+            bucket.succeeded()
@@ -0,0 +1,113 @@
+from typing import Tuple
+
+__all__ = ["Record", "QueueItemRecord", "JobRecord", "LogRecord"]
+
+"""
+Compact read only records returned by the list methods called with
+records=True, promoted to full entities only when an action is needed
+"""
+
+
+class Record(object):
+    """
+    Base of the list result records.
+
+    A record only keeps a few columns of its row and a reference to the
+    entity that listed it, instead of the credentials, urls and settings
+    every OrchestratorHTTP carries. Its fields cannot be modified.
+
+    `handle()` returns the full entity (QueueItem, Job, ...) of the record,
+    built on first use and kept. Attributes and methods a record does not
+    have are looked up on that entity, so `record.delete()` promotes the
+    record and deletes it.
+
+    Pickling a record only keeps its fields: an unpickled record has no
+    owner and cannot be promoted.
+    """
+    __slots__ = ("_owner", "_handle")
+    _fields: Tuple[str, ...] = ()
+
+    def __init__(self, owner, *values):
+        object.__setattr__(self, "_owner", owner)
+        object.__setattr__(self, "_handle", None)
+        for field, value in zip(self._fields, values):
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read only")
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.handle(), name)
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields[:3])
+        return f"{type(self).__name__}({values})"
+
+    def __reduce__(self):
+        return (type(self), (None, *(getattr(self, field) for field in self._fields)))
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self._fields}
+
+    def handle(self):
+        if self._handle is None:
+            if self._owner is None:
+                raise AttributeError(f"{type(self).__name__} has no owner (unpickled record) and cannot be promoted")
+            object.__setattr__(self, "_handle", self._new_handle())
+        return self._handle
+
+    def _new_handle(self):
+        raise NotImplementedError
+
+
+class QueueItemRecord(Record):
+    """
+    Queue item listed by a Queue
+    """
+    __slots__ = _fields = ("id", "reference", "status", "priority", "specific_content", "creation_time")
+
+    @classmethod
+    def from_row(cls, queue, row):
+        return cls(queue, row["Id"], row.get("Reference"), row.get("Status"), row.get("Priority"),
+                   row.get("SpecificContent"), row.get("CreationTime"))
+
+    def _new_handle(self):
+        return self._owner._new_item({"Id": self.id, "SpecificContent": self.specific_content, "Reference": self.reference})
+
+
+class JobRecord(Record):
+    """
+    Job listed by a Folder
+    """
+    __slots__ = _fields = ("id", "key", "name", "state", "start_time", "end_time")
+
+    @classmethod
+    def from_row(cls, folder, row):
+        return cls(folder, row["Id"], row["Key"], row["ReleaseName"], row.get("State"),
+                   row.get("StartTime"), row.get("EndTime"))
+
+    def _new_handle(self):
+        return self._owner._new_job({"Id": self.id, "Key": self.key, "ReleaseName": self.name})
+
+
+class LogRecord(Record):
+    """
+    Robot log listed by a Job
+    """
+    __slots__ = _fields = ("message", "trace", "timestamp", "id")
+
+    @classmethod
+    def from_row(cls, job, row):
+        return cls(job, row.get("Message"), row.get("Level"), row.get("TimeStamp"), row.get("Id"))
+
+    @property
+    def key(self):
+        return self._owner.key
+
+    def _new_handle(self):
+        return self._owner._new_log({"Message": self.message, "Level": self.trace, "TimeStamp": self.timestamp})
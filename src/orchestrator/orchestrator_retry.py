@@ -0,0 +1,171 @@
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional
+import threading
+import logging
+import random
+import time
+
+__all__ = ["RetryPolicy", "CircuitBreaker"]
+
+"""
+Retry and circuit breaking rules applied by OrchestratorHTTP to every call
+"""
+
+
+class CircuitBreaker(object):
+    """
+    Stops sending requests to a host after a number of consecutive failures.
+
+    After `failure_threshold` consecutive failures (5xx responses or
+    connection errors) the circuit opens and calls fail immediately for
+    `recovery_timeout` seconds. Then a single trial call is let through:
+    if it succeeds the circuit closes again, otherwise it stays open for
+    another period. Throttled calls (429) are neither successes nor
+    failures: they do not reset the count of consecutive failures, and a
+    throttled trial call leaves the circuit open for another period.
+
+    @failure_threshold: consecutive failures needed to open the circuit (default 5)
+    @recovery_timeout: seconds the circuit stays open (default 30)
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Returns True if a request can be sent
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.opened_at is not None and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_throttled(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class RetryPolicy(object):
+    """
+    Decides which failed calls are retried and how long to wait in between.
+
+    Waits follow an exponential backoff with full jitter, unless the server
+    sends a Retry-After header on a 429 or 503 response, in which case it is
+    honoured. Non idempotent calls (POST) are only retried when the server
+    could not have processed them: a 429, a 503 carrying Retry-After, or a
+    connection that could not be established. A call can be flagged as safe
+    to repeat with `idempotent=True`.
+
+    @total: maximum number of retries per call (default 3)
+    @backoff_factor: base of the exponential backoff in seconds (default 0.5)
+    @max_backoff: maximum wait between two attempts in seconds (default 30)
+    @max_retry_after: maximum Retry-After honoured in seconds (default 120)
+    @status_forcelist: status codes that are retried (default 429, 500, 502, 503, 504)
+    @raise_on_exhausted: raise OrchestratorRequestError when a call still fails
+    after the last retry instead of returning the error body (default True)
+    @failure_threshold, @recovery_timeout: settings of the per host CircuitBreaker
+    """
+    idempotent_methods = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+    retry_after_statuses = frozenset([429, 503])
+
+    def __init__(self, total=3, backoff_factor=0.5, max_backoff=30, max_retry_after=120,
+                 status_forcelist=(429, 500, 502, 503, 504), raise_on_exhausted=True,
+                 failure_threshold=5, recovery_timeout=30):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.status_forcelist = frozenset(status_forcelist)
+        self.raise_on_exhausted = raise_on_exhausted
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.stats = {"calls": 0, "retries": 0, "exhausted": 0}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, host):
+        """
+        Returns the CircuitBreaker of the given host
+        """
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+            return self._breakers[host]
+
+    def _is_idempotent(self, method, idempotent=None):
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in self.idempotent_methods
+
+    def should_retry_status(self, method, status, retry_after=None, idempotent=None):
+        if status not in self.status_forcelist:
+            return False
+        if self._is_idempotent(method, idempotent):
+            return True
+        return status == 429 or (status == 503 and retry_after is not None)
+
+    def should_retry_error(self, method, sent=True, idempotent=None):
+        """
+        @sent: False if the connection could not be established, which
+        makes the call safe to repeat whatever its method
+        """
+        return not sent or self._is_idempotent(method, idempotent)
+
+    def backoff(self, attempt, status=None, retry_after=None):
+        """
+        Seconds to wait before retry number `attempt` (starting at 0)
+        """
+        if retry_after is not None and status in self.retry_after_statuses:
+            return min(retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+    @staticmethod
+    def parse_retry_after(value):
+        """
+        Converts a Retry-After header (seconds or HTTP date) into seconds
+        """
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def record(self, retries, exhausted=False):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["retries"] += retries
+            if exhausted:
+                self.stats["exhausted"] += 1
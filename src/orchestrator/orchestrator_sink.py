@@ -0,0 +1,139 @@
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from orchestrator.exceptions import OrchestratorRequestError
+
+__all__ = ["ResultSink"]
+
+"""
+Background delivery of transaction results and progress updates
+"""
+
+
+class ResultSink(object):
+    """
+    Sends the transaction results and progress updates of queue items from
+    background threads, so workers do not wait for them.
+
+    When a client is created with `result_sink=ResultSink()`, the
+    set_transaction_status and set_transaction_progress calls of its queue
+    items only queue the update and return None. The updates of an item are
+    sent in order (progress before result) by at most `max_workers` threads,
+    and a progress update still waiting to be sent is replaced by a newer
+    one of the same item.
+
+    The calls are sent with the RetryPolicy of the client, which only
+    repeats what is safe for these non idempotent POSTs: connections that
+    could not be established, 429 and 503 with Retry-After. The sink does
+    not retry on its own: an update still failing after that, or answered
+    with an error (e.g. a 4xx for an item that is no longer in progress),
+    is kept in `errors`.
+
+    `flush()` waits until every queued update has been sent; `close()`
+    flushes and stops the threads. Both are called at exit if needed.
+
+    The async entities (AsyncQueueItem) send their updates themselves and
+    ignore the sink.
+
+    @max_workers: maximum number of simultaneous calls (default 4)
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.errors = []
+        self.stats = {"queued": 0, "coalesced": 0, "sent": 0, "failed": 0}
+        self._pending = {}
+        self._in_flight = set()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="result-sink")
+        self._closed = False
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"<ResultSink {self.stats} pending={len(self._pending)}>"
+
+    def set_status(self, item, success, **kwargs):
+        """
+        Queues the result of a transaction (see QueueItem.set_transaction_status)
+        """
+        self._queue(item, "result", dict(kwargs, success=success))
+
+    def set_progress(self, item, status):
+        """
+        Queues a progress update, replacing the one of the item not sent yet
+        """
+        self._queue(item, "progress", status)
+
+    def flush(self, timeout=None):
+        """
+        Waits until every queued update has been sent (or has failed)
+
+        @returns: False if the timeout expired first
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def close(self):
+        """
+        Sends the queued updates and stops the background threads
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+        self.flush()
+        self._executor.shutdown(wait=True)
+        atexit.unregister(self.close)
+
+    def _queue(self, item, kind, value):
+        with self._cond:
+            if self._closed:
+                raise OrchestratorRequestError(value=item.id, message="The result sink is closed")
+            updates = self._pending.setdefault(item.id, {})
+            if kind in updates:
+                self.stats["coalesced"] += 1
+                if kind == "result":
+                    logging.warning(f"Result of item {item.id} set twice, only the last one is sent")
+            updates[kind] = value
+            updates["item"] = item
+            self.stats["queued"] += 1
+            if item.id not in self._in_flight:
+                self._in_flight.add(item.id)
+                self._executor.submit(self._drain, item.id)
+
+    def _drain(self, item_id):
+        while True:
+            with self._cond:
+                updates = self._pending.pop(item_id, None)
+                if updates is None:
+                    self._in_flight.discard(item_id)
+                    self._cond.notify_all()
+                    return
+            item = updates["item"]
+            if "progress" in updates:
+                self._deliver(item, "progress", item._send_transaction_progress, updates["progress"])
+            if "result" in updates:
+                result = dict(updates["result"])
+                self._deliver(item, "result", item._send_transaction_status, result.pop("success"), **result)
+
+    def _deliver(self, item, kind, send, *args, **kwargs):
+        try:
+            data = send(*args, **kwargs)
+            if isinstance(data, dict) and "errorCode" in data:
+                raise OrchestratorRequestError(value=data.get("errorCode"), message=data.get("message"))
+        except Exception as error:
+            logging.error(f"Could not send the {kind} of item {item.id}: {error}")
+            with self._cond:
+                self.stats["failed"] += 1
+                self.errors.append((item.id, kind, error))
+            return
+        with self._cond:
+            self.stats["sent"] += 1
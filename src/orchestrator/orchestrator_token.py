@@ -0,0 +1,280 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import asyncio
+import tempfile
+import threading
+import logging
+import json
+import os
+import sys
+import requests
+
+from orchestrator.exceptions import OrchestratorAuthException
+
+if sys.platform == "win32":  # pragma: no cover
+    import msvcrt
+else:
+    import fcntl
+
+__all__ = ["TokenManager", "FileTokenStore"]
+
+"""
+Access token handling shared by every entity derived from a client
+"""
+
+
+class TokenManager(object):
+    """
+    Keeps the access token of a client and renews it from the refresh token.
+
+    The token is renewed `margin` seconds before it expires, and when
+    several threads (or tasks) find it expired at the same time only one
+    of them calls the identity endpoint while the others wait for its result.
+
+    @client_id: the client id
+    @refresh_token: a refresh token
+    @token_url: the url of the oauth token endpoint
+    @session: a session object used to request tokens (optional)
+    @margin: seconds before expiry at which the token is renewed (default 60)
+    @access_token: a previously obtained access token (optional)
+    @store: a FileTokenStore to share tokens between processes (optional)
+    @store_key: the key of this client in the store (defaults to the client id)
+    """
+    lock_poll_interval = 0.05
+
+    def __init__(self, client_id, refresh_token, token_url, session=None, margin=60, access_token=None, store=None, store_key=None):
+        self.client_id = client_id
+        self.refresh_token = refresh_token
+        self.token_url = token_url
+        self.session = session or requests.Session()
+        self.margin = timedelta(seconds=margin)
+        self.access_token = access_token
+        self.expires_at = None
+        self.store = store
+        self.store_key = store_key or client_id
+        self._lock = threading.Lock()
+
+    @property
+    def expired(self):
+        """
+        True if there is no token or it expires within the margin. A token
+        handed over without an expiry date is trusted until the server rejects it.
+        """
+        if not self.access_token:
+            return True
+        if self.expires_at is None:
+            return False
+        return datetime.now(timezone.utc) >= self.expires_at - self.margin
+
+    def get_token(self):
+        """
+        Returns a valid access token, renewing it first if needed
+        """
+        if self.expired:
+            return self.refresh(stale=self.access_token)
+        return self.access_token
+
+    def refresh(self, stale=None):
+        """
+        Renews the access token.
+
+        @stale: the token the caller found invalid. If another caller has
+        already replaced it, the new token is returned without calling the
+        identity endpoint again.
+        """
+        with self._lock:
+            if self.access_token != stale and not self.expired:
+                return self.access_token
+            with self._store_lock():
+                if self._load_stored(stale):
+                    return self.access_token
+                headers = {"Content-Type": "application/json"}
+                try:
+                    r = self.session.post(url=self.token_url, data=json.dumps(self._token_body()), headers=headers)
+                    token_data = r.json()
+                except Exception as err:
+                    return self._refresh_failed(err)
+                self._set_token(token_data)
+            return self.access_token
+
+    async def aget_token(self, session):
+        """
+        Coroutine version of get_token using an aiohttp session
+        """
+        if self.expired:
+            return await self.arefresh(session, stale=self.access_token)
+        return self.access_token
+
+    async def arefresh(self, session, stale=None):
+        """
+        Coroutine version of refresh using an aiohttp session. It shares
+        the lock of refresh, so threads and tasks never renew the token at
+        the same time, and waits for that lock (and the one of the store)
+        without blocking the event loop.
+        """
+        while not self._lock.acquire(blocking=False):
+            await asyncio.sleep(self.lock_poll_interval)
+        try:
+            if self.access_token != stale and not self.expired:
+                return self.access_token
+            fd = self.store.acquire(blocking=False) if self.store is not None else None
+            while self.store is not None and fd is None:
+                await asyncio.sleep(self.lock_poll_interval)
+                fd = self.store.acquire(blocking=False)
+            try:
+                if self._load_stored(stale):
+                    return self.access_token
+                headers = {"Content-Type": "application/json"}
+                try:
+                    async with session.post(self.token_url, data=json.dumps(self._token_body()), headers=headers) as r:
+                        token_data = await r.json(content_type=None)
+                except Exception as err:
+                    return self._refresh_failed(err)
+                self._set_token(token_data)
+            finally:
+                if fd is not None:
+                    self.store.release(fd)
+            return self.access_token
+        finally:
+            self._lock.release()
+
+    @contextmanager
+    def _store_lock(self):
+        if self.store is None:
+            yield
+        else:
+            with self.store.lock():
+                yield
+
+    def _refresh_failed(self, err):
+        """
+        Keeps the current token while it has not actually expired (the
+        renewal was proactive), raises otherwise
+        """
+        if self.access_token and self.expires_at is not None and datetime.now(timezone.utc) < self.expires_at:
+            logging.warning(f"Could not renew the access token, keeping the current one until it expires: {err}")
+            return self.access_token
+        raise OrchestratorAuthException(value=self.client_id, message=f"Could not refresh the access token: {err}") from err
+
+    def _load_stored(self, stale=None):
+        """
+        Takes the token from the store if another process left a valid one
+        """
+        if self.store is None:
+            return False
+        token, expires_at = self.store.load(self.store_key)
+        if not token or token == stale or expires_at is None or datetime.now(timezone.utc) >= expires_at - self.margin:
+            return False
+        self.access_token = token
+        self.expires_at = expires_at
+        logging.debug(f"Access token loaded from {self.store.path}")
+        return True
+
+    def _token_body(self):
+        return {
+            "grant_type": "refresh_token",
+            "client_id": self.client_id,
+            "refresh_token": self.refresh_token,
+        }
+
+    def _set_token(self, token_data):
+        if not isinstance(token_data, dict) or not token_data.get("access_token"):
+            message = f"The identity endpoint did not return an access token: {token_data}"
+            return self._refresh_failed(OrchestratorAuthException(value=self.client_id, message=message))
+        self.access_token = token_data["access_token"]
+        self.expires_at = datetime.now(timezone.utc) + timedelta(seconds=int(token_data["expires_in"]))
+        logging.debug(f"Access token renewed, expires at {self.expires_at}")
+        if self.store is not None:
+            self.store.save(self.store_key, self.access_token, self.expires_at)
+
+
+class FileTokenStore(object):
+    """
+    Keeps access tokens in a JSON file so that short lived processes
+    using the same credentials can reuse a token instead of requesting a new one.
+
+    Writes are atomic (the file is replaced, never rewritten in place) and
+    both reads and renewals happen while holding an exclusive lock on
+    `path + ".lock"`, so only one process renews an expired token at a time.
+    Refresh tokens are never written to disk.
+
+    @path: the path of the cache file
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.lock_path = f"{self.path}.lock"
+
+    @staticmethod
+    def key(client_id, tenant_name=None):
+        return f"{client_id}:{tenant_name}"
+
+    def acquire(self, blocking=True):
+        """
+        Takes the exclusive lock of the store and returns its file
+        descriptor, or None if `blocking` is False and another process holds it
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if sys.platform == "win32":
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            if blocking:
+                raise
+            return None
+        return fd
+
+    def release(self, fd):
+        try:
+            if sys.platform == "win32":
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def lock(self):
+        fd = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(fd)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def load(self, key):
+        """
+        Returns the (access_token, expires_at) stored for the key, or (None, None)
+        """
+        entry = self._read().get(key)
+        if not entry:
+            return None, None
+        return entry["access_token"], datetime.fromtimestamp(entry["expires_at"], timezone.utc)
+
+    def save(self, key, access_token, expires_at):
+        """
+        Stores a token for the key, dropping the entries that have already expired.
+        Callers are expected to hold the lock.
+        """
+        now = datetime.now(timezone.utc).timestamp()
+        data = {k: v for k, v in self._read().items() if v.get("expires_at", 0) > now}
+        data[key] = {"access_token": access_token, "expires_at": expires_at.timestamp()}
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".tokens-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,27 @@
+from orchestrator import AsyncOrchestrator
+from dotenv import load_dotenv
+import asyncio
+import os
+import logging
+
+logging.basicConfig(filename="test.log", filemode="w", level=logging.DEBUG, format='%(name)s - %(levelname)s - %(message)s')
+
+load_dotenv()
+CLIENT_ID = os.getenv('CLIENT_ID')
+REFRESH_TOKEN = os.getenv('REFRESH_TOKEN')
+TENANT_NAME = os.getenv('TENANT_NAME')
+PRE_FOLDER_ID = os.getenv('PRE_FOLDER_ID')
+
+
+async def main():
+    async with AsyncOrchestrator(client_id=CLIENT_ID, refresh_token=REFRESH_TOKEN, tenant_name=TENANT_NAME) as client:
+        folder = await client.get_folder_by_id(int(PRE_FOLDER_ID))
+        queue = await folder.get_queue_by_id(116803)
+        items = await queue.get_queue_items()
+        infos = await asyncio.gather(*[item.info() for item in items])
+        assert len(infos) == len(items)
+        assert all(info["Id"] == item.id for info, item in zip(infos, items))
+
+
+def test_async_client():
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from orchestrator.orchestrator_async import AsyncOrchestrator  # noqa: E402
+
+
+def new_client():
+    return AsyncOrchestrator(client_id="client", refresh_token="token", tenant_name="tenant")
+
+
+def test_entities_share_the_session_of_the_client():
+    client = new_client()
+    folder = client._new_folder({"Id": 1, "DisplayName": "Folder"})
+    queue = folder._new_queue({"Id": 2, "Name": "Queue"})
+    item = queue._new_item({"Id": 3})
+
+    async def main():
+        async with client:
+            session = client.async_session
+            assert session is not None
+            assert queue._get_async_session() is session
+            assert item._get_async_session() is session
+        assert session.closed
+        assert item.async_session.closed
+
+    asyncio.run(main())
+    assert folder.async_pool is client.async_pool is item.async_pool
+
+
+def test_blocking_methods_raise():
+    queue = new_client()._new_folder({"Id": 1, "DisplayName": "Folder"})._new_queue({"Id": 2, "Name": "Queue"})
+    with pytest.raises(NotImplementedError, match="blocking Queue"):
+        queue.consume(lambda item: None, "machine")
+    with pytest.raises(NotImplementedError):
+        queue.iter_queue_items()
+    with pytest.raises(NotImplementedError):
+        queue.batch()
+    with pytest.raises(NotImplementedError):
+        queue._get(queue._odata_url("/QueueItems"))
+
+
+def test_count_items_by_status_limits_concurrency():
+    queue = new_client()._new_folder({"Id": 1, "DisplayName": "Folder"})._new_queue({"Id": 2, "Name": "Queue"})
+    running = []
+
+    async def count_items(status=None, filter=None):
+        running.append(status)
+        assert len(running) <= 2
+        await asyncio.sleep(0.01)
+        running.remove(status)
+        return len(status)
+
+    queue.count_items = count_items
+    counts = asyncio.run(queue.count_items_by_status(["New", "Failed", "Successful"], max_workers=2))
+    assert counts == {"New": 3, "Failed": 6, "Successful": 10}
@@ -0,0 +1,109 @@
+import email.parser
+import email.policy
+import json
+
+import pytest
+
+from orchestrator.exceptions import OrchestratorRequestError
+from orchestrator.orchestrator_batch import Batch, BatchResult
+from orchestrator.orchestrator_http import OrchestratorHTTP
+
+BOUNDARY = "batchresponse_1"
+
+
+class Response(object):
+    def __init__(self, status_code, content, content_type):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode("utf-8")
+        self.headers = {"Content-Type": content_type}
+
+
+def multipart(*responses):
+    """
+    Builds a $batch response body from (status, body) pairs, the second one in a change set
+    """
+    lines = []
+    for i, (status, body) in enumerate(responses):
+        part = ["Content-Type: application/http", "Content-Transfer-Encoding: binary", "",
+                f"HTTP/1.1 {status} OK", "Content-Type: application/json", "", json.dumps(body)]
+        if i == 1:
+            lines += [f"--{BOUNDARY}", "Content-Type: multipart/mixed; boundary=changeset_1", "",
+                      "--changeset_1", *part, "--changeset_1--"]
+        else:
+            lines += [f"--{BOUNDARY}", *part]
+    lines.append(f"--{BOUNDARY}--")
+    return "\r\n".join(lines).encode("utf-8")
+
+
+class Client(OrchestratorHTTP):
+    """
+    Answers every $batch request with the given responses
+    """
+
+    def __init__(self, *responses):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", access_token="T")
+        self.responses = responses
+        self.sent = []
+
+    def _send(self, method, endpoint, headers, request_kwargs, idempotent=None):
+        self.sent.append(request_kwargs["data"])
+        return Response(200, multipart(*self.responses), f"multipart/mixed; boundary={BOUNDARY}")
+
+
+def test_encode_puts_writes_in_change_sets():
+    chunk = [("GET", "https://host/odata/Queues", {"Authorization": "Bearer T"}, None, None),
+             ("POST", "https://host/odata/Queues/AddQueueItem", {"X-UIPATH-OrganizationUnitId": "1"}, {"Name": "q"}, None)]
+    raw = Batch._encode(chunk, "batch_1")
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: multipart/mixed; boundary=batch_1\r\n\r\n" + raw)
+    read, changeset = list(message.iter_parts())
+    assert b"GET https://host/odata/Queues HTTP/1.1" in read.get_payload(decode=True)
+    assert b"Bearer" not in raw
+    assert changeset.get_content_type() == "multipart/mixed"
+    write = next(changeset.iter_parts()).get_payload(decode=True).decode("utf-8")
+    assert "X-UIPATH-OrganizationUnitId: 1" in write
+    assert "Content-Type: application/json" in write
+    assert write.rstrip().endswith('{"Name": "q"}')
+
+
+def test_parse_flattens_change_sets():
+    body = multipart((200, {"value": [1]}), (201, {"Id": 5}), (404, {"message": "missing"}))
+    assert Batch._parse(f"multipart/mixed; boundary={BOUNDARY}", body) == [
+        (200, {"value": [1]}), (201, {"Id": 5}), (404, {"message": "missing"})]
+
+
+def test_results_are_deferred_until_the_batch_is_sent():
+    client = Client((200, {"value": [{"Id": 1}, {"Id": 2}]}), (201, {"Id": 3}))
+    with client.batch():
+        rows = client._get("https://host/odata/Queues")["value"]
+        created = client._post("https://host/odata/Queues", body={"Name": "q"})
+        assert isinstance(rows, BatchResult) and not rows.done()
+        assert client.sent == []
+    assert len(client.sent) == 1
+    assert rows.result() == [{"Id": 1}, {"Id": 2}]
+    assert created.result() == {"Id": 3} and created.status == 201
+
+
+def test_iterating_a_pending_result_sends_the_batch():
+    client = Client((200, {"value": [{"Id": 1}, {"Id": 2}]}))
+    with client.batch():
+        rows = client._get("https://host/odata/Queues")["value"]
+        assert len(rows) == 2
+        assert len(client.sent) == 1
+        assert [row["Id"] for row in rows] == [1, 2]
+        assert rows
+    empty = Client((200, {"value": []}))
+    with empty.batch():
+        assert not empty._get("https://host/odata/Queues")["value"]
+
+
+def test_results_of_an_aborted_batch_fail():
+    client = Client()
+    with pytest.raises(ValueError):
+        with client.batch():
+            result = client._get("https://host/odata/Queues")
+            raise ValueError()
+    with pytest.raises(OrchestratorRequestError):
+        result.result()
+    assert client.sent == []
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+import uuid
+
+import pytest
+
+from orchestrator.exceptions import OrchestratorMissingParam
+from orchestrator.orchestrator_bulk import BulkResult, chunk_items, read_rows, reference_ids
+from orchestrator.orchestrator_queue import Queue
+
+
+def items(count, size=10):
+    return ((i, {"Reference": f"R{i}", "SpecificContent": {"data": "x" * size}}) for i in range(count))
+
+
+def test_chunks_are_limited_by_count():
+    chunks = list(chunk_items(items(25), chunk_size=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert [index for chunk in chunks for index, _ in chunk] == list(range(25))
+
+
+def test_chunks_are_limited_by_size():
+    item_size = len(json.dumps(next(items(1))[1])) + 1
+    chunks = list(chunk_items(items(10), chunk_size=100, max_bytes=3 * item_size))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    big = [(0, {"Reference": "big", "SpecificContent": {"data": "x" * 1000}}), *items(2)]
+    assert [len(chunk) for chunk in chunk_items(big, max_bytes=200)] == [1, 2]
+
+
+def test_items_are_read_one_chunk_ahead():
+    read = []
+
+    def source():
+        for pair in items(10):
+            read.append(pair[0])
+            yield pair
+
+    chunks = chunk_items(source(), chunk_size=4)
+    next(chunks)
+    assert read == [0, 1, 2, 3, 4]
+
+
+def test_failures_are_matched_by_reference_id_then_reference():
+    chunk = [(0, {"Reference": "A", "SpecificContent": {"ReferenceID": "id0"}}),
+             (1, {"Reference": "A", "SpecificContent": {"ReferenceID": "id1"}}),
+             (2, {"Reference": "B", "SpecificContent": {}})]
+    failed = [{"ItemData": {"Reference": "A", "SpecificContent": {"ReferenceID": "id1"}}, "ErrorCode": 1, "ErrorMessage": "duplicate"},
+              {"ItemData": {"Reference": "B"}, "ErrorMessage": "invalid"},
+              {"ItemData": {"Reference": "C"}, "ErrorMessage": "unknown"}]
+    failures = BulkResult._match(chunk, failed)
+    assert [(f.index, f.reference, f.error_code) for f in failures] == [(1, "A", 1), (2, "B", None), (None, "C", None)]
+
+
+def test_result_aggregates_the_calls():
+    result = BulkResult()
+    assert result.add([(0, {"Reference": "A"}), (1, {"Reference": "B"})], {"value": [{"ItemData": {"Reference": "B"}, "ErrorMessage": "x"}]}) == 1
+    assert result.add([(2, {"Reference": "C"})], {"message": "Queue does not exist"}) == 1
+    result.finish()
+    assert (result.total, result.chunks, result.succeeded) == (3, 2, 1)
+    assert result.failed_indexes() == [1, 2]
+    assert result.failures[1].message == "Queue does not exist"
+    assert not result.ok
+
+
+def test_reference_ids_are_version_4_uuids():
+    ids = reference_ids(50)
+    assert len(set(ids)) == 50
+    assert all(uuid.UUID(value).version == 4 and str(uuid.UUID(value)) == value for value in ids)
+
+
+def test_read_rows(tmp_path):
+    csv_path = tmp_path / "items.csv"
+    csv_path.write_text("Reference,Amount\nA,1\nB,2\n")
+    assert list(read_rows(csv_path)) == [{"Reference": "A", "Amount": "1"}, {"Reference": "B", "Amount": "2"}]
+    jsonl_path = tmp_path / "items.jsonl"
+    jsonl_path.write_text('{"Reference": "A"}\n\n{"Reference": "B"}\n')
+    assert [row["Reference"] for row in read_rows(jsonl_path)] == ["A", "B"]
+
+
+class BulkQueue(Queue):
+    """
+    Queue answering BulkAddQueueItems, rejecting the items whose Key is in `rejected`
+    """
+
+    def __init__(self, rejected=(), delay=0.0):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", folder_id=1, queue_name="Queue", queue_id=2,
+                         access_token="T")
+        self.rejected = set(rejected)
+        self.delay = delay
+        self.bodies = []
+        self.running = self.most_running = 0
+        self.lock = threading.Lock()
+
+    def _post(self, url, body=None, *args, **kwargs):
+        with self.lock:
+            self.bodies.append(body)
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        items = body["queueItems"]
+        return {"value": [{"ItemData": item, "ErrorMessage": "rejected"} for item in items if item["SpecificContent"]["Key"] in self.rejected]}
+
+
+def contents(count):
+    return [{"Key": f"K{i}"} for i in range(count)]
+
+
+@pytest.mark.parametrize("commit_type", ["StopOnFirstFailure", "AllOrNothing"])
+def test_no_chunk_is_sent_after_a_failed_one(commit_type):
+    queue = BulkQueue(rejected={"K1"}, delay=0.01)
+    result = queue.bulk_create_items(contents(50), reference="Key", commit_type=commit_type, chunk_size=5, max_workers=4)
+    assert len(queue.bodies) == 1
+    assert queue.most_running == 1
+    assert result.stopped and result.chunks == 1
+    assert [failure.index for failure in result.failures] == [1]
+
+
+def test_stopping_commits_send_the_chunks_in_order():
+    queue = BulkQueue(rejected={"K12"})
+    result = queue.bulk_create_items(contents(50), reference="Key", chunk_size=5, max_workers=4)
+    assert [body["queueItems"][0]["SpecificContent"]["Key"] for body in queue.bodies] == ["K0", "K5", "K10"]
+    assert result.stopped and result.failed_indexes() == [12]
+
+
+def test_independent_commits_are_sent_in_parallel():
+    queue = BulkQueue(rejected={"K1"}, delay=0.02)
+    result = queue.bulk_create_items(contents(40), commit_type="ProcessAllIndependently", chunk_size=5, max_workers=4)
+    assert result.chunks == 8 and not result.stopped
+    assert result.failed_indexes() == [1]
+    assert 1 < queue.most_running <= 4
+
+
+def test_dataframe_reference_must_be_a_column():
+    pd = pytest.importorskip("pandas")
+    with pytest.raises(OrchestratorMissingParam):
+        BulkQueue().bulk_dataframe(pd.DataFrame({"Key": ["A"]}), reference="Missing")
+
+
+def test_ingest_file(tmp_path):
+    lines = ["Key,Amount"] + [f"K{i},{i}" for i in range(23)]
+    path = tmp_path / "items.csv"
+    path.write_text("\n".join(lines) + "\n")
+    queue = BulkQueue(rejected={"K17"})
+    progress = []
+    result = queue.ingest_file(str(path), reference="Key", chunk_size=5, commit_type="ProcessAllIndependently", max_workers=2,
+                               on_progress=lambda result: progress.append((result.chunks, result.total)))
+    assert (result.total, result.chunks) == (23, 5)
+    assert sorted(len(body["queueItems"]) for body in queue.bodies) == [3, 5, 5, 5, 5]
+    assert [chunks for chunks, _ in progress] == [1, 2, 3, 4, 5]
+    assert progress[-1] == (5, 23)
+    [failure] = result.failures
+    assert lines[failure.index + 1].startswith("K17,")
+    assert failure.reference.startswith("K17#")
+    sent = {item["SpecificContent"]["Key"]: item for body in queue.bodies for item in body["queueItems"]}
+    assert sent["K3"]["SpecificContent"]["Amount"] == "3"
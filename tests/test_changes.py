@@ -0,0 +1,90 @@
+import operator
+import re
+from urllib.parse import parse_qs, urlparse
+
+from orchestrator.orchestrator_changes import ChangeFeed, Watermark, WatermarkStore
+from orchestrator.orchestrator_queue import Queue
+
+OPERATORS = {"eq": operator.eq, "ne": operator.ne, "gt": operator.gt, "ge": operator.ge, "lt": operator.lt, "le": operator.le}
+CLAUSE = re.compile(r"(\w+) (eq|ne|gt|ge|lt|le) ([\w:.\-]+)")
+
+
+def matches(row, odata_filter):
+    """
+    Evaluates the odata $filter sent by the feed on a row
+    """
+    def compare(match):
+        field, op, value = match.groups()
+        return f"_compare(row, {field!r}, {op!r}, {value!r})"
+
+    def _compare(row, field, op, value):
+        if field == "QueueDefinitionId":
+            return True
+        actual = row.get(field)
+        if value == "null":
+            return OPERATORS[op](actual, None)
+        if actual is None:
+            return False
+        return OPERATORS[op](actual, int(value) if field == "Id" else value)
+
+    expression = CLAUSE.sub(compare, odata_filter)
+    return eval(expression, {"_compare": _compare, "row": row})
+
+
+class StubQueue(Queue):
+    """
+    Queue whose items live in a list, queried through the odata options
+    """
+
+    def __init__(self, items):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", folder_id=1, queue_name="Queue", queue_id=2,
+                         access_token="T")
+        self.items = items
+        self.calls = 0
+
+    def _get(self, url, *args, **kwargs):
+        self.calls += 1
+        assert self.calls < 100, "the feed does not stop"
+        query = {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+        rows = [row for row in self.items if matches(row, query["$filter"])]
+        for key in reversed(query["$orderby"].split(",")):
+            field, _, direction = key.partition(" ")
+            rows.sort(key=lambda row: row[field], reverse=direction == "desc")
+        return {"value": [dict(row) for row in rows[:int(query["$top"])]]}
+
+
+def item(item_id, modified=None, created=None):
+    return {"Id": item_id, "LastModificationTime": modified, "CreationTime": created or f"2024-01-01T00:00:{item_id:02d}.000Z"}
+
+
+def ids(feed):
+    return [row["Id"] for page in feed.pages() for row in page]
+
+
+def test_never_modified_items_are_read_after_the_first_page():
+    queue = StubQueue([item(i) for i in range(1, 8)])
+    feed = ChangeFeed(queue, page_size=3)
+    assert ids(feed) == [1, 2, 3, 4, 5, 6, 7]
+    queue.items += [item(8), item(9)]
+    assert ids(feed) == [8, 9]
+    assert ids(feed) == []
+
+
+def test_modified_items_follow_their_modification_time():
+    queue = StubQueue([item(1, "2024-01-02T00:00:00.000Z"), item(2), item(3, "2024-01-01T12:00:00.000Z")])
+    feed = ChangeFeed(queue, page_size=2)
+    assert ids(feed) == [2, 3, 1]
+    assert feed.watermark == Watermark("2024-01-02T00:00:00.000Z", 1, 2)
+    queue.items[1]["LastModificationTime"] = "2024-01-03T00:00:00.000Z"
+    queue.items.append(item(4))
+    assert ids(feed) == [4, 2]
+
+
+def test_starting_from_a_time_looks_up_the_last_item_created_then(tmp_path):
+    queue = StubQueue([item(1), item(2), item(3, "2024-01-01T00:00:10.000Z"), item(4), item(5)])
+    store = WatermarkStore(str(tmp_path / "watermarks.json"))
+    feed = ChangeFeed(queue, since="2024-01-01T00:00:03.500Z", store=store, page_size=10)
+    assert ids(feed) == [4, 5, 3]
+    assert store.load(feed.key) == Watermark("2024-01-01T00:00:10.000Z", 3, 5)
+    queue.items.append(item(6))
+    assert ids(ChangeFeed(queue, store=store)) == [6]
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from orchestrator.exceptions import OrchestratorBusinessException, OrchestratorRequestError
+from orchestrator.orchestrator_consumer import QueueConsumer
+
+
+class Item(object):
+    def __init__(self, data):
+        self.id = data["Id"]
+        self.reference = data.get("Reference")
+        self.answer = data.get("Answer")
+        self.results = []
+
+    def set_transaction_status(self, success, **kwargs):
+        self.results.append((success, kwargs.get("exception_type")))
+        return self.answer
+
+
+class StubQueue(object):
+    """
+    Answers StartTransaction with the given answers in turn, then with an empty body
+    """
+    name = "Queue"
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.items = []
+        self._lock = threading.Lock()
+
+    def start(self, machine_identifier):
+        with self._lock:
+            answer = self.answers.pop(0) if self.answers else ""
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def _new_item(self, data):
+        item = Item(data)
+        self.items.append(item)
+        return item
+
+
+def handler(item):
+    if item.id % 2:
+        raise OrchestratorBusinessException(value=item.id, message="odd")
+
+
+def test_processes_until_the_queue_is_empty():
+    queue = StubQueue([{"Id": i} for i in range(1, 11)])
+    stats = QueueConsumer(queue, handler, "robot", concurrency=3, poll_interval=0, stop_when_empty=True).run()
+    assert (stats.succeeded, stats.failed, stats.started) == (5, 5, 10)
+    assert sorted(item.results[0] for item in queue.items if item.id % 2) == [(False, "BusinessException")] * 5
+
+
+def test_a_failed_start_is_retried_instead_of_taken_for_an_empty_queue():
+    answers = [{"Id": 1}, {"message": "Service unavailable", "errorCode": 1000}, OrchestratorRequestError(value=503, message="down"), {"Id": 2}]
+    queue = StubQueue(answers)
+    stats = QueueConsumer(queue, handler, "robot", concurrency=1, prefetch=1, poll_interval=0, stop_when_empty=True).run()
+    assert stats.processed == 2
+    assert stats.fetch_errors == 2
+
+
+def test_consumer_gives_up_after_consecutive_failures():
+    queue = StubQueue([{"message": "Unauthorized"}] * 10)
+    consumer = QueueConsumer(queue, handler, "robot", concurrency=1, prefetch=1, poll_interval=0, stop_when_empty=True, max_fetch_errors=3)
+    with pytest.raises(OrchestratorRequestError):
+        consumer.run()
+    assert consumer.stats.fetch_errors == 3
+    assert consumer.stats.started == 0
+
+
+def test_max_items():
+    queue = StubQueue([{"Id": i} for i in range(1, 11)])
+    stats = QueueConsumer(queue, lambda item: None, "robot", concurrency=2, max_items=4).run()
+    assert stats.processed == 4
+
+
+def test_an_error_body_is_not_counted_as_reported():
+    rejected = {"message": "Transaction already finished", "errorCode": 1001}
+    queue = StubQueue([{"Id": 1}, {"Id": 2, "Answer": rejected}, {"Id": 4, "Answer": {"Id": 4}}])
+    stats = QueueConsumer(queue, handler, "robot", concurrency=1, poll_interval=0, stop_when_empty=True).run()
+    assert (stats.processed, stats.succeeded, stats.failed) == (3, 2, 1)
+    assert stats.report_errors == 1
@@ -0,0 +1,73 @@
+import re
+from urllib.parse import parse_qs, urlparse
+
+from orchestrator.orchestrator_folder import Folder
+from orchestrator.orchestrator_queue import Queue
+
+COUNTS = {"New": 4, "InProgress": 1, "Failed": 2, "Successful": 10, "Abandoned": 0}
+
+
+def count_answer(url):
+    """
+    Checks the query shape of a count and answers it from COUNTS
+    """
+    parts = urlparse(url)
+    query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+    assert query["$count"] == "true" and query["$top"] == "0"
+    status = re.search(r"Status eq '(\w+)'", query.get("$filter", ""))
+    return parts.path, query, {"value": [], "@odata.count": COUNTS[status.group(1)] if status else sum(COUNTS.values())}
+
+
+class StubQueue(Queue):
+    def __init__(self):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", folder_id=1, queue_name="Queue", queue_id=2,
+                         access_token="T")
+        self.queries = []
+
+    def _get(self, url, *args, **kwargs):
+        path, query, answer = count_answer(url)
+        self.queries.append(query)
+        return answer
+
+
+class StubFolder(Folder):
+    def __init__(self):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", folder_id=1, access_token="T")
+        self.requests = []
+
+    def _get(self, url, *args, **kwargs):
+        path, query, answer = count_answer(url)
+        self.requests.append((path.rsplit("/", 1)[-1], query))
+        return answer
+
+
+def test_count_query_only_keeps_the_filter():
+    queue = StubQueue()
+    assert queue._count_query({"$filter": "Id gt 1", "$select": "Id", "$orderby": "Id", "$top": 10}) == {"$filter": "Id gt 1", "$count": "true", "$top": 0}
+
+
+def test_count_items():
+    queue = StubQueue()
+    assert queue.count_items() == 17
+    assert queue.queries[-1]["$filter"] == "QueueDefinitionId eq 2"
+    assert queue.count_items("Failed", filter="Priority eq 'High'") == 2
+    assert queue.queries[-1]["$filter"] == "QueueDefinitionId eq 2 and (Status eq 'Failed') and ((Priority eq 'High'))"
+
+
+def test_count_items_by_status():
+    queue = StubQueue()
+    assert queue.count_items_by_status() == COUNTS
+    assert len(queue.queries) == len(COUNTS)
+    assert queue.count_items_by_status(["New", "Failed"], max_workers=1) == {"New": 4, "Failed": 2}
+
+
+def test_folder_counts():
+    folder = StubFolder()
+    assert folder.count_jobs() == 17
+    assert folder.count_jobs("Running", filter="ReleaseName eq 'P'") == 17
+    assert folder.count_sessions() == 17
+    assert folder.requests == [
+        ("Jobs", {"$count": "true", "$top": "0"}),
+        ("Jobs", {"$filter": "(State eq 'Running') and (ReleaseName eq 'P')", "$count": "true", "$top": "0"}),
+        ("Sessions", {"$count": "true", "$top": "0"}),
+    ]
@@ -0,0 +1,55 @@
+from uuid import uuid4
+
+from orchestrator.orchestrator_dedup import BloomFilter, ReferenceIndex, base_reference
+from orchestrator.orchestrator_queue import Queue
+
+
+class StubQueue(Queue):
+    """
+    Serves the given references as queue items with increasing ids
+    """
+
+    def __init__(self, references):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", folder_id=1, queue_name="Queue", queue_id=2,
+                         access_token="T")
+        self.references = list(references)
+        self.queries = []
+
+    def _iter_values(self, endpoint, options=None, *args, **kwargs):
+        self.queries.append(options["$filter"])
+        last_id = int(options["$filter"].rsplit("Id gt ", 1)[1].rstrip(")"))
+        for i, reference in enumerate(self.references, start=1):
+            if i > last_id:
+                yield {"Id": i, "Reference": reference}
+
+
+def test_base_reference_only_strips_the_batch_id():
+    batch_id = str(uuid4())
+    assert base_reference(f"INV-1#{batch_id}") == "INV-1"
+    assert base_reference(f"INV#1#{batch_id}") == "INV#1"
+    assert base_reference("INV#1") == "INV#1"
+    assert base_reference("Order #12") == "Order #12"
+    assert base_reference(f"INV-1#{batch_id.upper()}") == f"INV-1#{batch_id.upper()}"
+    assert base_reference(f"INV-1#{batch_id}-2") == f"INV-1#{batch_id}-2"
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(10000, error_rate=0.01)
+    values = [f"ref-{i}" for i in range(10000)]
+    for value in values:
+        bloom.add(value)
+    assert all(value in bloom for value in values)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+    assert bloom.count == 10000
+
+
+def test_index_matches_bulk_references_and_refreshes_incrementally():
+    batch_id = str(uuid4())
+    queue = StubQueue([f"A#{batch_id}", "B#2", "C"])
+    index = ReferenceIndex(queue)
+    assert index.duplicates(["A", "B#2", "B", "C", "D"]) == ["A", "B#2", "C"]
+    queue.references.append("D")
+    assert index.refresh() == 1
+    assert "D" in index and index.last_id == 4
+    assert queue.queries[-1].endswith("(Id gt 3)")
@@ -0,0 +1,104 @@
+import datetime
+import decimal
+import json
+
+import pytest
+
+from orchestrator.orchestrator_frames import frame_to_columns, pages_to_arrow, pages_to_frame
+
+pd = pytest.importorskip("pandas")
+
+
+def pages():
+    return [
+        [{"Id": 1, "@odata.etag": "x", "CreationTime": "2024-01-01T10:00:00.123Z", "SpecificContent": {"Amount": 1, "Name": "A"}},
+         {"Id": 2, "CreationTime": "2024-01-01T10:00:01Z", "SpecificContent": None}],
+        [{"Id": 3, "CreationTime": None, "Reference": "R3", "SpecificContent": {"Amount": "ten", "Extra": [1, 2]}}],
+    ]
+
+
+def test_frame_flattens_the_content():
+    df = pages_to_frame(pages(), flatten="SpecificContent")
+    assert list(df.columns) == ["Id", "CreationTime", "SpecificContent.Amount", "SpecificContent.Name", "Reference", "SpecificContent.Extra"]
+    assert df["Id"].tolist() == [1, 2, 3]
+    assert df["SpecificContent.Name"][0] == "A" and pd.isna(df["SpecificContent.Name"][1])
+    amounts = df["SpecificContent.Amount"].tolist()
+    assert amounts[0] == 1 and pd.isna(amounts[1]) and amounts[2] == "ten"
+    assert df["SpecificContent.Extra"].tolist()[2] == [1, 2]
+
+
+def test_frame_parses_the_dates():
+    df = pages_to_frame(pages())
+    assert pd.api.types.is_datetime64_any_dtype(df["CreationTime"]) and str(df["CreationTime"].dt.tz) == "UTC"
+    assert df["CreationTime"][0] == pd.Timestamp("2024-01-01T10:00:00.123Z")
+    assert df["CreationTime"][1] == pd.Timestamp("2024-01-01T10:00:01Z")
+    assert pd.isna(df["CreationTime"][2])
+    assert pages_to_frame(pages(), parse_dates=False)["CreationTime"][1] == "2024-01-01T10:00:01Z"
+    assert isinstance(df["SpecificContent"][0], dict)
+
+
+def test_empty_frame():
+    assert pages_to_frame([]).empty
+
+
+def test_arrow_unifies_the_page_schemas():
+    pa = pytest.importorskip("pyarrow")
+    table = pages_to_arrow(pages(), flatten="SpecificContent")
+    assert table.num_rows == 3
+    assert table.schema.field("SpecificContent.Amount").type == pa.string()
+    assert table.column("SpecificContent.Amount").to_pylist() == ["1", None, "ten"]
+    assert table.column("SpecificContent.Extra").to_pylist() == [None, None, "[1, 2]"]
+    assert table.column("Reference").to_pylist() == [None, None, "R3"]
+    assert table.schema.field("CreationTime").type == pa.timestamp("ns", tz="UTC")
+    assert table.column("CreationTime").to_pylist()[2] is None
+
+
+def test_arrow_keeps_nested_values_as_json():
+    pytest.importorskip("pyarrow")
+    table = pages_to_arrow(pages(), parse_dates=False)
+    assert table.column("SpecificContent").to_pylist()[0] == '{"Amount": 1, "Name": "A"}'
+    assert table.column("CreationTime").to_pylist()[1] == "2024-01-01T10:00:01Z"
+    assert pages_to_arrow([]).num_rows == 0
+
+
+def test_columns_by_dtype():
+    np = pytest.importorskip("numpy")
+    df = pd.DataFrame({
+        "naive": pd.to_datetime(["2024-01-01 10:00:00", None]),
+        "aware": pd.to_datetime(["2024-01-01T10:00:00.250+02:00", "2024-01-01T10:00:00Z"], format="ISO8601", utc=True).tz_convert("Europe/Madrid"),
+        "micros": pd.to_datetime(["2024-01-01 10:00:00.000001", "2024-01-01 10:00:00.000000"]),
+        "duration": pd.to_timedelta(["90s", None]),
+        "integer": np.array([1, 2], dtype="int64"),
+        "real": [1.5, np.nan],
+        "nullable": pd.array([1, None], dtype="Int64"),
+        "flag": [True, False],
+        "text": ["a", None],
+    }, index=[10, 20])
+    columns = frame_to_columns(df)
+    assert columns == {
+        "naive": ["2024-01-01T10:00:00", None],
+        "aware": ["2024-01-01T08:00:00.250Z", "2024-01-01T10:00:00.000Z"],
+        "micros": ["2024-01-01T10:00:00.000001", "2024-01-01T10:00:00.000000"],
+        "duration": [90.0, None],
+        "integer": [1, 2],
+        "real": [1.5, None],
+        "nullable": [1, None],
+        "flag": [True, False],
+        "text": ["a", None],
+    }
+    assert type(columns["integer"][0]) is int
+    json.dumps(columns)
+
+
+def test_object_values():
+    np = pytest.importorskip("numpy")
+
+    class Code(object):
+        def __str__(self):
+            return "C-1"
+
+    values = [decimal.Decimal("1.10"), datetime.date(2024, 1, 2), datetime.datetime(2024, 1, 2, 3, 4, 5), datetime.timedelta(minutes=1),
+              np.timedelta64(2, "s"), np.int32(7), {"a": 1}, [1], Code(), None]
+    columns = frame_to_columns(pd.DataFrame({"mixed": pd.Series(values, dtype=object)}))
+    assert columns["mixed"] == ["1.10", "2024-01-02", "2024-01-02T03:04:05", 60.0, 2.0, 7, {"a": 1}, [1], "C-1", None]
+    json.dumps(columns)
@@ -0,0 +1,65 @@
+import re
+from urllib.parse import parse_qs, urlparse
+
+from orchestrator import orchestrator_job
+from orchestrator.orchestrator_job import Job
+from orchestrator.orchestrator_logs import LogTail
+
+
+class StubJob(Job):
+    """
+    Job whose logs are written by `script`, one list of new logs per poll
+    """
+
+    def __init__(self, script, state="Running"):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", folder_id=1, job_id=5, job_key="k-1",
+                         job_name="Process", access_token="T")
+        self.script = list(script)
+        self.logs = []
+        self.state = state
+        self.filters = []
+
+    def _get(self, url, *args, **kwargs):
+        if self.script:
+            self.logs += self.script.pop(0)
+        elif self.state == "Running":
+            self.state = "Successful"
+        query = {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+        self.filters.append(query["$filter"])
+        after = re.search(r"TimeStamp gt (\S+) or \(TimeStamp eq \S+ and Id gt (\d+)\)", query["$filter"])
+        position = (after.group(1), int(after.group(2))) if after else ("", 0)
+        logs = sorted((log for log in self.logs if (log["TimeStamp"], log["Id"]) > position), key=lambda log: (log["TimeStamp"], log["Id"]))
+        return {"value": logs[:int(query["$top"])]}
+
+    def info(self):
+        return {"State": self.state}
+
+
+def log(log_id, second):
+    return {"Id": log_id, "TimeStamp": f"2024-01-01T00:00:{second:02d}.000Z", "Message": f"log {log_id}", "Level": "Info"}
+
+
+def test_interval_backs_off_while_nothing_arrives():
+    tail = LogTail(StubJob([]), poll_interval=1, max_interval=5, page_size=2)
+    assert [tail.advance([]) for _ in range(4)] == [2, 4, 5, 5]
+    assert tail.advance([log(1, 1), log(2, 1)]) == 0
+    assert tail.advance([log(3, 2)]) == 1
+    assert (tail.watermark.time, tail.watermark.id) == ("2024-01-01T00:00:02.000Z", 3)
+
+
+def test_query_filters_levels_and_position():
+    tail = LogTail(StubJob([]), levels=["Warn", "Error"], since="2024-01-01T00:00:00Z")
+    query = tail.query()
+    assert "Level eq 'Warn' or Level eq 'Error'" in query["$filter"]
+    assert "TimeStamp gt 2024-01-01T00:00:00Z" in query["$filter"]
+    assert query["$orderby"] == "TimeStamp,Id"
+
+
+def test_tail_yields_new_logs_until_the_job_finishes(monkeypatch):
+    waits = []
+    monkeypatch.setattr(orchestrator_job.time, "sleep", waits.append)
+    job = StubJob([[log(1, 1), log(2, 1), log(3, 2)], [], [log(4, 2), log(5, 3)]])
+    messages = [record.message for record in job.tail_logs(poll_interval=1, max_interval=4, page_size=2)]
+    assert messages == ["log 1", "log 2", "log 3", "log 4", "log 5"]
+    assert waits == [1, 2]
+    assert job.state == "Successful"
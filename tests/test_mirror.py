@@ -0,0 +1,87 @@
+import re
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
+
+from orchestrator.orchestrator_folder import Folder
+from orchestrator.orchestrator_mirror import Mirror, _timestamp
+from orchestrator.orchestrator_queue import Queue
+
+
+def query_of(url):
+    return {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+
+
+class StubQueue(Queue):
+    """
+    Serves the given items, none of them modified yet
+    """
+
+    def __init__(self, items):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", folder_id=1, queue_name="Queue", queue_id=2,
+                         access_token="T")
+        self.items = items
+
+    def _get(self, url, *args, **kwargs):
+        query = query_of(url)
+        if "LastModificationTime eq null" not in query["$filter"]:
+            return {"value": []}
+        last_id = int(re.search(r"Id gt (\d+)", query["$filter"]).group(1))
+        return {"value": [item for item in self.items if item["Id"] > last_id][:int(query["$top"])]}
+
+
+class StubFolder(Folder):
+    """
+    Serves the given jobs, by Id filter
+    """
+
+    def __init__(self, jobs):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", folder_name="Folder", folder_id=1, access_token="T")
+        self.jobs = jobs
+        self.refreshed = []
+
+    def _get(self, url, *args, **kwargs):
+        odata_filter = query_of(url)["$filter"]
+        if odata_filter.startswith("Id eq"):
+            wanted = [int(value) for value in re.findall(r"Id eq (\d+)", odata_filter)]
+            self.refreshed += wanted
+            return {"value": [job for job in self.jobs if job["Id"] in wanted]}
+        last_id = int(re.search(r"Id gt (\d+)", odata_filter).group(1))
+        return {"value": [job for job in self.jobs if job["Id"] > last_id]}
+
+
+def test_timestamps_are_normalized_to_utc():
+    assert _timestamp("2024-01-01T10:00:00.1234567Z") == "2024-01-01T10:00:00.123456Z"
+    assert _timestamp("2024-01-01T10:00:00") == "2024-01-01T10:00:00.000000Z"
+    assert _timestamp("2024-01-01T10:00:00+02:00") == "2024-01-01T08:00:00.000000Z"
+    assert _timestamp("2024-01-01T01:00:00.5-0530") == "2024-01-01T06:30:00.500000Z"
+    assert _timestamp(datetime(2024, 1, 1, 12, tzinfo=timezone(timedelta(hours=3)))) == "2024-01-01T09:00:00.000000Z"
+    assert _timestamp(None) is None
+
+
+def test_sync_queue_resumes_and_queries_locally():
+    items = [{"Id": i, "QueueDefinitionId": 2, "Reference": f"R{i}", "Status": "Failed" if i % 3 == 0 else "Successful",
+              "CreationTime": f"2024-01-01T00:00:{i:02d}Z", "LastModificationTime": None, "SpecificContent": {"Vendor": f"V{i % 2}"}}
+             for i in range(1, 11)]
+    queue = StubQueue(items[:7])
+    with Mirror(":memory:") as mirror:
+        assert mirror.sync_queue(queue, specific_content=True, page_size=3) == 7
+        queue.items = items
+        assert mirror.sync_queue(queue, specific_content=True, page_size=3) == 3
+        assert mirror.count_items(queue_id=2) == 10
+        assert [row["id"] for row in mirror.items(status="Failed")] == [3, 6, 9]
+        assert [row["id"] for row in mirror.items(content={"Vendor": "V0"}, since="2024-01-01T00:00:05Z", limit=2)] == [6, 8]
+        assert mirror.items(reference="R4")[0]["specific_content"] == {"Vendor": "V0"}
+
+
+def test_sync_jobs_refreshes_unfinished_and_stateless_jobs():
+    jobs = [{"Id": 1, "Key": "a", "ReleaseName": "P", "State": "Successful"},
+            {"Id": 2, "Key": "b", "ReleaseName": "P", "State": "Running"},
+            {"Id": 3, "Key": "c", "ReleaseName": "P", "State": None}]
+    folder = StubFolder(jobs)
+    with Mirror(":memory:") as mirror:
+        assert mirror.sync_jobs(folder) == 3
+        jobs[1]["State"] = "Faulted"
+        jobs[2]["State"] = "Pending"
+        assert mirror.sync_jobs(folder) == 2
+        assert sorted(folder.refreshed) == [2, 3]
+        assert {job["id"]: job["state"] for job in mirror.jobs()} == {1: "Successful", 2: "Faulted", 3: "Pending"}
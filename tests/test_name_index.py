@@ -0,0 +1,82 @@
+import re
+from urllib.parse import parse_qs, urlparse
+
+from orchestrator.orchestrator_folder import Folder
+from orchestrator.orchestrator_index import NameIndex
+from orchestrator.orchestrator_queue import Queue
+
+LOOKUP = re.compile(r"^Name eq '((?:[^']|'')*)'$")
+
+
+class StubFolder(Folder):
+    """
+    Folder whose queues live in a dictionary of ids and names
+    """
+
+    def __init__(self, queues):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", folder_id=1, access_token="T")
+        self.queues = queues
+        self.filters = []
+
+    def _get(self, url, *args, **kwargs):
+        query = {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+        if "$filter" not in query:
+            return {"value": [{"Id": queue_id, "Name": name} for queue_id, name in self.queues.items()]}
+        self.filters.append(query["$filter"])
+        assert query["$select"] == "Id,Name"
+        name = LOOKUP.match(query["$filter"]).group(1).replace("''", "'")
+        return {"value": [{"Id": queue_id, "Name": queue_name} for queue_id, queue_name in self.queues.items() if queue_name == name]}
+
+
+def test_lookups_are_answered_from_the_index():
+    folder = StubFolder({1: "Invoices", 2: "Orders"})
+    queue = folder.get_queue_by_name("Orders")
+    assert (queue.id, queue.name) == (2, "Orders")
+    assert folder.get_queue_by_name("Orders").id == 2
+    assert folder.get_queue_by_id(2).name == "Orders"
+    assert folder.filters == ["Name eq 'Orders'"]
+
+
+def test_list_calls_fill_the_index():
+    folder = StubFolder({1: "Invoices", 2: "Orders"})
+    folder.get_queue_ids()
+    assert folder.get_queue_by_name("Invoices").id == 1
+    assert folder.filters == []
+
+
+def test_a_miss_is_not_cached():
+    folder = StubFolder({1: "Invoices"})
+    assert folder.get_queue_by_name("Orders") is None
+    folder.queues[2] = "Orders"
+    assert folder.get_queue_by_name("Orders").id == 2
+    assert folder.filters == ["Name eq 'Orders'", "Name eq 'Orders'"]
+
+
+def test_edited_and_deleted_queues_leave_the_index(monkeypatch):
+    monkeypatch.setattr(Queue, "_put", lambda self, url, body=None: {})
+    monkeypatch.setattr(Queue, "_delete", lambda self, url, body=None: {})
+    folder = StubFolder({1: "Invoices", 2: "Orders"})
+    folder.get_queue_by_name("Orders").edit_queue(name="Sales", description="renamed")
+    folder.queues[2] = "Sales"
+    assert folder.get_queue_by_name("Orders") is None
+    folder.get_queue_by_name("Invoices").delete_queue()
+    del folder.queues[1]
+    assert folder.get_queue_by_name("Invoices") is None
+    assert len(folder.filters) == 4
+
+
+def test_names_are_quoted():
+    folder = StubFolder({3: "Bob's queue"})
+    assert folder.get_queue_by_name("Bob's queue").id == 3
+    assert folder.filters == ["Name eq 'Bob''s queue'"]
+    assert Folder._odata_string("it's 'quoted'") == "'it''s ''quoted'''"
+
+
+def test_an_id_keeps_a_single_name():
+    index = NameIndex()
+    index.add(1, "A")
+    index.add(1, "B")
+    index.add(2, "A")
+    assert (index.id("A"), index.id("B"), index.name(1)) == (2, 1, "B")
+    index.discard(1)
+    assert (index.id("B"), index.name(1), index.id("A")) == (None, None, 2)
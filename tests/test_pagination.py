@@ -0,0 +1,26 @@
+from orchestrator.orchestrator import Orchestrator
+from dotenv import load_dotenv
+import os
+import time
+import logging
+
+logging.basicConfig(filename="test.log", filemode="w", level=logging.DEBUG, format='%(name)s - %(levelname)s - %(message)s')
+
+load_dotenv()
+CLIENT_ID = os.getenv('CLIENT_ID')
+REFRESH_TOKEN = os.getenv('REFRESH_TOKEN')
+TENANT_NAME = os.getenv('TENANT_NAME')
+PRE_FOLDER_ID = os.getenv('PRE_FOLDER_ID')
+
+client = Orchestrator(client_id=CLIENT_ID, refresh_token=REFRESH_TOKEN, tenant_name=TENANT_NAME)
+folder = client.get_folder_by_id(int(PRE_FOLDER_ID))
+queue = folder.get_queue_by_id(116803)
+
+start = time.time()
+total = 0
+for item in queue.iter_queue_items(page_size=500):
+    total += 1
+print(f"{total} items in {time.time() - start:.2f}s")
+
+jobs = list(folder.iter_jobs(options={"$top": 250}, page_size=100))
+print(len(jobs))
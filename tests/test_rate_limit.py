@@ -0,0 +1,72 @@
+import pytest
+
+from orchestrator import orchestrator_rate_limit
+from orchestrator.orchestrator_rate_limit import RateLimiter, TokenBucket
+
+
+class Clock(object):
+    """
+    Replaces the time module of the rate limiter: sleeping moves the clock
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(orchestrator_rate_limit, "time", clock)
+    return clock
+
+
+def test_burst_then_evenly_spaced_reservations(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert [bucket.reserve() for _ in range(3)] == [0.5, 1.0, 1.5]
+    clock.now += 10
+    assert bucket.reserve() == 0.0
+    assert bucket.tokens == 2.0
+
+
+def test_acquire_sleeps_for_the_reserved_wait(clock):
+    bucket = TokenBucket(rate=4, capacity=1)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.25
+    assert clock.slept == [0.25]
+
+
+def test_throttled_halves_the_rate_and_honours_retry_after(clock):
+    bucket = TokenBucket(rate=8, min_rate=3)
+    bucket.throttled()
+    assert bucket.rate == 4
+    bucket.throttled(retry_after=2)
+    assert bucket.rate == 3
+    assert bucket.reserve() == pytest.approx(2 + 1 / 3)
+    for _ in range(200):
+        bucket.succeeded()
+    assert bucket.rate == 8
+
+
+def test_fixed_bucket_ignores_throttling(clock):
+    bucket = TokenBucket(rate=8, adaptive=False)
+    bucket.throttled()
+    assert bucket.rate == 8
+
+
+def test_rules_match_method_and_path():
+    limiter = RateLimiter(default_rate=50)
+    base = "https://cloud.uipath.com/org/tenant/orchestrator_/odata"
+    assert limiter.bucket("GET", f"{base}/QueueItems?$top=10") is limiter.buckets["queue_item_reads"]
+    assert limiter.bucket("GET", f"{base}/QueueItems(5)") is limiter.buckets["queue_item_reads"]
+    assert limiter.bucket("POST", f"{base}/Queues/UiPathODataSvc.AddQueueItem") is limiter.buckets["queue_writes"]
+    assert limiter.bucket("GET", f"{base}/QueueDefinitions") is limiter.default
+    assert RateLimiter().bucket("GET", f"{base}/QueueDefinitions") is None
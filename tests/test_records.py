@@ -0,0 +1,59 @@
+import pickle
+import threading
+
+import pytest
+
+from orchestrator.orchestrator_records import QueueItemRecord
+
+
+class Queue(object):
+    """
+    Stands for the Queue that listed the records
+    """
+
+    def __init__(self):
+        self.promoted = 0
+        self.lock = threading.Lock()  # like the session of a client, cannot be pickled
+
+    def _new_item(self, fields):
+        self.promoted += 1
+        return Item(fields)
+
+
+class Item(object):
+    def __init__(self, fields):
+        self.fields = fields
+
+    def delete(self):
+        return f"deleted {self.fields['Id']}"
+
+
+def new_record(queue):
+    return QueueItemRecord.from_row(queue, {"Id": 7, "Reference": "R7", "Status": "New", "SpecificContent": {"a": 1}})
+
+
+def test_records_are_read_only():
+    record = new_record(Queue())
+    with pytest.raises(AttributeError):
+        record.status = "Failed"
+    with pytest.raises(AttributeError):
+        del record.id
+    assert record.as_dict()["reference"] == "R7"
+
+
+def test_the_handle_is_built_once():
+    queue = Queue()
+    record = new_record(queue)
+    assert record.delete() == "deleted 7"
+    assert record.handle() is record.handle()
+    assert queue.promoted == 1
+
+
+def test_pickling_keeps_only_the_fields():
+    queue = Queue()
+    record = new_record(queue)
+    record.handle()
+    copy = pickle.loads(pickle.dumps(record))
+    assert copy.as_dict() == record.as_dict()
+    with pytest.raises(AttributeError):
+        copy.handle()
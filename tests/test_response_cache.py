@@ -0,0 +1,98 @@
+import json
+import time
+
+from orchestrator.orchestrator_cache import ResponseCache
+from orchestrator.orchestrator_http import OrchestratorHTTP
+
+BASE = "https://cloud.uipath.com/org/tenant/orchestrator_/odata"
+
+
+class Response(object):
+    def __init__(self, status_code, body=None, headers=None, url=""):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.headers = headers or {}
+        self.url = url
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class Client(OrchestratorHTTP):
+    """
+    Answers GETs with a counter, so cached responses can be told apart
+    """
+
+    def __init__(self, cache):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", access_token="T", response_cache=cache)
+        self.calls = []
+        self.etag = None
+
+    def _send(self, method, endpoint, headers, request_kwargs, idempotent=None):
+        self.calls.append((method, endpoint, headers.get("If-None-Match")))
+        if method == "POST" and "$batch" in endpoint:
+            boundary = "b"
+            raw = f"--{boundary}\r\nContent-Type: application/http\r\n\r\nHTTP/1.1 201 Created\r\n\r\n{{}}\r\n--{boundary}--".encode("utf-8")
+            response = Response(200)
+            response.content = raw
+            response.headers = {"Content-Type": f"multipart/mixed; boundary={boundary}"}
+            return response
+        if method != "GET":
+            return Response(201, {})
+        if self.etag and headers.get("If-None-Match") == self.etag:
+            return Response(304)
+        return Response(200, {"value": len(self.calls)}, {"ETag": self.etag} if self.etag else None)
+
+
+def test_entries_expire_and_drop_in_lru_order():
+    cache = ResponseCache(rules=[("folders", r"/Folders$", 60)], max_entries=2)
+    cache.put(f"{BASE}/Folders", 1, b"{}")
+    cache.put(f"{BASE}/Folders", 2, b"{}")
+    cache.put(f"{BASE}/Assets", 1, b"{}")
+    assert len(cache._entries) == 2
+    cache.get(f"{BASE}/Folders", 1)
+    cache.put(f"{BASE}/Folders", 3, b"[1]")
+    assert cache.get(f"{BASE}/Folders", 2) is None
+    assert cache.get(f"{BASE}/Folders", 1).value() == {}
+    assert cache.size == 5
+    cache.clear()
+    assert cache.size == 0 and not cache._entries
+
+
+def test_size_limit():
+    cache = ResponseCache(rules=[("folders", r"/Folders", 60)], max_bytes=10)
+    cache.put(f"{BASE}/Folders", None, b"x" * 11)
+    assert cache.get(f"{BASE}/Folders", None) is None
+    for folder_id in range(3):
+        cache.put(f"{BASE}/Folders", folder_id, b"x" * 4)
+    assert cache.size == 8 and cache.get(f"{BASE}/Folders", 0) is None
+
+
+def test_gets_are_cached_until_a_write():
+    client = Client(ResponseCache())
+    assert client._get(f"{BASE}/Folders") == {"value": 1}
+    assert client._get(f"{BASE}/Folders") == {"value": 1}
+    client._post(f"{BASE}/Folders", body={"DisplayName": "New"})
+    assert client._get(f"{BASE}/Folders") == {"value": 3}
+    assert client.response_cache.stats["hits"] == 1
+
+
+def test_expired_entries_are_revalidated_with_their_etag():
+    client = Client(ResponseCache(rules=[("folders", r"/Folders$", 0)]))
+    client.etag = '"v1"'
+    assert client._get(f"{BASE}/Folders") == {"value": 1}
+    time.sleep(0.01)
+    assert client._get(f"{BASE}/Folders") == {"value": 1}
+    assert client.calls[-1][2] == '"v1"'
+    assert client.response_cache.stats["revalidated"] == 1
+
+
+def test_writes_queued_in_a_batch_invalidate_the_cache():
+    client = Client(ResponseCache())
+    assert client._get(f"{BASE}/Folders") == {"value": 1}
+    with client.batch():
+        client._post(f"{BASE}/Folders", body={"DisplayName": "New"})
+        assert client.response_cache.get(f"{BASE}/Folders", None) is None
+        # a GET of another thread, answered before the batch is sent
+        client.response_cache.put(f"{BASE}/Folders", None, b'{"value": 0}')
+    assert client._get(f"{BASE}/Folders") == {"value": 3}
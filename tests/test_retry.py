@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from orchestrator.exceptions import OrchestratorCircuitOpen
+from orchestrator.orchestrator_http import OrchestratorHTTP
+from orchestrator.orchestrator_retry import CircuitBreaker, RetryPolicy
+
+
+class Response(object):
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class Session(object):
+    """
+    Returns the given status codes in turn
+    """
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def request(self, method, endpoint, **kwargs):
+        self.calls += 1
+        return Response(self.statuses.pop(0))
+
+
+def new_client(session, **policy):
+    return OrchestratorHTTP(client_id="client", refresh_token="token", tenant_name="tenant", session=session,
+                            access_token="T", retry_policy=RetryPolicy(**policy))
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=4, max_retry_after=10)
+    for attempt in range(8):
+        assert 0 <= policy.backoff(attempt) <= min(4, 2 ** attempt)
+    assert policy.backoff(0, 429, retry_after=3) == 3
+    assert policy.backoff(0, 503, retry_after=60) == 10
+    assert policy.backoff(0, 500, retry_after=60) <= 1
+    assert policy.parse_retry_after("2") == 2.0
+    assert policy.parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT") == 0.0
+    assert policy.parse_retry_after("soon") is None
+
+
+def test_post_is_only_retried_when_it_was_not_processed():
+    policy = RetryPolicy()
+    assert policy.should_retry_status("GET", 500)
+    assert not policy.should_retry_status("POST", 500)
+    assert policy.should_retry_status("POST", 429)
+    assert not policy.should_retry_status("POST", 503)
+    assert policy.should_retry_status("POST", 503, retry_after=1)
+    assert policy.should_retry_status("POST", 500, idempotent=True)
+    assert not policy.should_retry_status("GET", 404)
+    assert policy.should_retry_error("POST", sent=False)
+    assert not policy.should_retry_error("POST", sent=True)
+
+
+def test_circuit_opens_then_lets_a_trial_call_through():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_throttled_trial_call_keeps_the_circuit_open():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_throttled()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+
+def test_throttling_does_not_reset_the_failure_count():
+    session = Session(500, 429, 500)
+    client = new_client(session, total=0, raise_on_exhausted=False, failure_threshold=2)
+    for _ in range(3):
+        client._send("GET", "https://cloud.uipath.com/a", {}, {})
+    with pytest.raises(OrchestratorCircuitOpen):
+        client._send("GET", "https://cloud.uipath.com/a", {}, {})
+    assert session.calls == 3
@@ -0,0 +1,46 @@
+import threading
+import time
+
+from orchestrator.orchestrator_http import OrchestratorHTTP
+
+
+class Scanner(OrchestratorHTTP):
+    """
+    Serves `total` fake entities without calling Orchestrator
+    """
+
+    def __init__(self, total, delay=0.0):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", access_token="T")
+        self.total = total
+        self.delay = delay
+        self.fetched = []
+        self.running = 0
+        self.lock = threading.Lock()
+
+    def _count(self, endpoint, options=None):
+        return self.total
+
+    def _iter_window(self, endpoint, query, skip, size):
+        with self.lock:
+            self.running += 1
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+            self.fetched.append(skip)
+        yield [{"Id": i} for i in range(skip, skip + size)]
+
+
+def test_pages_are_yielded_in_order():
+    scanner = Scanner(2500)
+    pages = list(scanner._scan_pages("/QueueItems", page_size=1000, max_workers=2))
+    assert [len(page) for page in pages] == [1000, 1000, 500]
+    assert [value["Id"] for page in pages for value in page] == list(range(2500))
+
+
+def test_stopping_early_cancels_the_pages_not_started():
+    scanner = Scanner(100, delay=0.05)
+    scan = scanner._scan_pages("/QueueItems", page_size=10, max_workers=3)
+    assert next(scan)[0]["Id"] == 0
+    scan.close()
+    assert scanner.running == 0
+    assert len(scanner.fetched) <= 4
@@ -0,0 +1,47 @@
+from urllib.parse import parse_qs, urlparse
+
+from orchestrator.orchestrator_http import OrchestratorHTTP
+from orchestrator.orchestrator_queue import Queue
+
+
+class StubQueue(Queue):
+    """
+    Queue recording the query of every GET
+    """
+
+    def __init__(self):
+        super().__init__(client_id="client", refresh_token="token", tenant_name="tenant", folder_id=1, queue_name="Queue", queue_id=2,
+                         access_token="T")
+        self.queries = []
+
+    def _get(self, url, *args, **kwargs):
+        self.queries.append({key: values[0] for key, values in parse_qs(urlparse(url).query).items()})
+        return {"value": [{"Id": 1, "Status": "New"}]}
+
+
+def test_required_fields_are_always_selected():
+    query = OrchestratorHTTP._select({"$filter": "Id gt 1"}, ["Status", "Id", "Reference"], required=("Id", "Name"))
+    assert query == {"$filter": "Id gt 1", "$select": "Id,Name,Status,Reference"}
+
+
+def test_options_are_not_modified():
+    options = {"$top": 10}
+    query = OrchestratorHTTP._select(options, ["Status"], ["Robot"], required=("Id",))
+    assert query == {"$top": 10, "$select": "Id,Status", "$expand": "Robot"}
+    assert options == {"$top": 10}
+
+
+def test_list_methods_merge_the_item_fields():
+    queue = StubQueue()
+    items = queue.get_queue_items(fields=["Status", "Reference"])
+    assert queue.queries[-1]["$select"] == "Id,Status,Reference"
+    assert items[0].id == 1
+    list(queue.iter_queue_items(fields=["Status"]))
+    assert queue.queries[-1]["$select"] == "Id,Status"
+
+
+def test_without_fields_the_query_is_unchanged():
+    queue = StubQueue()
+    queue.get_queue_items()
+    assert queue.queries[-1] == {"$Filter": "QueueDefinitionId eq 2"}
+    assert OrchestratorHTTP._select({"$filter": "Id gt 1"}, None, required=("Id",)) == {"$filter": "Id gt 1"}
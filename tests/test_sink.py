@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from orchestrator.exceptions import OrchestratorRequestError
+from orchestrator.orchestrator_sink import ResultSink
+
+
+class Item(object):
+    """
+    Records the updates sent, answering with the given bodies or exceptions in turn
+    """
+
+    def __init__(self, item_id, answers=None):
+        self.id = item_id
+        self.answers = list(answers or [])
+        self.sent = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def _answer(self):
+        self.gate.wait()
+        answer = self.answers.pop(0) if self.answers else {}
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def _send_transaction_progress(self, status):
+        self.sent.append(("progress", status))
+        return self._answer()
+
+    def _send_transaction_status(self, success, **kwargs):
+        self.sent.append(("result", success))
+        return self._answer()
+
+
+def test_updates_are_sent_in_order_and_progress_is_coalesced():
+    item = Item(1)
+    item.gate.clear()
+    with ResultSink(max_workers=2) as sink:
+        sink.set_progress(item, "first")
+        sink.set_progress(item, "second")
+        sink.set_progress(item, "third")
+        sink.set_status(item, True)
+        item.gate.set()
+        assert sink.flush(timeout=5)
+    assert len(item.sent) <= 3
+    assert item.sent[-2:] == [("progress", "third"), ("result", True)]
+    assert sink.stats["sent"] == len(item.sent)
+    assert sink.stats["coalesced"] >= 1
+
+
+def test_rejected_updates_are_not_retried():
+    business = Item(1, [{"errorCode": 1002, "message": "The transaction is not in progress"}])
+    failing = Item(2, [OrchestratorRequestError(value=500, message="failed")])
+    with ResultSink() as sink:
+        sink.set_status(business, False)
+        sink.set_status(failing, True)
+    assert len(business.sent) == 1 and len(failing.sent) == 1
+    assert sink.stats["failed"] == 2
+    assert sorted((item_id, kind) for item_id, kind, _ in sink.errors) == [(1, "result"), (2, "result")]
+
+
+def test_closed_sink_refuses_updates():
+    sink = ResultSink()
+    sink.close()
+    with pytest.raises(OrchestratorRequestError):
+        sink.set_status(Item(1), True)
+    sink.close()
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from orchestrator.exceptions import OrchestratorAuthException
+from orchestrator.orchestrator_token import TokenManager, FileTokenStore
+
+
+class Response(object):
+    def __init__(self, data):
+        self.data = data
+
+    def json(self, **kwargs):
+        return self.data
+
+
+class Session(object):
+    """
+    Identity endpoint stub counting the refresh calls
+    """
+
+    def __init__(self, data=None, delay=0):
+        self.calls = 0
+        self.data = data
+        self.delay = delay
+
+    def _answer(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return Response(self.data if self.data is not None else {"access_token": f"T{self.calls}", "expires_in": 3600})
+
+    def post(self, *args, **kwargs):
+        return self._answer()
+
+
+class AsyncSession(Session):
+    def post(self, *args, **kwargs):
+        session = self
+
+        class Context(object):
+            async def __aenter__(self):
+                session.calls += 1
+                return Response({"access_token": f"T{session.calls}", "expires_in": 3600})
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Context()
+
+
+def test_refresh_without_access_token_raises():
+    manager = TokenManager("client", "refresh", "https://identity", session=Session({"error": "invalid_grant"}))
+    with pytest.raises(OrchestratorAuthException):
+        manager.get_token()
+    assert manager.access_token is None
+
+
+def test_error_body_keeps_the_valid_token():
+    manager = TokenManager("client", "refresh", "https://identity", session=Session({"error": "invalid_grant"}), margin=60)
+    manager.access_token = "T0"
+    manager.expires_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert manager.get_token() == "T0"
+    manager.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    with pytest.raises(OrchestratorAuthException):
+        manager.get_token()
+
+
+def test_renewed_token_expires_in_utc(tmp_path):
+    store = FileTokenStore(str(tmp_path / "tokens.json"))
+    manager = TokenManager("client", "refresh", "https://identity", session=Session(), store=store)
+    manager.get_token()
+    assert manager.expires_at.tzinfo is timezone.utc
+    assert store.load("client") == ("T1", manager.expires_at)
+
+
+class DownSession(Session):
+    def post(self, *args, **kwargs):
+        raise ConnectionError("identity endpoint unreachable")
+
+
+def test_unreachable_endpoint_keeps_the_valid_token():
+    manager = TokenManager("client", "refresh", "https://identity", session=DownSession(), margin=60)
+    manager.access_token = "T0"
+    manager.expires_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert manager.get_token() == "T0"
+    manager.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    with pytest.raises(OrchestratorAuthException):
+        manager.get_token()
+
+
+def test_threads_and_tasks_share_a_single_refresh():
+    session = Session(delay=0.3)
+    manager = TokenManager("client", "refresh", "https://identity", session=session)
+    thread = threading.Thread(target=manager.refresh)
+    thread.start()
+    time.sleep(0.05)
+
+    async def main():
+        started = time.perf_counter()
+        ticks = 0
+        task = asyncio.ensure_future(manager.arefresh(AsyncSession(), stale=None))
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        assert ticks > 5  # the event loop kept running while the thread refreshed
+        assert time.perf_counter() - started >= 0.2
+        return task.result()
+
+    assert asyncio.run(main()) == "T1"
+    thread.join()
+    assert session.calls == 1
+
+
+def test_store_lock_can_be_tried_without_blocking(tmp_path):
+    store = FileTokenStore(str(tmp_path / "tokens.json"))
+    fd = store.acquire()
+    other = FileTokenStore(str(tmp_path / "tokens.json"))
+    try:
+        assert other.acquire(blocking=False) is None
+    finally:
+        store.release(fd)
+    fd = other.acquire(blocking=False)
+    assert fd is not None
+    other.release(fd)